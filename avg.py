@@ -1,12 +1,10 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, make_response
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, make_response, has_request_context
 import pandas as pd
 import os
 import threading
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
-import requests
-from bs4 import BeautifulSoup
 import time
 import secrets
 import datetime as dt  # Rename datetime module import to dt to avoid conflicts
@@ -15,11 +13,36 @@ import platform
 from datetime import datetime, timedelta  # Now explicitly import datetime and timedelta
 import socket
 import json
+import hashlib
+import hmac
 import numpy as np
 
 # Import the ConfigLoader
 from config_loader import config_loader
 
+# Import the scoring functions
+from scoring import calculate_scores
+
+# Import the shared match-data repository
+from match_data import MatchDataRepository
+from sheet_reader import match_columns, notes_columns
+from column_schema import schema_resolver, widen_floats
+from reload_pipeline import ReloadPipeline
+from match_store import open_store
+from event_partitions import EventPartitions, PARTITION_FOLDERS
+from season_aggregates import SeasonAggregator
+from snapshot_store import SnapshotStore
+from live_ingest import IngestError, IngestJournal, parse_batch, validate_rows
+from sheet_reader import frame_from_records
+from derived_tables import DerivedTableError, json_records
+from data_quality import DataQualityMonitor
+from derived_cache import DerivedTableCache
+from shared_dataset import SharedDatasetReader, SharedDatasetWriter
+from single_flight import single_flight
+from workbook_download import WorkbookDownloader
+from refresh_scheduler import RefreshScheduler
+from data_sources import PEER_SECRET_HEADER, DataSources, UrlSource, build_source
+
 # Import the AI assistant module
 import ai_assistant
 
@@ -38,6 +61,9 @@ config_lock = threading.Lock()
 # User credentials - now loaded from config
 USERS = config_loader.get_value('users', {})
 
+# Secret shared with peer servers, which send it instead of logging in to read /export_rows
+PEER_SECRET = config_loader.get_value('peer_secret', None, section='server')
+
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)  # Generate a secure random secret key
@@ -51,39 +77,31 @@ client_lock = threading.Lock()
 last_requests = {}
 client_locations = {}
 
-# Function to download the Excel file if not found locally
-def download_excel_file(url, local_path):
-    try:
-        response = requests.get(url)
-        response.raise_for_status()  # Check if the request was successful
-
-        # Parse the HTML content to find the actual Excel file URL
-        soup = BeautifulSoup(response.content, 'html.parser')
-        file_url = None
-        for script in soup.find_all('script'):
-            if 'FileGetUrl' in script.text:
-                start = script.text.find('FileGetUrl') + len('FileGetUrl":"')
-                end = script.text.find('"', start)
-                file_url = script.text[start:end].replace('\\u0026', '&')
-                break
-
-        if file_url:
-            file_response = requests.get(file_url)
-            file_response.raise_for_status()
-            with open(local_path, 'wb') as file:
-                file.write(file_response.content)
-            print(f"Downloaded the Excel file from {file_url}")
-        else:
-            print("Failed to find the Excel file URL in the HTML content.")
-    except Exception as e:
-        print(f"Failed to download the Excel file: {e}")
+# Function to keep a snapshot of every new download of the workbook
+def workbook_downloaded(local_path, url=None):
+    # Keep every distinct download so a bad upload can be compared and rolled back
+    snapshot = snapshot_store.add(local_path, source=url or excel_url)
+    print(f"Downloaded the Excel file from {url or excel_url} (snapshot {snapshot[:12]})")
 
-# Function to periodically download and replace the Excel file
-def periodic_download(url, local_path, interval):
+# Function to download the Excel file if not found locally, through the same data source (conditional
+# download, snapshot) the periodic refresh uses; failures are logged by the source
+def fetch_workbook():
+    return workbook_source.fetch() == 'changed'
+
+# Function to periodically fetch every data source, as often as the scheduler says
+def periodic_download(sources, scheduler):
     while True:
-        if not ScannerDevice:
-            download_excel_file(url, local_path)
-        time.sleep(interval)
+        # All sources at once; each is only re-read if it changed
+        results = sources.refresh()
+        if 'changed' in results.values():
+            # Hand the new rows to the background pipeline (parse, rebuild tables, swap)
+            reload_pipeline.request_reload()
+            scheduler.record('changed')
+        elif results and all(result == 'error' for result in results.values()):
+            scheduler.record('error')
+        else:
+            scheduler.record('unchanged')
+        scheduler.wait()
 
 # Get configuration values from config.js
 excel_url = config_loader.get_value('excel_url', 
@@ -92,12 +110,174 @@ excel_url = config_loader.get_value('excel_url',
 local_file_path = config_loader.get_value('local_file_path', 'qr_codes.xlsx', section='server')
 refresh_interval = config_loader.get_value('data_refresh_interval', 150, section='server')
 
-# Start the periodic download in a separate thread if not a scanner device
+# Absolute path of the configured workbook
+excel_file_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), local_file_path)
+
+# Directory for columnar sidecar snapshots of the parsed workbook
+cache_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+    config_loader.get_value('cache_dir', 'data_cache', section='server'))
+
+# Process-wide repository so the workbook is parsed once per version instead of once per request
+# Only the columns named by the game configuration (plus keys and aliases) are loaded
+match_repository = MatchDataRepository(excel_file_path, cache_dir=cache_dir,
+    columns=lambda: match_columns(GAME_CONFIG))
+
+# Optional storage engine: 'sqlite' mirrors the match data into a local database and computes
+# the per-team tables with SQL aggregates; 'memory' (default) keeps everything in pandas
+storage_engine = config_loader.get_value('storage_engine', 'memory', section='server')
+match_store = open_store(storage_engine, os.path.join(cache_dir, 'match_data.sqlite3'))
+
+# Every downloaded workbook, stored once under its content hash with a manifest and row index
+snapshot_store = SnapshotStore(os.path.join(cache_dir, 'snapshots'),
+    columns=lambda: match_columns(GAME_CONFIG),
+    config_provider=lambda: GAME_CONFIG,
+    max_snapshots=config_loader.get_value('max_snapshots', 100, section='server'))
+
+# Validators (ETag, Last-Modified, content hash) of the last download, so unchanged workbooks are skipped
+# 'download_url_ttl' (server section) is how long the file URL scraped from the share page is reused
+workbook_downloader = WorkbookDownloader(os.path.join(cache_dir, 'download_state.json'),
+    file_url_ttl=config_loader.get_value('download_url_ttl', 1800, section='server'))
+
+# Scores, aggregates and derived tables of recent generations, saved so a restart loads them
+# instead of recomputing when the workbook, configuration and rows are unchanged
+derived_cache = DerivedTableCache(os.path.join(cache_dir, 'derived'))
+
+# Serving from more than one process: 'publish' writes every generation to a memory-mapped file
+# in shared_dataset_dir, 'attach' serves the published generations read-only instead of loading
+# the workbook itself (no download or reload in that process); anything else keeps it all local
+shared_dataset_mode = config_loader.get_value('shared_dataset', 'off', section='server')
+shared_dataset_dir = os.path.join(cache_dir,
+    config_loader.get_value('shared_dataset_dir', 'shared', section='server'))
+shared_writer = SharedDatasetWriter(shared_dataset_dir) if shared_dataset_mode == 'publish' else None
+shared_reader = SharedDatasetReader(shared_dataset_dir) if shared_dataset_mode == 'attach' else None
+
+# Where match rows come from: the shared workbook (downloaded unless this is a scanner device) plus
+# the 'data_sources' setting (server section), a list of {"type": "url", "file", "folder" or "peer",
+# "name", "url" or "path", "secret" for peers}, e.g. the scanner's qr_codes.xlsx or a backup laptop.
+# Peers authenticate with the 'peer_secret' setting (server section), which must match on both servers.
+# They are fetched concurrently and their rows merged, duplicates removed, into one generation.
+data_sources = DataSources(workers=config_loader.get_value('source_workers', None, section='server'))
+# Scanner devices only download the workbook when they have none, not periodically
+workbook_source = UrlSource('workbook', excel_url, excel_file_path, workbook_downloader,
+    on_download=workbook_downloaded)
 if not ScannerDevice:
+    data_sources.add(workbook_source)
+for source_spec in config_loader.get_value('data_sources', [], section='server'):
+    try:
+        data_sources.add(build_source(source_spec, os.path.dirname(os.path.realpath(__file__)),
+            os.path.join(cache_dir, 'sources'), lambda: match_columns(GAME_CONFIG), lambda: GAME_CONFIG,
+            WorkbookDownloader, peer_secret=PEER_SECRET))
+    except ValueError as e:
+        print(f"Ignoring data source {source_spec}: {e}")
+
+# Rows posted to /ingest, journaled durably and replayed into the pipeline on startup; the
+# pipeline compacts away rows that reach the workbook
+ingest_journal = IngestJournal(os.path.join(cache_dir, 'ingest_journal.jsonl'))
+
+# Background pipeline that builds complete dataset generations (frame, scores, derived tables)
+# Schema, range and per-team outlier checks, run by the pipeline once per published generation (and
+# on first request for event and day selections)
+data_quality = DataQualityMonitor(lambda: GAME_CONFIG)
+
+reload_pipeline = ReloadPipeline(match_repository, lambda: GAME_CONFIG, store=match_store,
+    snapshots=snapshot_store, derived_cache=derived_cache, shared=shared_writer, sources=data_sources,
+    journal=ingest_journal, quality=data_quality)
+reload_pipeline.live_records = ingest_journal.load()
+# The background worker is started by warm_up() once the first generation is built, so the two do
+# not parse and build the same workbook at once
+
+# Per-event and per-day workbooks in Days/ and SHSCOUTEXCEL/, watched and ingested in the background
+event_partitions = EventPartitions(os.path.dirname(os.path.realpath(__file__)), PARTITION_FOLDERS,
+    columns=lambda: match_columns(GAME_CONFIG) | notes_columns(),
+    config_provider=lambda: GAME_CONFIG,
+    cache_dir=os.path.join(cache_dir, 'partitions'),
+    workers=config_loader.get_value('ingest_workers', None, section='server'))
+event_partitions.start()
+
+# Season-wide per-team aggregates over every event workbook, streamed in chunks so memory stays
+# bounded by the number of teams; 'season_folders' (server section) adds more files or folders
+base_dir = os.path.dirname(os.path.realpath(__file__))
+season_aggregator = SeasonAggregator(
+    [os.path.join(base_dir, path) for path in
+     PARTITION_FOLDERS + config_loader.get_value('season_folders', [], section='server')],
+    config_provider=lambda: GAME_CONFIG,
+    workers=config_loader.get_value('ingest_workers', None, section='server'))
+
+# Function to get the optional event/day filter of the current request (query string or form)
+def partition_filter():
+    if not has_request_context():
+        return None, None
+    return request.values.get('event') or None, request.values.get('day') or None
+
+# Function to get the live dataset generation, downloading the workbook first if nothing is loaded yet.
+# With an event or day filter, the matching partitions are combined instead.
+def get_dataset():
+    event, day = partition_filter()
+    if event or day:
+        dataset = event_partitions.select(event, day)
+        if dataset is None:
+            raise FileNotFoundError(f"No match data for event {event or 'any'}, day {day or 'any'}")
+        return dataset
+
+    if shared_reader is not None:
+        dataset = shared_reader.current()
+        if dataset is None:
+            raise FileNotFoundError(f"No match data published in {shared_dataset_dir}")
+        return dataset
+
+    if reload_pipeline.dataset is None and not os.path.exists(excel_file_path):
+        fetch_workbook()
+    dataset = reload_pipeline.current()
+    if dataset is None:
+        raise FileNotFoundError(f"No match data available from {excel_file_path}")
+    return dataset
+
+# Function to get the shared match data frame of the live generation
+def load_match_data():
+    return get_dataset().frame
+
+# Function to return a precomputed derived table as a JSON response
+def derived_table_response(name):
+    dataset = get_dataset()
+    table = dataset.tables[name]
+    if isinstance(table, DerivedTableError):
+        return jsonify({'error': table.message}), table.status
+    # Concurrent requests for the same table of the same generation share one JSON encoding
+    body = single_flight.do('table_json', (name, dataset.data_version, dataset.version.digest),
+                            lambda: jsonify(table).get_data())
+    return app.response_class(body, mimetype='application/json')
+
+# Function to get the notes columns, which are only loaded when the notes view asks for them
+def load_match_notes():
+    # Partitions already carry the notes columns
+    if any(partition_filter()):
+        return get_dataset().frame
+    if not os.path.exists(excel_file_path):
+        fetch_workbook()
+    notes = match_repository.get_notes()
+    notes = schema_resolver.resolve(notes, GAME_CONFIG, frame_key=('notes', match_repository.notes_digest))
+    # Notes of rows ingested live, which are not in the workbook yet
+    live = reload_pipeline.live_records
+    if live:
+        live_notes = schema_resolver.resolve(frame_from_records(live), GAME_CONFIG)
+        live_notes = live_notes[[col for col in live_notes.columns if col in notes.columns]]
+        notes = pd.concat([notes, live_notes], ignore_index=True)
+    return notes
+
+# Adaptive refresh interval: shorter while new rows keep arriving, backing off (with jitter) while the
+# workbook is unchanged or OneDrive fails; data_refresh_interval, changed from the frontend, is the base
+refresh_scheduler = RefreshScheduler(lambda: GAME_CONFIG.get('data_refresh_interval', refresh_interval),
+    min_interval=config_loader.get_value('min_refresh_interval', 30, section='server'),
+    max_interval=config_loader.get_value('max_refresh_interval', 900, section='server'))
+
+# Start the periodic download in a separate thread if there is anything to fetch (scanner devices
+# without other sources have nothing; processes attached to a shared dataset leave downloading to
+# the publishing process)
+download_thread = None
+if data_sources.sources and shared_reader is None:
     download_thread = threading.Thread(target=periodic_download, args=(
-        excel_url,
-        os.path.join(os.path.dirname(os.path.realpath(__file__)), local_file_path),
-        refresh_interval  # Use interval from config
+        data_sources,
+        refresh_scheduler
     ))
     download_thread.daemon = True
     download_thread.start()
@@ -111,12 +291,8 @@ def calculate_averages():
         # Get the current script's directory
         script_dir = os.path.dirname(os.path.realpath(__file__))
 
-        # Construct the path to the Excel file
-        file_path = os.path.join(script_dir, local_file_path)
-
-        # Read the Excel file and immediately close it
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
+        # Get the shared match data (parsed once per workbook version), widened to average at full precision
+        df = widen_floats(load_match_data())
 
         # Define the relevant columns: team number is in column 'Team Number'
         team_column = current_config.get('team_column', 'Team Number')
@@ -182,27 +358,17 @@ def calculate_averages():
 # Function to display match-by-match data for a selected team
 def show_team_data(team_number=""):
     try:
-        # Get the current script's directory
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-
-        # Construct the path to the Excel file
-        file_path = os.path.join(script_dir, local_file_path)
-
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file(excel_url, file_path)
-
-        # Read the Excel file and immediately close it
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
+        # Get the live dataset generation (frame plus precomputed scores)
+        dataset = get_dataset()
+        df = dataset.frame
 
         # Ensure that the team number is numeric
         if not team_number.isdigit() or int(team_number) == 0:
             print("Invalid Input: Please enter a valid team number.")
             return []
 
-        # Filter the dataframe by the team number
-        team_data = df[df['Team Number'] == int(team_number)]
+        # Look up the team's rows in the team index
+        team_data = dataset.team_rows(int(team_number))
 
         if team_data.empty:
             print(f"No Results: No match data found for Team {team_number}.")
@@ -215,28 +381,14 @@ def show_team_data(team_number=""):
         include_columns = ['Scouter Name', 'Match Number', 'Team Number']
         include_columns.extend(current_config.get('include_columns', []))
 
-        # Define column mappings
-        column_mappings = current_config.get('column_mappings', {})
-        
-        # Build the list of columns that exist in the dataframe
-        valid_columns = []
-        for col in include_columns:
-            if col in team_data.columns:
-                valid_columns.append(col)
-            elif col in column_mappings:
-                for alt_col in column_mappings[col]:
-                    if alt_col in team_data.columns:
-                        valid_columns.append(alt_col)
-                        break
+        # Build the list of columns that exist in the dataframe (names are already canonical)
+        valid_columns = [col for col in include_columns if col in team_data.columns]
 
         # Filter columns based on valid_columns
         team_data_filtered = team_data[valid_columns]
 
-        # Calculate scores for each match
-        team_data_filtered['Score'] = team_data_filtered.apply(
-            lambda row: calculate_scores(row, current_config.get('scoring_rules', {})), 
-            axis=1
-        )
+        # Attach the scores precomputed for each match
+        team_data_filtered['Score'] = dataset.scores.loc[team_data_filtered.index]
 
         # Convert to list of dicts for API return
         match_data = team_data_filtered.to_dict(orient='records')
@@ -249,25 +401,12 @@ def show_team_data(team_number=""):
 # Function to calculate and display team rankings
 def show_team_rankings():
     try:
-        # Get the current script's directory
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-
-        # Construct the path to the Excel file
-        file_path = os.path.join(script_dir, 'qr_codes.xlsx')
-
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file('https://1drv.ms/x/c/92449be8533c48f9/EdGR3Dz4EB5IlugK2iPoh7oBJuQd2jAF86NhnzLz2cLNVQ?e=xLYwEB', file_path)
-
-        # Read the Excel file and immediately close it
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
-
-        # Calculate scores for each match
-        df['Score'] = df.apply(calculate_scores, axis=1)
+        # Get the live dataset generation, which already carries a score for every match
+        dataset = get_dataset()
+        df = dataset.frame
 
         # Calculate total scores for each team
-        team_scores = df.groupby('Team Number')['Score'].sum()
+        team_scores = dataset.scores.groupby(df['Team Number']).sum()
 
         # Convert the series to a dictionary and sort by team number numerically
         team_rankings = {int(team): score for team, score in team_scores.items() if team != 0}
@@ -280,81 +419,6 @@ def show_team_rankings():
         print(f"Error: An error occurred: {e}")
         return {}
 
-# Define the scoring rules - Now accepts the scoring rules as a parameter
-def calculate_scores(row, scoring_rules=None):
-    score = 0
-    
-    # Get the current scoring rules
-    if scoring_rules is None:
-        scoring_rules = config_loader.get_value('scoring_rules', {})
-    
-    try:
-        # Handle Leave Bonus specially since it's boolean
-        if 'Leave Bonus (T/F)' in row and 'Leave Bonus (T/F)' in scoring_rules:
-            # Convert to boolean correctly
-            leave_bonus = False
-            leave_value = row['Leave Bonus (T/F)']
-            
-            if isinstance(leave_value, bool):
-                leave_bonus = leave_value
-            elif isinstance(leave_value, str):
-                leave_bonus = leave_value.upper() in ('TRUE', 'T', 'YES', 'Y', '1')
-            elif isinstance(leave_value, (int, float)):
-                leave_bonus = leave_value >= 0.5
-                
-            if leave_bonus:
-                score += scoring_rules['Leave Bonus (T/F)']
-        
-        # Process all other scoring columns
-        for column in scoring_rules:
-            # Skip Leave Bonus as we already handled it
-            if column == 'Leave Bonus (T/F)':
-                continue
-                
-            # Handle Endgame Barge specially since it's a lookup table
-            if column == 'Endgame Barge' and column in row:
-                try:
-                    # Get the barge value and convert to int for lookup
-                    barge_value = row[column]
-                    if pd.isna(barge_value):
-                        continue
-                        
-                    if isinstance(barge_value, (int, float)):
-                        # Round to nearest integer
-                        barge_key = str(round(barge_value))
-                        if barge_key in scoring_rules[column]:
-                            score += scoring_rules[column][barge_key]
-                except (ValueError, TypeError, KeyError) as e:
-                    print(f"Error processing Endgame Barge: {e}")
-                    continue
-            
-            # Handle all other numeric columns
-            elif column in row and column != 'Endgame Barge':
-                try:
-                    value = row[column]
-                    # Skip NaN values
-                    if pd.isna(value):
-                        continue
-                        
-                    # Convert to numeric if needed
-                    if isinstance(value, str):
-                        try:
-                            value = float(value)
-                        except (ValueError, TypeError):
-                            continue
-                            
-                    # Apply scoring
-                    if isinstance(value, (int, float)):
-                        score += value * scoring_rules[column]
-                except Exception as e:
-                    print(f"Error processing column {column}: {e}")
-                    continue
-    
-    except Exception as e:
-        print(f"Error calculating score: {e}")
-    
-    return score
-
 # Flask Routes
 # Authentication middleware
 def login_required(func):
@@ -387,6 +451,20 @@ def login_required(func):
     wrapper.__name__ = func.__name__
     return wrapper
 
+# Decorator for routes other HeroScout servers read: a request carrying the shared peer_secret is let
+# through, a wrong secret is refused, and anything else needs a login as usual
+def peer_or_login_required(func):
+    login_wrapper = login_required(func)
+    def wrapper(*args, **kwargs):
+        supplied = request.headers.get(PEER_SECRET_HEADER)
+        if supplied is None:
+            return login_wrapper(*args, **kwargs)
+        if not PEER_SECRET or not hmac.compare_digest(supplied.encode('utf-8'), str(PEER_SECRET).encode('utf-8')):
+            return jsonify({'error': 'Invalid peer secret'}), 403
+        return func(*args, **kwargs)
+    wrapper.__name__ = func.__name__
+    return wrapper
+
 # Login route
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -457,98 +535,29 @@ def get_team_averages():
         team_number = request.form['team_number']
         if int(team_number) == 0:
             return jsonify({'error': 'Invalid team number.'}), 400
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        file_path = os.path.join(script_dir, 'qr_codes.xlsx')
-
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file('https://1drv.ms/x/c/92449be8533c48f9/EdGR3Dz4EB5IlugK2iPoh7oBJuQd2jAF86NhnzLz2cLNVQ?e=xLYwEB', file_path)
-
-        # Read the Excel file
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
+        # Get the live dataset generation
+        dataset = get_dataset()
+        df = dataset.frame
         
         # Print column names to help diagnose issues
         print(f"Excel columns: {df.columns.tolist()}")
         
-        # Define mapping between standard column names and alternative column names
-        alt_columns = {
-            'Auto Coral L2/L3 (#)': ['Auto coral L2', 'Auto Coral L3'],
-            'Auto Algae Net (#)': ['Auto Barge Algae'],
-            'Auto Algae Processor (#)': ['Auto Processor Algae'],
-            'Coral L2/L3 (#)': ['Coral L2', 'Coral L3'],
-            'Algae Net (#)': ['Barge Algae'],
-            'Algae Processor (#)': ['processor Algae']
-        }
-        
-        # First check if our expected standard columns exist
-        standard_columns = []
-        for col in GAME_CONFIG['include_columns']:
-            if col in df.columns:
-                standard_columns.append(col)
-        
-        # Then check for alternative column names
-        alt_mapping = {}  # Maps alternative column names to standard names
-        for std_col, alt_cols in alt_columns.items():
-            for alt_col in alt_cols:
-                if alt_col in df.columns:
-                    standard_columns.append(alt_col)
-                    alt_mapping[alt_col] = std_col
+        # Alternative column names were already mapped to the standard names by the schema resolver
+        standard_columns = [col for col in GAME_CONFIG['include_columns'] if col in df.columns]
         
         print(f"Using columns: {standard_columns}")
         
         if not standard_columns:
             return jsonify({'error': 'No valid data columns found in the Excel file'}), 400
         
-        # Filter dataframe to only include valid columns + Team Number
-        valid_df = df[['Team Number'] + [col for col in standard_columns if col in df.columns]]
-        
-        # Filter to only include the requested team
-        team_data = valid_df[valid_df['Team Number'] == int(team_number)]
-        
-        if team_data.empty:
+        # Average each column over the team's rows, but use max for Endgame Barge (best climb); with the
+        # SQLite storage engine this runs as an indexed query in the database
+        averages = dataset.team_summary(int(team_number), standard_columns)
+
+        if averages is None:
             return jsonify({'error': f'No data found for team {team_number}'}), 404
-        
-        # Calculate averages for each column, but use max for Endgame Barge
-        averages = {}
-        for col in team_data.columns:
-            if col == 'Team Number':
-                continue
-            
-            if col == 'Endgame Barge':
-                # For endgame barge, use the maximum value (best climb) not the average
-                value = team_data[col].max()
-            else:
-                # For all other columns, use the average as before
-                value = team_data[col].mean()
-                
-            # Convert NumPy types to native Python types for JSON serialization
-            if isinstance(value, np.integer):
-                averages[col] = int(value)
-            elif isinstance(value, np.floating):
-                averages[col] = float(value)
-            elif isinstance(value, np.ndarray):
-                averages[col] = value.tolist()
-            elif pd.isna(value) or (isinstance(value, (int, float)) and np.isinf(value)):
-                averages[col] = None
-            else:
-                averages[col] = value
-        
-        # Map alternative column names back to standard names
-        std_averages = {}
-        for col, val in averages.items():
-            if col in alt_mapping:
-                # Use the standard name for this column
-                std_name = alt_mapping[col]
-                if std_name in std_averages:
-                    # If we already have data for this standard name, average it
-                    std_averages[std_name] = (std_averages[std_name] + val) / 2 if val is not None and std_averages[std_name] is not None else (std_averages[std_name] or val)
-                else:
-                    std_averages[std_name] = val
-            else:
-                std_averages[col] = val
-        
-        return jsonify({'team_number': team_number, 'averages': std_averages})
+
+        return jsonify({'team_number': team_number, 'averages': averages})
     
     except Exception as e:
         import traceback
@@ -560,33 +569,13 @@ def get_team_averages():
 @login_required
 def get_all_teams():
     try:
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        file_path = os.path.join(script_dir, 'qr_codes.xlsx')
+        # Team list precomputed for the live generation
+        table = get_dataset().tables['teams']
+        if isinstance(table, DerivedTableError):
+            return jsonify({'error': f"Error getting teams: {table.message}"}), 500
 
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file('https://1drv.ms/x/c/92449be8533c48f9/EdGR3Dz4EB5IlugK2iPoh7oBJuQd2jAF86NhnzLz2cLNVQ?e=xLYwEB', file_path)
-
-        # Read the Excel file
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
-
-        # Get all unique team numbers, excluding 0 and non-numeric values
-        team_numbers = []
-        for team in df['Team Number'].unique():
-            if pd.notna(team) and team != 0:
-                try:
-                    team_int = int(team)
-                    team_numbers.append(team_int)
-                except (ValueError, TypeError):
-                    # Skip non-numeric values
-                    continue
-
-        # Sort team numbers numerically
-        team_numbers.sort()
-
-        print(f"Found {len(team_numbers)} teams: {team_numbers[:10]}...")
-        return jsonify({'teams': team_numbers})
+        print(f"Found {len(table)} teams: {table[:10]}...")
+        return jsonify({'teams': table})
 
     except Exception as e:
         import traceback
@@ -597,98 +586,8 @@ def get_all_teams():
 @login_required
 def get_all_team_averages():
     try:
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        file_path = os.path.join(script_dir, 'qr_codes.xlsx')
-
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file('https://1drv.ms/x/c/92449be8533c48f9/EdGR3Dz4EB5IlugK2iPoh7oBJuQd2jAF86NhnzLz2cLNVQ?e=xLYwEB', file_path)
-
-        # Read the Excel file
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
-
-        print(f"Columns in Excel file: {df.columns.tolist()}")  # Debug
-
-        # Use the include_columns from GAME_CONFIG
-        include_columns = GAME_CONFIG.get('include_columns', [])
-        print(f"Include columns from config: {include_columns}")  # Debug
-
-        # Ensure Team Number is available
-        if 'Team Number' not in df.columns:
-            return jsonify({'error': 'Team Number column not found in Excel file'}), 500
-
-        # Get valid columns that exist in the dataframe
-        valid_columns = [col for col in include_columns if col in df.columns]
-        print(f"Valid columns found: {valid_columns}")  # Debug
-        
-        if not valid_columns:
-            # If we have no valid columns from config, use all numeric columns except Team Number and Match Number
-            numeric_columns = df.select_dtypes(include=['number']).columns.tolist()
-            valid_columns = [col for col in numeric_columns if col not in ['Team Number', 'Match Number']]
-            print(f"Using numeric columns instead: {valid_columns}")  # Debug
-            
-            if not valid_columns:
-                return jsonify({'error': 'No valid numeric data columns found in the Excel file'}), 400
-
-        # Create a DataFrame with just Team Number
-        result_df = pd.DataFrame({'Team Number': df['Team Number'].unique()})
-        result_df = result_df[result_df['Team Number'] != 0]  # Filter out Team 0
-
-        # For each column, calculate the average per team and join back to result_df
-        for col in valid_columns:
-            try:
-                # Convert to numeric, handling errors
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                # Calculate the average per team, but use max for Endgame Barge
-                if col == 'Endgame Barge':
-                    avg_df = df.groupby('Team Number')[col].max().reset_index()
-                else:
-                    avg_df = df.groupby('Team Number')[col].mean().reset_index()
-                
-                # Join to the result dataframe
-                result_df = result_df.merge(avg_df, on='Team Number', how='left')
-            except Exception as e:
-                print(f"Error processing column {col}: {e}")
-                # Skip this column if there's an error
-
-        # Set Team Number as the index
-        result_df = result_df.set_index('Team Number')
-        
-        # Handle NaN values (convert to None for proper JSON serialization)
-        result_df = result_df.where(pd.notna(result_df), None)
-        
-        # Convert to dictionary by team number
-        result_dict = {}
-        for team in result_df.index:
-            if pd.isna(team) or team == 0:
-                continue
-                
-            # Convert NumPy int64 to Python int for the team number key
-            team_int = int(team)
-                
-            team_data = {}
-            for col in result_df.columns:
-                value = result_df.loc[team, col]
-                # Handle special cases for JSON serialization - use numpy instead of pd.isinf
-                if pd.isna(value) or (isinstance(value, (int, float)) and np.isinf(value)):
-                    team_data[col] = None
-                else:
-                    # Convert NumPy types to native Python types
-                    if isinstance(value, np.integer):
-                        team_data[col] = int(value)
-                    elif isinstance(value, np.floating):
-                        team_data[col] = float(value)
-                    elif isinstance(value, np.ndarray):
-                        team_data[col] = value.tolist()
-                    else:
-                        team_data[col] = value
-            
-            result_dict[team_int] = team_data
-
-        # Return the result as JSON
-        return jsonify(result_dict)
+        # Per-team averages precomputed for the live generation
+        return derived_table_response('team_averages')
 
     except Exception as e:
         import traceback
@@ -701,41 +600,12 @@ def get_all_team_averages():
 @login_required
 def get_all_notes():
     try:
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        file_path = os.path.join(script_dir, 'qr_codes.xlsx')
-
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file('https://1drv.ms/x/c/92449be8533c48f9/EdGR3Dz4EB5IlugK2iPoh7oBJuQd2jAF86NhnzLz2cLNVQ?e=xLYwEB', file_path)
-
-        # Read the Excel file and immediately close it
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
+        # Get the notes columns (loaded lazily, separately from the numeric match data),
+        # with alternative column names already mapped to the standard names
+        df = load_match_notes()
         
         # Check if the necessary columns exist
         required_columns = ['Team Number', 'Match Number', 'Additional Observations', 'Scouter Name']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        # Look for alternative column names if original ones are missing
-        alternative_mappings = {
-            'Match Number': ['Match'],
-            'Team Number': ['Team'],
-            'Additional Observations': ['Notes', 'Comments', 'Observations'],
-            'Scouter Name': ['Scouter', 'Name']
-        }
-        
-        column_mapping = {}
-        for req_col in missing_columns:
-            for alt_col in alternative_mappings.get(req_col, []):
-                if alt_col in df.columns:
-                    column_mapping[alt_col] = req_col
-                    break
-        
-        # Rename columns if alternatives were found
-        if column_mapping:
-            df = df.rename(columns=column_mapping)
-        
-        # Check again after mapping
         still_missing = [col for col in required_columns if col not in df.columns]
         if still_missing:
             return jsonify({'error': f'Required columns missing: {", ".join(still_missing)}'}), 400
@@ -775,21 +645,11 @@ def get_match_data():
         if not team_number:
             return jsonify({'error': 'Team number is required.'}), 400
 
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        file_path = os.path.join(script_dir, 'qr_codes.xlsx')
-        print(f"Excel file path: {file_path}")  # Debugging statement
-
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file('https://1drv.ms/x/c/92449be8533c48f9/EdGR3Dz4EB5IlugK2iPoh7oBJuQd2jAF86NhnzLz2cLNVQ?e=xLYwEB', file_path)
-
-        # Check if the Excel file exists
-        if not os.path.exists(file_path):
-            return jsonify({'error': 'The Excel file was not found.'}), 404
+        print(f"Excel file path: {excel_file_path}")  # Debugging statement
 
-        # Read the Excel file
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
+        # Get the live dataset generation (raises FileNotFoundError if the download failed)
+        dataset = get_dataset()
+        df = dataset.frame
         print("Excel file read successfully")  # Debugging statement
         print(f"Column names: {df.columns}")  # Debugging statement
 
@@ -797,8 +657,8 @@ def get_match_data():
         if not team_number.isdigit() or int(team_number) == 0:
             return jsonify({'error': 'Please enter a valid team number.'}), 400
 
-        # Filter the dataframe by the team number
-        team_data = df[df['Team Number'] == int(team_number)]
+        # Look up the team's rows in the team index
+        team_data = dataset.team_rows(int(team_number))
         print(f"Filtered team data: {team_data}")  # Debugging statement
 
         if team_data.empty:
@@ -808,37 +668,17 @@ def get_match_data():
         standard_columns = ['Scouter Name', 'Match Number', 'Team Number']
         standard_columns.extend(GAME_CONFIG['include_columns'])
         
-        # Define mapping between standard column names and alternative column names
-        column_mapping = {
-            'Match Number': ['Match'],
-            'Scouter Name': ['Name'],
-            'Auto Coral L2/L3 (#)': ['Auto Coral L2 (#)', 'Auto Coral L3 (#)'],
-            'Auto Algae Net (#)': ['Auto Barge Algae'],
-            'Auto Algae Processor (#)': ['Auto Processor Algae'],
-            'Coral L2/L3 (#)': ['Coral L2 (#)', 'Coral L3 (#)'],
-            'Algae Net (#)': ['Barge Algae'],
-            'Algae Processor (#)': ['processor Algae']
-        }
-        
-        # Build list of columns to include, checking for alternative names
-        include_columns = []
-        for std_col in standard_columns:
-            if std_col in team_data.columns:
-                include_columns.append(std_col)
-            elif std_col in column_mapping:
-                for alt_col in column_mapping[std_col]:
-                    if alt_col in team_data.columns:
-                        include_columns.append(alt_col)
-                        break
+        # Build list of columns to include (alternative names were mapped when the data was loaded)
+        include_columns = [col for col in standard_columns if col in team_data.columns]
 
         # Filter columns based on include_columns that exist
         team_data_filtered = team_data[include_columns].copy()
         print(f"Filtered columns: {team_data_filtered.columns}")  # Debugging statement
 
-        # Calculate scores for each match
+        # Attach the scores precomputed for each match
         if 'Score' not in team_data_filtered.columns:
             try:
-                team_data_filtered['Score'] = team_data_filtered.apply(calculate_scores, axis=1)
+                team_data_filtered['Score'] = dataset.scores.loc[team_data_filtered.index]
                 print(f"Calculated scores: {team_data_filtered['Score']}")  # Debugging statement
             except Exception as e:
                 print(f"Error calculating scores: {e}")
@@ -846,7 +686,7 @@ def get_match_data():
                 team_data_filtered['Score'] = float('nan')
 
         # Convert the dataframe to a list of dictionaries
-        match_data = team_data_filtered.to_dict(orient='records')
+        match_data = json_records(team_data_filtered)
         print(f"Match data (first record): {match_data[0] if match_data else 'No data'}")  # Debugging statement
 
         return jsonify(match_data)
@@ -859,32 +699,46 @@ def get_match_data():
         return jsonify({'error': f'An unexpected error occurred: {e}'}), 500
     
     
-@app.route('/get_team_rankings', methods=['GET'])
+@app.route('/get_match', methods=['GET'])
 @login_required
-def get_team_rankings():
+def get_match():
     try:
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        file_path = os.path.join(script_dir, 'qr_codes.xlsx')
+        # Get the match number from the query parameters
+        match_number = request.args.get('match_number')
+        if not match_number or not match_number.isdigit():
+            return jsonify({'error': 'Please enter a valid match number.'}), 400
 
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file('https://1drv.ms/x/c/92449be8533c48f9/EdGR3Dz4EB5IlugK2iPoh7oBJuQd2jAF86NhnzLz2cLNVQ?e=xLYwEB', file_path)
+        # Look up every robot scouted in the match in the match index
+        dataset = get_dataset()
+        match_data = dataset.match_rows(int(match_number))
 
-        # Read the Excel file
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
+        if match_data.empty:
+            return jsonify({'error': f'No match data found for Match {match_number}.'}), 404
 
-        # Calculate scores for each match
-        df['Score'] = df.apply(calculate_scores, axis=1)
+        # Same columns as get_match_data, plus the alliance station
+        standard_columns = ['Scouter Name', 'Match Number', 'Team Number', 'Drive Team Location']
+        standard_columns.extend(GAME_CONFIG['include_columns'])
+        include_columns = [col for col in dict.fromkeys(standard_columns) if col in match_data.columns]
 
-        # Calculate total scores for each team
-        team_scores = df.groupby('Team Number')['Score'].sum().sort_values(ascending=False)
-        team_scores = team_scores[team_scores.index != 0]  # Exclude team 0
+        match_data = match_data[include_columns].copy()
+        match_data['Score'] = dataset.scores.loc[match_data.index]
+
+        return jsonify(json_records(match_data))
 
-        # Convert the series to a dictionary with integer keys
-        team_rankings = {int(team): float(score) for team, score in team_scores.items()}
+    except FileNotFoundError:
+        return jsonify({'error': 'The Excel file was not found.'}), 404
+    except Exception as e:
+        return jsonify({'error': f'An unexpected error occurred: {e}'}), 500
 
-        return jsonify(team_rankings)
+@app.route('/get_team_rankings', methods=['GET'])
+@login_required
+def get_team_rankings():
+    try:
+        # Rankings precomputed for the live generation
+        table = get_dataset().tables['rankings']
+        if isinstance(table, DerivedTableError):
+            return jsonify({'error': table.message})
+        return jsonify(table)
 
     except Exception as e:
         return jsonify({'error': str(e)})
@@ -893,24 +747,8 @@ def get_team_rankings():
 @login_required
 def get_team_match_counts():
     try:
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        file_path = os.path.join(script_dir, 'qr_codes.xlsx')
-
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file('https://1drv.ms/x/c/92449be8533c48f9/EdGR3Dz4EB5IlugK2iPoh7oBJuQd2jAF86NhnzLz2cLNVQ?e=xLYwEB', file_path)
-
-        # Read the Excel file
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
-
-        # Count matches for each team
-        team_counts = df.groupby('Team Number').size().to_dict()
-        
-        # Convert keys to strings for JSON serialization
-        match_counts = {str(int(team)): count for team, count in team_counts.items() if team != 0}
-        
-        return jsonify(match_counts)
+        # Match counts precomputed for the live generation
+        return derived_table_response('match_counts')
 
     except Exception as e:
         import traceback
@@ -936,15 +774,8 @@ def calculate_match_points():
         else:
             scoring_rules = GAME_CONFIG['scoring_rules']
 
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        file_path = os.path.join(script_dir, 'qr_codes.xlsx')
-
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file('https://1drv.ms/x/c/92449be8533c48f9/EdGR3Dz4EB5IlugK2iPoh7oBJuQd2jAF86NhnzLz2cLNVQ?e=xLYwEB', file_path)
-
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
+        # Get the shared match data (parsed once per workbook version)
+        df = load_match_data()
 
         # Use include_columns from the configuration
         include_columns = GAME_CONFIG['include_columns']
@@ -955,9 +786,8 @@ def calculate_match_points():
         if not valid_columns:
             return jsonify({'error': 'No valid data columns found in the Excel file'})
 
-        df_filtered = df[valid_columns]
-        df_filtered = df_filtered.apply(pd.to_numeric, errors='coerce')
-        df_filtered['Team Number'] = df['Team Number']
+        # Columns were already converted to numbers when the data was loaded (widened to average at full precision)
+        df_filtered = widen_floats(df[valid_columns + ['Team Number']])
 
         team_averages = df_filtered.groupby('Team Number').mean()
 
@@ -1011,112 +841,109 @@ def compare_teams():
         if not teams:
             return jsonify({'error': 'Please provide at least one team number'})
             
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        file_path = os.path.join(script_dir, 'qr_codes.xlsx')
-
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file('https://1drv.ms/x/c/92449be8533c48f9/EdGR3Dz4EB5IlugK2iPoh7oBJuQd2jAF86NhnzLz2cLNVQ?e=xLYwEB', file_path)
-
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
+        # Get the live dataset generation
+        dataset = get_dataset()
         
-        # Get team rankings for scoring context
+        # Get team rankings for scoring context (rankings table is ordered best first)
         team_rankings = {}
-        df['Score'] = df.apply(calculate_scores, axis=1)
-        team_scores = df.groupby('Team Number')['Score'].sum().sort_values(ascending=False)
-        team_scores = team_scores[team_scores.index != 0]  # Exclude team 0
+        rankings = dataset.tables['rankings']
+        if isinstance(rankings, DerivedTableError):
+            rankings = {}
         
-        for rank, (team, _) in enumerate(team_scores.items(), 1):
-            team_rankings[int(team)] = rank
+        for rank, team in enumerate(rankings, 1):
+            team_rankings[team] = rank
         
-        # Get the averages for each team
-        result = {}
-        for team_str in teams:
-            try:
-                team = int(team_str)
-                if team == 0:
-                    continue
+        # Get the averages for each team (phones comparing the same teams at the same time share one computation)
+        def compare():
+            result = {}
+            for team_str in teams:
+                try:
+                    team = int(team_str)
+                    if team == 0:
+                        continue
                 
-                # Get team data
-                team_data = df[df['Team Number'] == team]
+                    # Get team data from the team index
+                    team_data = dataset.team_rows(team)
                 
-                if team_data.empty:
-                    result[team_str] = {'error': 'No data found for this team'}
-                    continue
+                    if team_data.empty:
+                        result[team_str] = {'error': 'No data found for this team'}
+                        continue
                 
-                # Extract averages for key metrics
-                team_result = {}
+                    # Extract averages for key metrics
+                    team_result = {}
                 
-                # Add team number and rank
-                team_result['team_number'] = team
-                team_result['rank'] = team_rankings.get(team, None)
+                    # Add team number and rank
+                    team_result['team_number'] = team
+                    team_result['rank'] = team_rankings.get(team, None)
                 
-                # Calculate auto score using new column names
-                auto_score = 0
-                if 'Leave Bonus (T/F)' in team_data.columns:
-                    auto_leave = team_data['Leave Bonus (T/F)'].mean()
-                    if auto_leave > 0.5:  # If average is more than 0.5, count it as boolean true
-                        auto_score += 3  # Points for leaving the start zone
+                    # Calculate auto score using new column names
+                    auto_score = 0
+                    if 'Leave Bonus (T/F)' in team_data.columns:
+                        auto_leave = team_data['Leave Bonus (T/F)'].mean()
+                        if auto_leave > 0.5:  # If average is more than 0.5, count it as boolean true
+                            auto_score += 3  # Points for leaving the start zone
                 
-                # Add auto scores for game pieces
-                auto_score_columns = [
-                    'Auto Coral L1 (#)', 'Auto Coral L2/L3 (#)', 'Auto Coral L4 (#)', 
-                    'Auto Coral Unclear (#)', 'Auto Algae Net (#)', 'Auto Algae Processor (#)'
-                ]
+                    # Add auto scores for game pieces
+                    auto_score_columns = [
+                        'Auto Coral L1 (#)', 'Auto Coral L2/L3 (#)', 'Auto Coral L4 (#)', 
+                        'Auto Coral Unclear (#)', 'Auto Algae Net (#)', 'Auto Algae Processor (#)'
+                    ]
                 
-                for col in auto_score_columns:
-                    if col in team_data.columns and col in GAME_CONFIG['scoring_rules']:
-                        auto_score += (team_data[col].mean() or 0) * GAME_CONFIG['scoring_rules'][col]
+                    for col in auto_score_columns:
+                        if col in team_data.columns and col in GAME_CONFIG['scoring_rules']:
+                            auto_score += (team_data[col].mean() or 0) * GAME_CONFIG['scoring_rules'][col]
                 
-                team_result['auto_score'] = float(auto_score)
+                    team_result['auto_score'] = float(auto_score)
                 
-                # Calculate teleop score using new column names
-                teleop_score = 0
-                teleop_score_columns = [
-                    'Coral L1 (#)', 'Coral L2/L3 (#)', 'Coral L4 (#)', 
-                    'Coral Unclear (#)', 'Algae Net (#)', 'Algae Processor (#)'
-                ]
+                    # Calculate teleop score using new column names
+                    teleop_score = 0
+                    teleop_score_columns = [
+                        'Coral L1 (#)', 'Coral L2/L3 (#)', 'Coral L4 (#)', 
+                        'Coral Unclear (#)', 'Algae Net (#)', 'Algae Processor (#)'
+                    ]
                 
-                for col in teleop_score_columns:
-                    if col in team_data.columns and col in GAME_CONFIG['scoring_rules']:
-                        teleop_score += (team_data[col].mean() or 0) * GAME_CONFIG['scoring_rules'][col]
+                    for col in teleop_score_columns:
+                        if col in team_data.columns and col in GAME_CONFIG['scoring_rules']:
+                            teleop_score += (team_data[col].mean() or 0) * GAME_CONFIG['scoring_rules'][col]
                 
-                # Add endgame barge points
-                if 'Endgame Barge' in team_data.columns:
-                    avg_barge = team_data['Endgame Barge'].mean() or 0
-                    # Round to nearest integer for lookup
-                    barge_key = str(int(round(avg_barge)))
-                    if barge_key in GAME_CONFIG['scoring_rules']['Endgame Barge']:
-                        teleop_score += GAME_CONFIG['scoring_rules']['Endgame Barge'][barge_key]
+                    # Add endgame barge points
+                    if 'Endgame Barge' in team_data.columns:
+                        avg_barge = team_data['Endgame Barge'].mean() or 0
+                        # Round to nearest integer for lookup
+                        barge_key = str(int(round(avg_barge)))
+                        if barge_key in GAME_CONFIG['scoring_rules']['Endgame Barge']:
+                            teleop_score += GAME_CONFIG['scoring_rules']['Endgame Barge'][barge_key]
                 
-                team_result['teleop_score'] = float(teleop_score)
+                    team_result['teleop_score'] = float(teleop_score)
                 
-                # Calculate total score
-                team_result['total_score'] = team_result['auto_score'] + team_result['teleop_score']
+                    # Calculate total score
+                    team_result['total_score'] = team_result['auto_score'] + team_result['teleop_score']
                 
-                # Calculate defense rating if available
-                if 'Defense Performed' in team_data.columns:
-                    defense_rating = team_data['Defense Performed'].mean() or 0
-                    team_result['defense_rating'] = float(defense_rating)
+                    # Calculate defense rating if available
+                    if 'Defense Performed' in team_data.columns:
+                        defense_rating = team_data['Defense Performed'].mean() or 0
+                        team_result['defense_rating'] = float(defense_rating)
                 
-                # Add fouls if available
-                if 'Minor Fouls' in team_data.columns:
-                    team_result['minor_fouls'] = float(team_data['Minor Fouls'].mean() or 0)
+                    # Add fouls if available
+                    if 'Minor Fouls' in team_data.columns:
+                        team_result['minor_fouls'] = float(team_data['Minor Fouls'].mean() or 0)
                 
-                if 'Major Fouls' in team_data.columns:
-                    team_result['major_fouls'] = float(team_data['Major Fouls'].mean() or 0)
+                    if 'Major Fouls' in team_data.columns:
+                        team_result['major_fouls'] = float(team_data['Major Fouls'].mean() or 0)
                 
-                # Add all the averages from include_columns that exist in the data
-                for col in GAME_CONFIG['include_columns']:
-                    if col in team_data.columns:
-                        team_result[col] = float(team_data[col].mean() or 0)
+                    # Add all the averages from include_columns that exist in the data
+                    for col in GAME_CONFIG['include_columns']:
+                        if col in team_data.columns:
+                            team_result[col] = float(team_data[col].mean() or 0)
                 
-                result[team_str] = team_result
+                    result[team_str] = team_result
                 
-            except ValueError:
-                result[team_str] = {'error': 'Invalid team number'}
-            
+                except ValueError:
+                    result[team_str] = {'error': 'Invalid team number'}
+            return result
+
+        result = single_flight.do('compare_teams', (dataset.data_version, dataset.version.digest,
+                                                    dataset.config_signature) + tuple(teams), compare)
         return jsonify(result)
         
     except Exception as e:
@@ -1126,115 +953,336 @@ def compare_teams():
 @login_required
 def get_defense_teams():
     try:
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        file_path = os.path.join(script_dir, 'qr_codes.xlsx')
+        # Defense table precomputed for the live generation
+        return derived_table_response('defense')
 
-        # Download the file if it does not exist locally
-        if not os.path.exists(file_path):
-            download_excel_file('https://1drv.ms/x/c/92449be8533c48f9/EdGR3Dz4EB5IlugK2iPoh7oBJuQd2jAF86NhnzLz2cLNVQ?e=xLYwEB', file_path)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
 
-        # Read the Excel file
-        with pd.ExcelFile(file_path, engine='openpyxl') as xls:
-            df = pd.read_excel(xls, sheet_name='Match Data')
-            
-        # Check if defense metrics exist in the data
-        defense_metrics = []
-        if 'Defense Performed' in df.columns:
-            defense_metrics.append('Defense Performed')
-        if 'Defense Quality' in df.columns:
-            defense_metrics.append('Defense Quality')
-        if 'Defense Time' in df.columns:
-            defense_metrics.append('Defense Time')
-            
-        if not defense_metrics:
-            # If no explicit defense columns, create a simpler metric based on breakdowns and fouls
-            df['Defense Rating'] = 0
-            
-            # Teams that break down less frequently might be more reliable for defense
-            if 'Broke (T/F)' in df.columns:
-                # Lower break rate is better for defense (invert the value)
-                df['Defense Rating'] += (1 - df['Broke (T/F)'].fillna(0)) * 2
-            
-            # Teams with more fouls might be playing more aggressively on defense
-            if 'Major Fouls' in df.columns or 'Minor Fouls' in df.columns:
-                if 'Major Fouls' in df.columns:
-                    # Normalize major fouls to a 0-1 scale for the dataset
-                    max_fouls = df['Major Fouls'].max() if df['Major Fouls'].max() > 0 else 1
-                    df['Defense Rating'] += df['Major Fouls'].fillna(0) / max_fouls
-                
-                if 'Minor Fouls' in df.columns:
-                    # Normalize minor fouls to a 0-1 scale but with less weight than major fouls
-                    max_fouls = df['Minor Fouls'].max() if df['Minor Fouls'].max() > 0 else 1
-                    df['Defense Rating'] += (df['Minor Fouls'].fillna(0) / max_fouls) * 0.5
-            
-            defense_metrics = ['Defense Rating']
-        
-        # Group by team and calculate defense metrics
-        team_defense = df.groupby('Team Number')[defense_metrics].mean().reset_index()
-        
-        # Process the data to ensure metrics are in proper ranges
-        for col in defense_metrics:
-            if col == 'Defense Performed':
-                # Ensure Defense Performed is in 0-1 range (representing percentage)
-                # If values are already large (>1), assume they're incorrectly scaled
-                if team_defense[col].max() > 1:
-                    # If values appear to be already in percentage (e.g., 65 for 65%)
-                    # convert to proper 0-1 scale
-                    team_defense[col] = team_defense[col] / 100
-                    
-                # Cap at 1.0 to ensure percentage is valid
-                team_defense[col] = team_defense[col].clip(0, 1)
-            
-            elif col == 'Defense Quality':
-                # Normalize to a 0-5 scale if not already
-                if team_defense[col].max() > 5:
-                    team_defense[col] = (team_defense[col] / team_defense[col].max()) * 5
-        
-        # Calculate an overall defense score (weighted average if multiple metrics exist)
-        if len(defense_metrics) > 1:
-            # Create a weighted average based on metric importance
-            weights = {
-                'Defense Performed': 0.4,
-                'Defense Quality': 0.4,
-                'Defense Time': 0.2,
-                'Defense Rating': 1.0
-            }
-            
-            team_defense['Overall Defense'] = sum(
-                team_defense[metric] * weights.get(metric, 0.3) 
-                for metric in defense_metrics
-            )
+@app.route('/changes', methods=['GET'])
+@login_required
+def get_changes():
+    try:
+        # Per-team table changes and new matches since the client's data version; with ?event= / ?day=
+        # the versions are those of the filtered dataset, which has its own change log
+        since = request.args.get('since', type=int)
+        event, day = partition_filter()
+        if event or day:
+            changes = event_partitions.changes(event, day, since)
+            if changes is None:
+                return jsonify({'error': f"No match data for event {event or 'any'}, day {day or 'any'}"}), 404
+            return jsonify(changes)
+
+        get_dataset()
+        changes = reload_pipeline.changes.changes(since)
+        if changes is None:
+            return jsonify({'error': 'No match data loaded'}), 404
+        return jsonify(changes)
+
+    except FileNotFoundError:
+        return jsonify({'error': 'The Excel file was not found.'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/ingest', methods=['POST'])
+@login_required
+def ingest_rows():
+    try:
+        start = time.perf_counter()
+        # Batches of rows as JSON, CSV or QR code text (one code per line); ?format= overrides detection
+        records, rejected = parse_batch(request.get_data(as_text=True), request.content_type, GAME_CONFIG,
+                                        request.args.get('format'))
+        valid, invalid, ignored = validate_rows(records, GAME_CONFIG)
+        # Report positions in the posted batch for rows rejected by either step
+        unread = {r['row'] for r in rejected}
+        valid_positions = [i for i in range(len(records) + len(rejected)) if i not in unread]
+        rejected += [{'row': valid_positions[r['row']], 'error': r['error']} for r in invalid]
+        if not valid:
+            return jsonify({'error': 'No valid rows', 'rejected': rejected, 'ignored_columns': ignored}), 400
+
+        # A QR code scanned twice, or a batch sent again, is already in the dataset
+        valid, duplicates = reload_pipeline.drop_known_rows(valid, GAME_CONFIG)
+        if not valid:
+            dataset = reload_pipeline.dataset
+            return jsonify({'success': True, 'batch': None, 'accepted': 0, 'duplicates': duplicates,
+                            'rejected': sorted(rejected, key=lambda r: r['row']), 'ignored_columns': ignored,
+                            'version': dataset.data_version if dataset is not None else None})
+
+        # Durable first, then queued for the pipeline, which folds it in as an append; ?event= tags the
+        # batch so it can be cleared with that event's rows
+        batch = ingest_journal.append(valid, source=session.get('user_id'), event=request.args.get('event'))
+        reload_pipeline.add_live_rows(valid)
+        dataset = reload_pipeline.dataset
+        elapsed = time.perf_counter() - start
+        print(f"Ingested {len(valid)} rows (batch {batch}, {duplicates} duplicates, {len(rejected)} rejected) "
+              f"in {elapsed * 1000:.0f} ms")
+        return jsonify({
+            'success': True,
+            'batch': batch,
+            'accepted': len(valid),
+            'duplicates': duplicates,
+            'rejected': sorted(rejected, key=lambda r: r['row']),
+            'ignored_columns': ignored,
+            # The rows are in the next version; poll /changes?since= for it
+            'queued': True,
+            'version': dataset.data_version if dataset is not None else None,
+            'elapsed_ms': round(elapsed * 1000, 1)
+        })
+
+    except IngestError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/ingest/clear', methods=['POST'])
+@login_required
+def clear_ingested_rows():
+    try:
+        # Drop the journaled live rows of ?event= (every live row without it), e.g. once an event is over
+        event = request.values.get('event') or None
+        removed = reload_pipeline.clear_live_rows(event)
+        print(f"Cleared {removed} ingested rows" + (f" of event {event}" if event else ""))
+        return jsonify({'success': True, 'event': event, 'removed': removed,
+                        'remaining': len(reload_pipeline.live_records)})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/get_duplicates', methods=['GET'])
+@login_required
+def get_duplicates():
+    try:
+        # Exact duplicates dropped and team-match conflicts merged in the live generation
+        get_dataset()
+        report = reload_pipeline.dedup_report
+        if report is None:
+            return jsonify({'error': 'No match data loaded'}), 404
+        return jsonify(report)
+
+    except FileNotFoundError:
+        return jsonify({'error': 'The Excel file was not found.'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/data_quality', methods=['GET'])
+@login_required
+def get_data_quality():
+    try:
+        # Schema violations, out-of-range values and per-team outliers of the live (or filtered) generation
+        return jsonify(data_quality.report(get_dataset()))
+
+    except FileNotFoundError:
+        return jsonify({'error': 'The Excel file was not found.'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Function to describe the live generation for the public /healthz and /readyz probes: versions,
+# row count and ages only, nothing about where the data comes from or what went wrong
+def probe_status():
+    dataset = shared_reader.current() if shared_reader is not None else reload_pipeline.dataset
+    now = time.time()
+    return {
+        'data_version': dataset.data_version if dataset is not None else None,
+        'generation': dataset.generation if dataset is not None else None,
+        'rows': len(dataset.frame) if dataset is not None else 0,
+        # Age of the workbook the data came from, and of the generation built from it
+        'data_age_seconds': round(now - dataset.version.mtime, 1) if dataset is not None else None,
+        'generation_age_seconds': round(now - dataset.built_at, 1) if dataset is not None else None
+    }
+
+# Function to describe the live generation and the caches, downloads and sources behind it, for /status
+def data_status():
+    status = probe_status()
+    status.update({
+        'live_rows': reload_pipeline.published_live_rows,
+        'journal': {'rows': ingest_journal.row_count, 'compacted_rows': ingest_journal.compacted_rows},
+        'last_error': reload_pipeline.last_error,
+        'cache': {
+            'workbook_parses': match_repository.parse_count,
+            'sidecar_loads': match_repository.sidecar_loads,
+            'derived_hits': derived_cache.hits,
+            'derived_misses': derived_cache.misses,
+            'derived_saves': derived_cache.saves,
+            'full_rebuilds': reload_pipeline.full_rebuild_count,
+            'incremental_updates': reload_pipeline.incremental_count,
+            'cached_loads': reload_pipeline.cached_load_count,
+            'quality_reports': len(data_quality.reports),
+            'shared_mode': shared_dataset_mode,
+            'shared_publishes': shared_writer.publish_count if shared_writer is not None else None,
+            'shared_attaches': shared_reader.attach_count if shared_reader is not None else None
+        },
+        'download': workbook_downloader.stats(),
+        'refresh': refresh_scheduler.status() if download_thread is not None else None,
+        'sources': data_sources.report(),
+        'single_flight': single_flight.stats()
+    })
+    return status
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness: the server answers, with the versions and ages of its data (no login, for monitoring)
+    try:
+        return jsonify(dict(probe_status(), status='ok'))
+    except Exception as e:
+        print(f"Health check failed: {str(e)}")
+        return jsonify({'status': 'error'}), 500
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    # Readiness: 200 once the warm-up succeeded and a dataset is live, 503 until then or if it failed
+    try:
+        status = probe_status()
+        ready = warmup_status['state'] == 'ready' and status['data_version'] is not None
+        status.update(status='ready' if ready else 'not ready', warmup=warmup_status['state'])
+        return jsonify(status), 200 if ready else 503
+    except Exception as e:
+        print(f"Readiness check failed: {str(e)}")
+        return jsonify({'status': 'error'}), 500
+
+@app.route('/status', methods=['GET'])
+@login_required
+def get_status():
+    # Detailed state behind the probes: caches, downloads, sources, errors and the warm-up stages
+    try:
+        return jsonify(dict(data_status(), warmup=warmup_status))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/data_sources', methods=['GET'])
+@login_required
+def get_data_sources():
+    # Freshness and fetch latency of every data source
+    try:
+        return jsonify({'sources': data_sources.report(), 'refresh': refresh_scheduler.status()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/export_rows', methods=['GET'])
+@peer_or_login_required
+def export_rows():
+    # Canonical rows of the live generation, for servers that list this one as a peer data source
+    try:
+        dataset = get_dataset()
+        # Tagged by row content rather than data version, so two servers listing each other as
+        # peers stop re-reading each other once their rows agree
+        content = hashlib.sha256(json.dumps(list(dataset.frame.columns)).encode('utf-8'))
+        content.update(np.ascontiguousarray(dataset.row_hashes, dtype=np.uint64).tobytes())
+        etag = f'"{content.hexdigest()[:24]}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = make_response('', 304)
         else:
-            # Just use the single metric
-            team_defense['Overall Defense'] = team_defense[defense_metrics[0]]
-        
-        # Sort by defense score (descending)
-        team_defense = team_defense.sort_values('Overall Defense', ascending=False)
-        
-        # Filter out team 0 and any invalid teams
-        team_defense = team_defense[team_defense['Team Number'] > 0]
-        
-        # Convert to a dictionary
-        defense_teams = {}
-        for _, row in team_defense.iterrows():
-            team_number = int(row['Team Number'])
-            defense_score = float(row['Overall Defense'])
-            
-            # Include the component metrics in the result
-            metrics = {metric: float(row[metric]) for metric in defense_metrics}
-            
-            defense_teams[team_number] = {
-                'score': defense_score,
-                'metrics': metrics
-            }
-        
-        return jsonify(defense_teams)
-    
+            # Concurrent peers share one encoding per generation
+            body = single_flight.do('export_rows', (dataset.data_version, etag),
+                lambda: '{"data_version": %d, "columns": %s, "rows": %s}' % (
+                    dataset.data_version, json.dumps(list(dataset.frame.columns)),
+                    dataset.frame.to_json(orient='records')))
+            response = app.response_class(body, mimetype='application/json')
+        response.headers['ETag'] = etag
+        return response
+    except FileNotFoundError:
+        return jsonify({'error': 'The Excel file was not found.'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/refresh_now', methods=['POST'])
+@login_required
+def refresh_now():
+    # Check every data source now instead of waiting for the next scheduled fetch
+    try:
+        if download_thread is None:
+            return jsonify({'error': 'This server does not fetch any data source'}), 409
+        refresh_scheduler.trigger()
+        return jsonify({'success': True, 'refresh': refresh_scheduler.status()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/get_memory_report', methods=['GET'])
+@login_required
+def get_memory_report():
+    try:
+        # Per-column bytes before and after the compact dtypes, for the live generation
+        return jsonify(get_dataset().memory_summary())
+
+    except FileNotFoundError:
+        return jsonify({'error': 'The Excel file was not found.'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/get_partitions', methods=['GET'])
+@login_required
+def get_partitions():
+    try:
+        # Events and days available as ?event= / ?day= filters on the data routes
+        return jsonify({'partitions': event_partitions.list_partitions()})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/get_season_aggregates', methods=['GET'])
+@login_required
+def get_season_aggregates():
+    try:
+        # Per-team counts, means, standard deviations, maxima and score histograms across all events
+        return jsonify(season_aggregator.get())
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/get_snapshots', methods=['GET'])
+@login_required
+def get_snapshots():
+    try:
+        # Every stored download, newest first, with the one currently loaded
+        dataset = reload_pipeline.dataset
+        return jsonify({
+            'snapshots': snapshot_store.list_snapshots(),
+            'current': dataset.version.digest if dataset is not None else None
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/diff_snapshots', methods=['GET'])
+@login_required
+def diff_snapshots():
+    try:
+        # Defaults to the two most recent downloads
+        snapshots = snapshot_store.list_snapshots()
+        old = request.args.get('old') or (snapshots[1]['digest'] if len(snapshots) > 1 else None)
+        new = request.args.get('new') or (snapshots[0]['digest'] if snapshots else None)
+        old_digest = snapshot_store.resolve(old)
+        new_digest = snapshot_store.resolve(new)
+        if old_digest is None or new_digest is None:
+            return jsonify({'error': 'Unknown or ambiguous snapshot'}), 404
+
+        return jsonify(snapshot_store.diff(old_digest, new_digest))
+
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/restore_snapshot', methods=['POST'])
+@login_required
+def restore_snapshot():
+    try:
+        digest = snapshot_store.resolve(request.form.get('snapshot'))
+        if digest is None:
+            return jsonify({'error': 'Unknown or ambiguous snapshot'}), 404
+
+        # The next scheduled download replaces the restored workbook again
+        if not snapshot_store.restore(digest, excel_file_path):
+            return jsonify({'error': 'Snapshot file is missing'}), 404
+        reload_pipeline.request_reload()
+        return jsonify({'success': True, 'snapshot': digest})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/save_do_not_pick_list', methods=['POST'])
 @login_required
 def save_do_not_pick_list():
@@ -1723,6 +1771,70 @@ def update_server_display():
                 server_info_text.insert(tk.END, f"{temp['name']} - {temp['label']}: {temp['current']}°C\n")
             server_info_text.insert(tk.END, "\n")
         
+        # Data quality of the live generation, as checked by the pipeline (never computed on the Tk thread)
+        dataset = reload_pipeline.dataset
+        quality = data_quality.cached(dataset) if dataset is not None else None
+        if dataset is not None and quality is None:
+            server_info_text.insert(tk.END, "DATA QUALITY\n", "section_heading")
+            server_info_text.insert(tk.END, f"Checking data version {dataset.data_version}...\n\n")
+        elif quality is not None:
+            summary = quality['summary']
+            server_info_text.insert(tk.END, "DATA QUALITY\n", "section_heading")
+            server_info_text.insert(tk.END, f"Data Version: {quality['data_version']} ({quality['rows']} rows)\n")
+            server_info_text.insert(tk.END, f"Rows Flagged: {summary['rows_flagged']}\n")
+            server_info_text.insert(tk.END, f"Schema Violations: {summary['schema_violations']}\n")
+            server_info_text.insert(tk.END, f"Out-of-Range Values: {summary['out_of_range']}\n")
+            server_info_text.insert(tk.END, f"Team Outliers: {summary['outliers']}\n")
+            if quality['missing_columns']:
+                server_info_text.insert(tk.END, f"Missing Columns: {', '.join(quality['missing_columns'])}\n")
+            for issue in quality['issues'][:5]:
+                server_info_text.insert(tk.END, f"  Team {issue['team_number']} Match {issue['match_number']} "
+                                                f"- {issue['column']}: {issue['value']} ({issue['detail']})\n")
+            server_info_text.insert(tk.END, "\n")
+
+        # Workbook refresh schedule (only on the server that downloads the workbook)
+        if download_thread is not None:
+            refresh = refresh_scheduler.status()
+            downloads = workbook_downloader.stats()
+            server_info_text.insert(tk.END, "DATA REFRESH\n", "section_heading")
+            server_info_text.insert(tk.END, f"Effective Interval: {refresh['interval_seconds']:.0f} s "
+                                            f"(base {refresh['base_interval_seconds']:.0f} s)\n")
+            if refresh['next_check_in_seconds'] is not None:
+                server_info_text.insert(tk.END, f"Next Check In: {refresh['next_check_in_seconds']:.0f} s\n")
+            for label, stamp in (('Last Check', refresh['last_check']), ('Last Change', refresh['last_change'])):
+                when = datetime.fromtimestamp(stamp).strftime('%H:%M:%S') if stamp else 'Never'
+                server_info_text.insert(tk.END, f"{label}: {when}\n")
+            server_info_text.insert(tk.END, f"Last Result: {downloads['last_result'] or 'None'}"
+                                            f" ({refresh['streak']} in a row)\n")
+            server_info_text.insert(tk.END, f"Downloads: {downloads['downloaded']} new, "
+                                            f"{downloads['not_modified'] + downloads['unchanged']} unchanged, "
+                                            f"{downloads['errors'] + downloads['rejected']} failed\n")
+            server_info_text.insert(tk.END, "\n")
+
+        # Data sources: rows, freshness and fetch latency of each
+        sources = data_sources.report()
+        if sources:
+            server_info_text.insert(tk.END, "DATA SOURCES\n", "section_heading")
+            for source in sources:
+                rows = f"{source['rows']} rows" if source['rows'] is not None else 'main workbook'
+                age = f"changed {source['age_seconds']:.0f} s ago" if source['age_seconds'] is not None else 'no data yet'
+                latency = f"{source['latency_ms']:.0f} ms" if source['latency_ms'] is not None else '-'
+                server_info_text.insert(tk.END, f"{source['name']} ({source['type']}): {rows}, {age}, "
+                                                f"fetch {latency}, {source['last_result'] or 'not fetched'}\n")
+                if source['last_error']:
+                    server_info_text.insert(tk.END, f"  Error: {source['last_error']}\n")
+            server_info_text.insert(tk.END, "\n")
+
+        # Request coalescing: calls that waited for an identical running computation instead of repeating it
+        flights = single_flight.stats()
+        in_flight = flights.pop('in_flight')
+        server_info_text.insert(tk.END, "REQUEST COALESCING\n", "section_heading")
+        server_info_text.insert(tk.END, f"Running Now: {in_flight}\n")
+        for operation, counters in sorted(flights.items()):
+            server_info_text.insert(tk.END, f"{operation}: {counters['calls']} calls, {counters['executions']} computed, "
+                                            f"{counters['coalesced']} coalesced\n")
+        server_info_text.insert(tk.END, "\n")
+
         # Connected clients
         server_info_text.insert(tk.END, "CLIENT INFORMATION\n", "section_heading")
         server_info_text.insert(tk.END, f"Connected Clients: {metrics['client_count']}\n\n")
@@ -1855,6 +1967,9 @@ def update_config():
         
         # Log the configuration update
         print(f"Configuration updated from frontend: {GAME_CONFIG}")
+
+        # Rebuild the scores and derived tables for the new configuration in the background
+        reload_pipeline.request_reload()
         
         return jsonify({'success': True, 'message': 'Configuration updated successfully'})
     
@@ -1869,6 +1984,13 @@ def update_config():
 server_logs = []
 MAX_LOGS = 100
 
+# Function to add a timestamped entry to the log shown in the server window
+def add_server_log(message):
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    server_logs.append(f"[{timestamp}] {message}")
+    if len(server_logs) > MAX_LOGS:
+        server_logs.pop(0)  # Remove oldest log
+
 @app.route('/ai_query', methods=['POST'])
 @login_required
 def ai_query():
@@ -1938,7 +2060,94 @@ def update_ai_mode():
         print(traceback_str)
         return jsonify({'error': f"Server error: {str(e)}"}), 500
 
+# Progress of the startup warm-up: its state is reported by /readyz, the stages and any error by /status
+warmup_status = {'state': 'pending', 'stage': None, 'stages': [], 'started': None, 'finished': None, 'error': None}
+
+# Function to run one warm-up stage, timing it and logging its progress to the server window
+def warmup_stage(name, func):
+    warmup_status['stage'] = name
+    start = time.perf_counter()
+    detail = func()
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    warmup_status['stages'].append({'stage': name, 'ms': elapsed_ms, 'detail': detail})
+    add_server_log(f"Warm-up: {name} - {detail} ({elapsed_ms:.0f} ms)")
+    return detail
+
+# Function to load everything the first requests need: the workbook, its canonical schema, every
+# derived table (from the persistent cache when unchanged), the notes and the data-quality report
+def warm_up():
+    warmup_status.update(state='running', started=time.time())
+    add_server_log("Warm-up started")
+    try:
+        def download_workbook():
+            if os.path.exists(excel_file_path):
+                return f"{os.path.basename(excel_file_path)} on disk"
+            if fetch_workbook():
+                return f"downloaded {os.path.basename(excel_file_path)}"
+            raise FileNotFoundError(f"No match data available from {excel_file_path}")
+
+        def parse_workbook():
+            frame = match_repository.get_frame()
+            source = 'sidecar' if match_repository.sidecar_loads else 'workbook'
+            return f"{len(frame)} rows from the {source}"
+
+        def resolve_schema():
+            # Resolved under the workbook's hash, so the pipeline reuses this frame
+            version = match_repository.get_version()
+            frame = schema_resolver.resolve(match_repository.get_frame(), GAME_CONFIG, frame_key=version.digest)
+            return f"{len(frame.columns)} canonical columns"
+
+        def build_tables():
+            dataset = reload_pipeline.reload()
+            if dataset is None:
+                raise RuntimeError(reload_pipeline.last_error or 'No dataset could be built')
+            source = 'loaded from cache' if reload_pipeline.cached_load_count else 'computed'
+            return f"generation {dataset.generation}, {len(dataset.tables)} tables {source}"
+
+        def prime_notes():
+            return f"{len(load_match_notes())} note rows"
+
+        def prime_quality():
+            summary = data_quality.report(reload_pipeline.dataset)['summary']
+            return f"{summary['rows_flagged']} rows flagged"
+
+        def attach_shared():
+            dataset = shared_reader.current()
+            if dataset is None:
+                raise FileNotFoundError(f"No match data published in {shared_dataset_dir}")
+            return f"data version {dataset.data_version}, {len(dataset.frame)} rows"
+
+        if shared_reader is not None:
+            # The publishing process did the parsing and building
+            warmup_stage('attach shared dataset', attach_shared)
+        else:
+            warmup_stage('workbook', download_workbook)
+            warmup_stage('parse', parse_workbook)
+            warmup_stage('schema', resolve_schema)
+            warmup_stage('derived tables', build_tables)
+            warmup_stage('notes', prime_notes)
+            warmup_stage('data quality', prime_quality)
+        warmup_status['state'] = 'ready'
+    except Exception as e:
+        # Serve anyway: requests load the data on demand, and /readyz and /status report the failure
+        warmup_status.update(state='failed', error=str(e))
+        print(f"Warm-up failed: {e}")
+    warmup_status['finished'] = time.time()
+    add_server_log(f"Warm-up {warmup_status['state']} in {warmup_status['finished'] - warmup_status['started']:.1f} s")
+    # Reloads from now on happen in the background (after a failed warm-up too, so a workbook that
+    # appears later is still picked up)
+    if shared_reader is None:
+        reload_pipeline.start()
+
 def start_flask():
+    # Load the data before the port opens, so the first phones to connect do not wait on parsing.
+    # A slow download or parse does not hold the server back longer than warmup_timeout seconds.
+    warmup_thread = threading.Thread(target=warm_up, name='WarmUp', daemon=True)
+    warmup_thread.start()
+    warmup_thread.join(config_loader.get_value('warmup_timeout', 60, section='server'))
+    if warmup_thread.is_alive():
+        add_server_log("Warm-up still running, opening the port anyway")
+
     # Get local IP addresses for easier connection
     try:
         hostname = socket.gethostname()
@@ -2017,6 +2226,15 @@ header_label.pack(side=tk.LEFT, padx=10)
 refresh_button = tk.Button(header_frame, text="Manual Refresh", command=update_server_display)
 refresh_button.pack(side=tk.RIGHT, padx=10)
 
+# Create a button that checks every data source for new rows now (servers that fetch any)
+def refresh_data_now():
+    refresh_scheduler.trigger()
+    add_server_log("Data refresh requested from the dashboard")
+
+if download_thread is not None:
+    refresh_data_button = tk.Button(header_frame, text="Refresh Data Now", command=refresh_data_now)
+    refresh_data_button.pack(side=tk.RIGHT, padx=10)
+
 # Create a Text widget to display the server info
 server_info_text = tk.Text(server_info_frame, height=30, width=100)
 server_info_text.pack(pady=10, padx=10, expand=True, fill=tk.BOTH)
@@ -2118,10 +2336,6 @@ log_scrollbar = ttk.Scrollbar(log_text, command=log_text.yview)
 log_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 log_text.config(yscrollcommand=log_scrollbar.set)
 
-# Create a global list to store the last 100 log entries
-server_logs = []
-MAX_LOGS = 100
-
 # Create a custom log handler to capture logs
 class TkinterLogHandler:
     def write(self, message):
@@ -2148,6 +2362,16 @@ def update_log_display():
         log_text.insert(tk.END, f"{entry}\n")
     log_text.see(tk.END)  # Scroll to the end
 
+# Function to pick up entries added from other threads (e.g. warm-up progress)
+displayed_log_entry = None
+def poll_log_display():
+    global displayed_log_entry
+    latest = server_logs[-1] if server_logs else None
+    if latest is not displayed_log_entry:
+        displayed_log_entry = latest
+        update_log_display()
+    root.after(500, poll_log_display)
+
 # Set up logging
 import sys
 sys.stderr = TkinterLogHandler()
@@ -2162,7 +2386,7 @@ update_client_display()
 # Use datetime.now() instead of dt.datetime.now()
 server_logs.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Server monitoring started")
 server_logs.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Listening on port 5454")
-update_log_display()
+poll_log_display()
 
 # Run the Tkinter main loop
 root.mainloop()
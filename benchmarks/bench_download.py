@@ -0,0 +1,132 @@
+"""
+Benchmark: workbook refresh cycles against the local OneDrive stand-in
+
+Runs the same sequence of refresh cycles (the workbook gains rows every few cycles) under
+several server behaviours and reports, per scenario: time from the start of a refresh to fresh
+parsed data, time of a check that finds nothing new, bytes sent by the server, share pages
+scraped, workbook parses and rejected downloads. 'unconditional' is the old download path
+(two cold requests, whole body buffered, file rewritten every cycle) for comparison.
+
+Usage:
+    python benchmarks/bench_download.py [cycles] [rows]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import requests
+
+# Allow running from the repository root or the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from match_data import MatchDataRepository
+from sheet_reader import match_columns
+from config_loader import config_loader
+from workbook_download import WorkbookDownloader, find_file_url
+from bench_sidecar import write_workbook
+from onedrive_standin import OneDriveStandIn
+
+DEFAULT_CYCLES = 12
+DEFAULT_ROWS = 2000
+
+# The workbook gains rows on every cycle divisible by this
+CHANGE_EVERY = 4
+
+# Rows added per change
+ROWS_PER_CHANGE = 36
+
+# (name, stand-in options, use the old download path)
+SCENARIOS = [
+    ('unconditional', {}, True),
+    ('etag', {'etag': 'strong'}, False),
+    ('hash only', {'etag': 'none', 'last_modified': False}, False),
+    ('slow link', {'etag': 'strong', 'latency': 0.05, 'bandwidth': 512 * 1024}, False),
+    ('truncated', {'etag': 'strong'}, False),
+    ('one-use url', {'etag': 'strong', 'url_uses': 1}, False)
+]
+
+
+def unconditional_download(url, local_path):
+    """The download path before conditional fetches: scrape, fetch everything, rewrite the file"""
+    response = requests.get(url)
+    response.raise_for_status()
+    file_response = requests.get(find_file_url(response.text))
+    file_response.raise_for_status()
+    temp_path = local_path + '.download'
+    with open(temp_path, 'wb') as file:
+        file.write(file_response.content)
+    os.replace(temp_path, local_path)
+    return True
+
+
+def workbooks(tmp, rows, cycles):
+    """Workbook bytes for every change, keyed by the cycle it appears in"""
+    versions = {}
+    for change, cycle in enumerate(range(0, cycles, CHANGE_EVERY)):
+        path = os.path.join(tmp, f"source_{change}.xlsx")
+        write_workbook(path, rows + change * ROWS_PER_CHANGE)
+        with open(path, 'rb') as file:
+            versions[cycle] = file.read()
+    return versions
+
+
+def run_scenario(tmp, name, options, unconditional, versions, cycles):
+    workdir = tempfile.mkdtemp(prefix=name.replace(' ', '_') + '-', dir=tmp)
+    local_path = os.path.join(workdir, 'qr_codes.xlsx')
+    columns = match_columns(config_loader.get_config())
+    repository = MatchDataRepository(local_path, columns=lambda: columns)
+    downloader = WorkbookDownloader(os.path.join(workdir, 'download_state.json'))
+    standin = OneDriveStandIn(versions[0], **options).start()
+
+    fresh_ms, check_ms, rejected = [], [], 0
+    try:
+        for cycle in range(cycles):
+            if cycle in versions:
+                standin.set_workbook(versions[cycle])
+                if name == 'truncated' and cycle:
+                    standin.options['truncate_next'] = 1
+            parses = repository.parse_count
+            start = time.perf_counter()
+            try:
+                if unconditional:
+                    changed = unconditional_download(standin.share_url, local_path)
+                else:
+                    changed = downloader.download(standin.share_url, local_path)
+            except Exception:
+                changed = False
+                rejected += 1
+            if changed:
+                repository.get_frame()
+            elapsed = (time.perf_counter() - start) * 1000
+            # A cycle brought fresh data if the workbook had to be parsed again (the old path rewrites
+            # the file every cycle, but the repository only re-parses new content)
+            (fresh_ms if repository.parse_count > parses else check_ms).append(elapsed)
+        served = standin.stats()
+    finally:
+        standin.stop()
+    return {
+        'fresh_ms': sum(fresh_ms) / len(fresh_ms) if fresh_ms else 0.0,
+        'check_ms': sum(check_ms) / len(check_ms) if check_ms else 0.0,
+        'bytes': served['bytes_sent'],
+        'share_pages': served['share_pages'],
+        'parses': repository.parse_count,
+        'rejected': rejected
+    }
+
+
+def main(cycles, rows):
+    print(f"{cycles} cycles, {rows} rows, {ROWS_PER_CHANGE} new rows every {CHANGE_EVERY} cycles")
+    print(f"{'scenario':>14} {'fresh ms':>9} {'check ms':>9} {'KiB sent':>9} {'pages':>6} {'parses':>7} {'rejected':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        versions = workbooks(tmp, rows, cycles)
+        for name, options, unconditional in SCENARIOS:
+            result = run_scenario(tmp, name, options, unconditional, versions, cycles)
+            print(f"{name:>14} {result['fresh_ms']:>9.1f} {result['check_ms']:>9.1f} {result['bytes'] / 1024:>9.0f} "
+                  f"{result['share_pages']:>6} {result['parses']:>7} {result['rejected']:>9}")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if args else DEFAULT_CYCLES, args[1] if len(args) > 1 else DEFAULT_ROWS)
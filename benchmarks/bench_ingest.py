@@ -0,0 +1,72 @@
+"""
+Benchmark: parsing several partition workbooks one by one, on the ingest thread pool and in
+spawned worker processes
+
+The server parses partitions on threads (see event_partitions.worker_pool); the XML parsing
+holds the GIL, so the pool is bounded by one core. The process pool row shows what worker
+processes would gain on this machine. It can only be measured here, because this script is
+safe to re-import and avg.py is not.
+
+Usage:
+    python benchmarks/bench_ingest.py [workbooks] [rows] [workers]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Allow running from the repository root or the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from event_partitions import parse_partition, worker_pool
+from sheet_reader import match_columns
+from config_loader import config_loader
+from bench_sidecar import write_workbook
+
+DEFAULT_WORKBOOKS = 8
+DEFAULT_ROWS = 2000
+
+
+def timed(func):
+    """Return the wall time of one call, in milliseconds"""
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def parse_all(pool, paths, columns):
+    return [future.result() for future in [pool.submit(parse_partition, path, columns) for path in paths]]
+
+
+def main(workbooks, rows, workers):
+    columns = match_columns(config_loader.get_config())
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(workbooks):
+            paths.append(os.path.join(tmp, f"EVENT{i}.xlsx"))
+            write_workbook(paths[-1], rows)
+
+        sequential = timed(lambda: [parse_partition(path, columns) for path in paths])
+
+        def threads():
+            with worker_pool(workers) as pool:
+                parse_all(pool, paths, columns)
+
+        def processes():
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                parse_all(pool, paths, columns)
+
+        print(f"{workbooks} workbooks x {rows} rows, {workers} workers, {os.cpu_count()} CPU(s)")
+        print(f"{'mode':>16} {'ms':>10} {'speedup':>8}")
+        for name, elapsed in (('sequential', sequential), ('thread pool', timed(threads)),
+                              ('process pool', timed(processes))):
+            print(f"{name:>16} {elapsed:>10.1f} {sequential / elapsed:>7.2f}x")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if len(args) > 0 else DEFAULT_WORKBOOKS, args[1] if len(args) > 1 else DEFAULT_ROWS,
+         args[2] if len(args) > 2 else min(4, os.cpu_count() or 1))
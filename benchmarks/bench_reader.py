@@ -0,0 +1,49 @@
+"""
+Benchmark: pd.read_excel vs the streaming column reader (parse time and peak Python memory)
+
+Usage:
+    python benchmarks/bench_reader.py [rows ...]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+import pandas as pd
+
+# Allow running from the repository root or the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from match_data import MATCH_SHEET
+from sheet_reader import match_columns, read_sheet_columns
+from config_loader import config_loader
+from bench_sidecar import write_workbook, DEFAULT_ROWS
+
+
+def measure(func):
+    """Return (milliseconds, peak MiB) for one call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / (1024 * 1024)
+
+
+def main(row_counts):
+    wanted = match_columns(config_loader.get_config())
+    print(f"{'rows':>8} {'read_excel ms':>14} {'peak MiB':>9} {'streaming ms':>13} {'peak MiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in row_counts:
+            path = os.path.join(tmp, f"bench_{rows}.xlsx")
+            write_workbook(path, rows)
+            full_ms, full_mb = measure(lambda: pd.read_excel(path, sheet_name=MATCH_SHEET, engine='openpyxl'))
+            stream_ms, stream_mb = measure(lambda: read_sheet_columns(path, MATCH_SHEET, wanted))
+            print(f"{rows:>8} {full_ms:>14.1f} {full_mb:>9.1f} {stream_ms:>13.1f} {stream_mb:>9.1f}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_ROWS)
@@ -0,0 +1,83 @@
+"""
+Benchmark: xlsx parse time vs columnar sidecar load time as the row count grows
+
+Usage:
+    python benchmarks/bench_sidecar.py [rows ...]
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+import pandas as pd
+from openpyxl import Workbook
+
+# Allow running from the repository root or the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from match_data import MATCH_SHEET, hash_file
+from sidecar_store import SidecarStore
+
+# Header of the 'Match Data' sheet used at events
+HEADER = [
+    'Scouter Name', 'Match Number', 'Team Number', 'Drive Team Location', 'Starting Location',
+    'Leave Bonus (T/F)', 'Auto Coral L1 (#)', 'Auto Coral L2/L3 (#)', 'Auto Coral L4 (#)',
+    'Auto Coral Unclear (#)', 'Auto Algae Net (#)', 'Auto Algae Processor (#)', 'Coral L1 (#)',
+    'Coral L2/L3 (#)', 'Coral L4 (#)', 'Coral Unclear (#)', 'Algae Net (#)', 'Algae Processor (#)',
+    'Defense Performed', 'Endgame Barge', 'Minor Fouls', 'Major Fouls', 'Overall Performance',
+    'Additional Observations'
+]
+
+DEFAULT_ROWS = [500, 2000, 8000, 32000]
+
+
+def write_workbook(path, rows, seed=5454):
+    """Write a synthetic 'Match Data' workbook with the given number of rows"""
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(MATCH_SHEET)
+    sheet.append(HEADER)
+    for i in range(rows):
+        sheet.append(
+            [f"Scouter {rng.randint(1, 20)}", i // 6 + 1, rng.randint(1, 10000),
+             rng.choice(['R1', 'R2', 'R3', 'B1', 'B2', 'B3']), rng.randint(1, 3), rng.random() < 0.8]
+            + [rng.randint(0, 6) for _ in range(12)]
+            + [rng.randint(0, 1), rng.randint(0, 3), rng.randint(0, 2), rng.randint(0, 1), rng.randint(0, 5),
+               rng.choice(['', 'fast cycles', 'tipped over', 'good defense'])]
+        )
+    workbook.save(path)
+
+
+def best_of(func, repeat=3):
+    """Return the best wall time of several runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(row_counts):
+    print(f"{'rows':>8} {'xlsx parse (ms)':>16} {'sidecar load (ms)':>18} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SidecarStore(os.path.join(tmp, 'cache'))
+        for rows in row_counts:
+            path = os.path.join(tmp, f"bench_{rows}.xlsx")
+            write_workbook(path, rows)
+            digest = hash_file(path)
+
+            def parse():
+                with pd.ExcelFile(path, engine='openpyxl') as xls:
+                    return pd.read_excel(xls, sheet_name=MATCH_SHEET)
+
+            store.write(digest, parse())
+            parse_ms = best_of(parse, repeat=1 if rows > 10000 else 3)
+            load_ms = best_of(lambda: store.load(digest))
+            print(f"{rows:>8} {parse_ms:>16.1f} {load_ms:>18.1f} {parse_ms / load_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_ROWS)
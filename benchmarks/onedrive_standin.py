@@ -0,0 +1,252 @@
+"""
+Local stand-in for the OneDrive share link, for exercising workbook downloads without the network
+
+Serves a share page whose scripts carry a "FileGetUrl" (like the real 1drv.ms page) and the
+workbook behind it, with configurable latency, bandwidth, truncated bodies, ETag and
+Last-Modified behaviour, and file URLs that expire or can only be used a few times. Used by
+bench_download.py, or run on its own and set excel_url (server section) to the printed share URL.
+
+Usage:
+    python benchmarks/onedrive_standin.py workbook.xlsx [--port 8765] [--latency 0.2]
+        [--bandwidth 262144] [--etag strong|ignore|none] [--no-last-modified]
+        [--truncate-next 1] [--url-ttl 60] [--url-uses 1]
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Size of the chunks the workbook is sent in when the bandwidth is limited
+CHUNK_SIZE = 16 * 1024
+
+# Options and their defaults
+DEFAULT_OPTIONS = {
+    # Seconds added before every response
+    'latency': 0.0,
+    # Bytes per second for the workbook body, or None for unlimited
+    'bandwidth': None,
+    # 'strong': ETag sent and If-None-Match honoured; 'ignore': ETag sent, body always sent; 'none': no ETag
+    'etag': 'strong',
+    # Send Last-Modified and honour If-Modified-Since
+    'last_modified': True,
+    # Number of upcoming downloads cut off halfway (the full Content-Length is still announced)
+    'truncate_next': 0,
+    # Seconds a file URL from the share page stays valid (403 afterwards), or None for forever
+    'url_ttl': None,
+    # Downloads a file URL can be used for (403 afterwards), or None for any number
+    'url_uses': None
+}
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping connections (e.g. after a truncated body) are expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class OneDriveStandIn:
+    """
+    Threaded HTTP server serving one workbook behind a share page.
+
+    The workbook and options can be changed while it runs; counters record what was served.
+    """
+
+    def __init__(self, workbook, port=0, **options):
+        self.lock = threading.Lock()
+        self.options = dict(DEFAULT_OPTIONS, **options)
+        self.tokens = {}
+        self.counters = {}
+        self.reset_counters()
+        self.set_workbook(workbook)
+        self.server = StandInServer(('127.0.0.1', port), self._handler())
+        self.thread = None
+
+    @property
+    def share_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/share"
+
+    def set_workbook(self, workbook):
+        """Serve new workbook content (bytes, or a path to read)"""
+        if not isinstance(workbook, bytes):
+            with open(workbook, 'rb') as file:
+                workbook = file.read()
+        with self.lock:
+            self.workbook = workbook
+            self.etag = '"' + hashlib.sha256(workbook).hexdigest()[:16] + '"'
+            self.modified = time.time()
+
+    def reset_counters(self):
+        with self.lock:
+            self.counters = {'share_pages': 0, 'downloads': 0, 'not_modified': 0, 'expired': 0,
+                             'truncated': 0, 'bytes_sent': 0}
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                time.sleep(standin.options['latency'])
+                url = urlsplit(self.path)
+                if url.path == '/share':
+                    self.share_page()
+                elif url.path == '/download':
+                    self.download(parse_qs(url.query).get('token', [''])[0])
+                else:
+                    self.reply(404, b'Not found')
+
+            def reply(self, status, body=b'', headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                standin._count('bytes_sent', len(body))
+
+            def share_page(self):
+                token = os.urandom(8).hex()
+                with standin.lock:
+                    standin.tokens[token] = [time.time(), 0]
+                # Escaped the way OneDrive embeds it in a script
+                file_url = f"http:\\/\\/127.0.0.1:{standin.server.server_port}\\/download?token={token}\\u0026e=1"
+                body = ('<html><head><script>var $Config={"appId":"standin",'
+                        f'"FileGetUrl":"{file_url}","FileName":"scouting.xlsx"}};</script></head>'
+                        '<body>OneDrive stand-in</body></html>').encode('utf-8')
+                standin._count('share_pages')
+                self.reply(200, body, [('Content-Type', 'text/html; charset=utf-8')])
+
+            def download(self, token):
+                options = standin.options
+                with standin.lock:
+                    issued = standin.tokens.get(token)
+                    if issued is not None:
+                        issued[1] += 1
+                    workbook, etag, modified = standin.workbook, standin.etag, standin.modified
+                if (issued is None or (options['url_ttl'] is not None and time.time() - issued[0] > options['url_ttl'])
+                        or (options['url_uses'] is not None and issued[1] > options['url_uses'])):
+                    standin._count('expired')
+                    self.reply(403, b'File URL expired')
+                    return
+
+                headers = [('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')]
+                if options['etag'] != 'none':
+                    headers.append(('ETag', etag))
+                if options['last_modified']:
+                    headers.append(('Last-Modified', formatdate(modified, usegmt=True)))
+                if self.not_modified(etag, modified):
+                    standin._count('not_modified')
+                    self.send_response(304)
+                    for name, value in headers:
+                        self.send_header(name, value)
+                    self.end_headers()
+                    return
+
+                with standin.lock:
+                    truncate = standin.options['truncate_next'] > 0
+                    if truncate:
+                        standin.options['truncate_next'] -= 1
+                body = workbook[:len(workbook) // 2] if truncate else workbook
+                self.send_response(200)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(workbook)))
+                if truncate:
+                    self.send_header('Connection', 'close')
+                    self.close_connection = True
+                self.end_headers()
+                self.send_body(body, options['bandwidth'])
+                standin._count('downloads')
+                if truncate:
+                    standin._count('truncated')
+
+            def not_modified(self, etag, modified):
+                options = standin.options
+                if options['etag'] == 'strong' and self.headers.get('If-None-Match'):
+                    return self.headers['If-None-Match'] == etag
+                since = self.headers.get('If-Modified-Since')
+                if options['last_modified'] and since and options['etag'] != 'ignore':
+                    try:
+                        return int(modified) <= parsedate_to_datetime(since).timestamp()
+                    except (TypeError, ValueError):
+                        return False
+                return False
+
+            def send_body(self, body, bandwidth):
+                if not bandwidth:
+                    self.wfile.write(body)
+                    standin._count('bytes_sent', len(body))
+                    return
+                for start in range(0, len(body), CHUNK_SIZE):
+                    chunk = body[start:start + CHUNK_SIZE]
+                    self.wfile.write(chunk)
+                    standin._count('bytes_sent', len(chunk))
+                    time.sleep(len(chunk) / bandwidth)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a workbook behind a OneDrive-like share link')
+    parser.add_argument('workbook', help='Workbook to serve (re-read when it changes on disk)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added before every response')
+    parser.add_argument('--bandwidth', type=int, default=None, help='Bytes per second for the workbook')
+    parser.add_argument('--etag', choices=['strong', 'ignore', 'none'], default='strong')
+    parser.add_argument('--no-last-modified', dest='last_modified', action='store_false')
+    parser.add_argument('--truncate-next', type=int, default=0, help='Number of downloads to cut off halfway')
+    parser.add_argument('--url-ttl', type=float, default=None, help='Seconds a file URL stays valid')
+    parser.add_argument('--url-uses', type=int, default=None, help='Downloads a file URL can be used for')
+    args = parser.parse_args()
+
+    standin = OneDriveStandIn(args.workbook, port=args.port, latency=args.latency, bandwidth=args.bandwidth,
+                              etag=args.etag, last_modified=args.last_modified,
+                              truncate_next=args.truncate_next, url_ttl=args.url_ttl,
+                              url_uses=args.url_uses).start()
+    print(f"Serving {args.workbook} at {standin.share_url} (Ctrl+C to stop)")
+    mtime = os.path.getmtime(args.workbook)
+    try:
+        while True:
+            time.sleep(1)
+            if os.path.getmtime(args.workbook) != mtime:
+                mtime = os.path.getmtime(args.workbook)
+                standin.set_workbook(args.workbook)
+                print(f"Reloaded {args.workbook}: {standin.stats()}")
+    except KeyboardInterrupt:
+        print(f"Stopped: {standin.stats()}")
+    finally:
+        standin.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
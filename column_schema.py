@@ -0,0 +1,360 @@
+"""
+Canonical column schema for HeroScout
+Maps the raw headers of a scouting sheet to the canonical column names the routes use and coerces
+every column to its canonical dtype once, so no route does column detection or type conversion.
+Numeric columns are stored in the narrowest dtype that holds every value exactly; team and match
+numbers with missing cells become nullable integers rather than floats, so the rows are kept (the
+data quality report flags them) and every present key is still a whole number.
+"""
+
+import json
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from scoring import LEAVE_TRUE_STRINGS
+
+# Set up logging
+logger = logging.getLogger('ColumnSchema')
+
+# Alternative header names accepted for each canonical column, in order of preference.
+# Configured column_mappings are checked before these.
+COLUMN_ALIASES = {
+    'Team Number': ['Team'],
+    'Match Number': ['Match'],
+    'Scouter Name': ['Name', 'Scouter'],
+    'Additional Observations': ['Notes', 'Comments', 'Observations'],
+    'Auto Coral L2/L3 (#)': ['Auto coral L2', 'Auto Coral L3', 'Auto Coral L2 (#)', 'Auto Coral L3 (#)'],
+    'Auto Algae Net (#)': ['Auto Barge Algae'],
+    'Auto Algae Processor (#)': ['Auto Processor Algae'],
+    'Coral L2/L3 (#)': ['Coral L2', 'Coral L3', 'Coral L2 (#)', 'Coral L3 (#)'],
+    'Algae Net (#)': ['Barge Algae'],
+    'Algae Processor (#)': ['processor Algae']
+}
+
+# Columns that are always numeric, in addition to the configured include and scoring columns
+NUMERIC_COLUMNS = ['Team Number', 'Match Number', 'Defense Performed', 'Defense Quality', 'Defense Time',
+                   'Minor Fouls', 'Major Fouls']
+
+# Low-cardinality columns stored as categoricals
+CATEGORICAL_COLUMNS = ['Scouter Name', 'Drive Team Location', 'Starting Location', 'Event', 'Day']
+
+# Key columns that are never stored unsigned, so arithmetic on them cannot wrap around
+KEY_COLUMNS = ['Team Number', 'Match Number']
+
+# Largest integer magnitude float32 represents exactly
+FLOAT32_EXACT = 2 ** 24
+
+# Suffix marking a true/false column
+FLAG_SUFFIX = '(T/F)'
+
+
+def column_aliases(config):
+    """
+    Get the alias table for a configuration: configured column_mappings and team_column first,
+    then the built-in COLUMN_ALIASES
+
+    Returns:
+        dict: {canonical_name: [alternative_name, ...]}
+    """
+    aliases = {}
+    for mapping in (config.get('column_mappings', {}), COLUMN_ALIASES):
+        for name, alternatives in mapping.items():
+            merged = aliases.setdefault(name, [])
+            merged.extend(alt for alt in alternatives if alt not in merged)
+    team_column = config.get('team_column', 'Team Number')
+    if team_column != 'Team Number':
+        aliases.setdefault('Team Number', []).insert(0, team_column)
+    return aliases
+
+
+def schema_signature(config):
+    """Return a short stable hash of the configuration keys that affect the canonical schema"""
+    relevant = {
+        'team_column': config.get('team_column'),
+        'include_columns': config.get('include_columns'),
+        'column_mappings': config.get('column_mappings'),
+        'scoring_columns': sorted(config.get('scoring_rules', {}))
+    }
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+def header_signature(headers):
+    """Return a short stable hash of an ordered list of sheet headers"""
+    return hashlib.sha256('\n'.join(str(header) for header in headers).encode('utf-8')).hexdigest()[:12]
+
+
+def _to_flag(values):
+    """
+    Convert a true/false column with the same rules calculate_scores uses for the Leave Bonus:
+    bools as-is, TRUE/T/YES/Y/1 text, numbers >= 0.5. Stays bool unless cells are missing, in
+    which case it becomes float 1.0/0.0 with NaN so averages still skip the missing cells.
+    """
+    if values.dtype == bool:
+        return values
+
+    def convert(value):
+        if isinstance(value, (bool, np.bool_)):
+            return float(value)
+        if isinstance(value, str):
+            return float(value.strip().upper() in LEAVE_TRUE_STRINGS)
+        if isinstance(value, (int, float, np.integer, np.floating)) and not pd.isna(value):
+            return float(value >= 0.5)
+        return np.nan
+
+    flags = np.array([convert(value) for value in values], dtype=float)
+    if not np.isnan(flags).any():
+        return pd.Series(flags.astype(bool), index=values.index, name=values.name)
+    return pd.Series(flags, index=values.index, name=values.name)
+
+
+def _compact_numeric(values, signed=False):
+    """
+    Downcast a numeric column to the narrowest dtype that holds every value exactly: uint8, int16
+    or int32 for whole numbers, float32 for whole numbers with missing cells. Key columns (signed)
+    with missing cells use the nullable Int16/Int32 instead. Fractional columns stay float64.
+    """
+    if values.dtype.kind not in 'iuf':
+        return values
+    if isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+        # Nullable columns (e.g. concatenated canonical frames) are compacted from their float values
+        values = values.astype(np.float64)
+    data = values.to_numpy()
+    present = data[~np.isnan(data)] if data.dtype.kind == 'f' else data
+    if len(present) == 0 or not np.isfinite(present).all() or not np.array_equal(present, np.round(present)):
+        return values
+
+    low, high = present.min(), present.max()
+    if len(present) < len(data):
+        if signed:
+            # Keep team and match numbers integers; missing cells are <NA>
+            for dtype in (pd.Int16Dtype(), pd.Int32Dtype()):
+                info = np.iinfo(dtype.numpy_dtype)
+                if info.min <= low and high <= info.max:
+                    return values.astype(dtype)
+            return values
+        # Missing cells need a float; float32 is exact for these whole numbers
+        if max(abs(low), abs(high)) < FLOAT32_EXACT:
+            return values.astype(np.float32)
+        return values
+
+    for dtype in ((np.int16, np.int32) if signed else (np.uint8, np.int16, np.int32)):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values
+
+
+def widen_floats(frame):
+    """
+    Return the frame with float32 columns widened to float64
+
+    pandas computes means of float32 columns in float32, so frames are widened before averaging
+    to keep results identical to full-precision data.
+    """
+    narrow = {col: np.float64 for col, dtype in frame.dtypes.items() if dtype == np.float32}
+    return frame.astype(narrow) if narrow else frame
+
+
+def memory_report(raw, canonical):
+    """
+    Compare the memory used by each column of a raw frame and of its compact canonical frame
+
+    Args:
+        raw (pandas.DataFrame): Frame as read from the sheet
+        canonical (pandas.DataFrame): The canonical frame built from it (same column order)
+
+    Returns:
+        dict: Per-column dtypes and bytes before and after, and the totals
+    """
+    before = raw.memory_usage(index=False, deep=True)
+    after = canonical.memory_usage(index=False, deep=True)
+    columns = []
+    for header, name in zip(raw.columns, canonical.columns):
+        columns.append({
+            'column': name,
+            'header': header,
+            'dtype_before': str(raw[header].dtype),
+            'dtype_after': str(canonical[name].dtype),
+            'bytes_before': int(before[header]),
+            'bytes_after': int(after[name])
+        })
+    return {
+        'rows': len(canonical),
+        'columns': columns,
+        'total_before': int(before.sum()),
+        'total_after': int(after.sum())
+    }
+
+
+class SchemaPlan:
+    """
+    Compiled mapping from one set of sheet headers to the canonical schema: which headers are
+    renamed, and which canonical columns are coerced to numeric, true/false or categorical.
+    Numeric columns, and true/false columns with missing cells, are then stored in compact dtypes.
+    """
+
+    def __init__(self, renames, numeric, flags, categorical, sums=None):
+        self.renames = renames
+        # {canonical name: [alias, ...]} for numeric columns filled from several aliases at once
+        self.sums = sums or {}
+        self.numeric = frozenset(numeric)
+        self.flags = frozenset(flags)
+        self.categorical = frozenset(categorical)
+
+    @classmethod
+    def compile(cls, headers, config):
+        """
+        Build the plan for a list of raw headers
+
+        For each canonical column missing from the headers, the first alias that is present is
+        renamed to it. Headers that already use a canonical name are never renamed. When several
+        aliases of a numeric column are present (e.g. separate 'Coral L2' and 'Coral L3' counts
+        for 'Coral L2/L3 (#)'), the canonical column is their sum; for other columns the first
+        wins and the rest are left under their own names, with a warning.
+        """
+        present = set(headers)
+        numeric_names = set(NUMERIC_COLUMNS) | set(config.get('include_columns', [])) | set(config.get('scoring_rules', {}))
+        renames = {}
+        sums = {}
+        for name, alternatives in column_aliases(config).items():
+            if name in present:
+                continue
+            found = [alt for alt in alternatives if alt in present and alt not in renames]
+            if not found:
+                continue
+            renames[found[0]] = name
+            if len(found) > 1:
+                if name in numeric_names and not str(name).endswith(FLAG_SUFFIX):
+                    sums[name] = found
+                    logger.info(f"Summing {found} into '{name}'")
+                else:
+                    logger.warning(f"Using '{found[0]}' for '{name}'; ignoring {found[1:]}")
+
+        canonical = [renames.get(header, header) for header in headers]
+        flags = [name for name in canonical if str(name).endswith(FLAG_SUFFIX)]
+        numeric = [name for name in canonical if name in numeric_names and name not in flags]
+        categorical = [name for name in canonical if name in CATEGORICAL_COLUMNS]
+        return cls(renames, numeric, flags, categorical, sums)
+
+    def apply(self, frame):
+        """Return a new canonical frame; the input frame is not modified"""
+        columns = {}
+        for header in frame.columns:
+            name = self.renames.get(header, header)
+            values = frame[header].rename(name)
+            if header in self.renames and name in self.sums:
+                # Missing only where every alias is missing
+                parts = [pd.to_numeric(frame[alt], errors='coerce').astype(np.float64) for alt in self.sums[name]]
+                values = pd.concat(parts, axis=1).sum(axis=1, min_count=1).rename(name)
+            if name in self.flags:
+                values = _to_flag(values)
+                if values.dtype != bool:
+                    values = values.astype(np.float32)
+            elif name in self.numeric:
+                if values.dtype.kind not in 'biuf':
+                    values = pd.to_numeric(values, errors='coerce')
+                values = _compact_numeric(values, signed=name in KEY_COLUMNS)
+            elif name in self.categorical:
+                values = values.astype('category')
+            columns[name] = values
+        return pd.DataFrame(columns, index=frame.index)
+
+
+class SchemaResolver:
+    """
+    Process-wide cache of compiled schema plans and canonical frames.
+
+    Plans are cached by (schema signature, header signature), so a plan is compiled once per
+    configuration and sheet layout. Canonical frames are cached by plan and the caller's frame
+    key (e.g. the workbook digest), so every route shares one coerced frame per version.
+    """
+
+    def __init__(self, max_plans=8, max_frames=2):
+        self.lock = threading.Lock()
+        self.plans = OrderedDict()
+        self.frames = OrderedDict()
+        self.max_plans = max_plans
+        self.max_frames = max_frames
+        self.compile_count = 0
+
+    def plan_for(self, headers, config):
+        """Get the compiled plan for a list of headers and a configuration"""
+        key = (schema_signature(config), header_signature(headers))
+        with self.lock:
+            plan = self.plans.get(key)
+            if plan is not None:
+                self.plans.move_to_end(key)
+                return plan
+        plan = SchemaPlan.compile(list(headers), config)
+        with self.lock:
+            self.plans[key] = plan
+            self.compile_count += 1
+            while len(self.plans) > self.max_plans:
+                self.plans.popitem(last=False)
+        if plan.renames:
+            logger.info(f"Mapped sheet headers to canonical names: {plan.renames}")
+        return plan
+
+    def compact(self, frame, columns):
+        """
+        Store columns computed from canonical ones (e.g. averaged) in their compact canonical dtype
+
+        True/false columns go back to bool (float32 with missing cells) while they only hold 0 and 1;
+        other numeric columns are downcast like SchemaPlan.apply does. Fractional values stay float64.
+
+        Args:
+            frame (pandas.DataFrame): Frame to update in place
+            columns (list): Names of the computed columns
+
+        Returns:
+            pandas.DataFrame: The same frame
+        """
+        for col in columns:
+            values = frame[col]
+            if str(col).endswith(FLAG_SUFFIX):
+                present = values.dropna()
+                if present.isin([0.0, 1.0]).all():
+                    values = values.astype(bool if len(present) == len(values) else np.float32)
+            else:
+                values = _compact_numeric(values, signed=col in KEY_COLUMNS)
+            frame[col] = values
+        return frame
+
+    def resolve(self, frame, config, frame_key=None):
+        """
+        Get the canonical version of a raw frame
+
+        Args:
+            frame (pandas.DataFrame): Raw frame as read from the sheet
+            config (dict): The game configuration
+            frame_key (hashable): Identity of the raw frame's content; enables caching when given
+
+        Returns:
+            pandas.DataFrame: The shared, read-only canonical frame
+        """
+        headers = list(frame.columns)
+        plan = self.plan_for(headers, config)
+        if frame_key is None:
+            return plan.apply(frame)
+
+        key = (schema_signature(config), header_signature(headers), frame_key)
+        with self.lock:
+            canonical = self.frames.get(key)
+            if canonical is not None:
+                self.frames.move_to_end(key)
+                return canonical
+        canonical = plan.apply(frame)
+        with self.lock:
+            self.frames[key] = canonical
+            while len(self.frames) > self.max_frames:
+                self.frames.popitem(last=False)
+        return canonical
+
+
+# Create a global instance
+schema_resolver = SchemaResolver()
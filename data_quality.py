@@ -0,0 +1,321 @@
+"""
+Data quality report for HeroScout
+Checks every row of a dataset generation in one vectorized pass: schema violations (missing or
+non-numeric values, bad team and match numbers), values outside their valid range, and per-team
+statistical outliers found with robust z-scores (median and MAD of each team's own matches).
+Reports are computed once per data version and cached, so /data_quality and the dashboard never
+re-scan an unchanged dataset.
+"""
+
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from column_schema import FLAG_SUFFIX
+
+# Set up logging
+logger = logging.getLogger('DataQuality')
+
+# Modified z-score above which a value is an outlier for its team (Iglewicz and Hoaglin)
+OUTLIER_THRESHOLD = 3.5
+
+# Scales the MAD, and the mean absolute deviation used when the MAD is zero, to a standard deviation
+MAD_SCALE = 0.6745
+MEAN_AD_SCALE = 1.253314
+
+# Deviations below this are rounding noise: a team whose MAD and mean absolute deviation are both
+# this small has no spread to measure outliers against
+DEVIATION_EPSILON = 1e-9
+
+# Teams need this many values in a column before any of them can be called an outlier
+MIN_TEAM_ROWS = 4
+
+# Suffix marking a count column, which must not be negative (merged duplicate reports can average
+# to fractions, so whole numbers are not required)
+COUNT_SUFFIX = '(#)'
+
+# Number of flagged values listed in the report
+MAX_REPORTED_ISSUES = 200
+
+# Number of reports kept (the live generation plus a few event or day selections)
+MAX_REPORTS = 4
+
+
+def value_ranges(config):
+    """
+    Get the valid values of each checked column
+
+    Count columns must be at least zero, true/false columns 0 or 1, and columns
+    scored through a value table (such as Endgame Barge) one of the table's values. Configured
+    'value_ranges' ({column: [min, max]}) are checked as inclusive bounds and take precedence.
+
+    Returns:
+        dict: {column: ('range', low, high) or ('values', array of allowed values)}
+    """
+    ranges = {}
+    for col in config.get('include_columns', []):
+        if col.endswith(FLAG_SUFFIX):
+            ranges[col] = ('values', np.array([0.0, 1.0]))
+        elif col.endswith(COUNT_SUFFIX):
+            ranges[col] = ('range', 0.0, np.inf)
+    for col, rule in config.get('scoring_rules', {}).items():
+        if isinstance(rule, dict):
+            try:
+                ranges[col] = ('values', np.array(sorted(float(key) for key in rule)))
+            except ValueError:
+                logger.warning(f"Scoring table of '{col}' has non-numeric values, not range checked")
+    for col, bounds in config.get('value_ranges', {}).items():
+        low, high = bounds
+        ranges[col] = ('range', -np.inf if low is None else float(low), np.inf if high is None else float(high))
+    return ranges
+
+
+def _plain(value):
+    """A cell as a JSON-friendly value"""
+    if pd.isna(value):
+        return None
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return int(value)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def robust_z_scores(codes, values):
+    """
+    Modified z-score of every value against the other values of its group
+
+    Uses 0.6745 * (x - median) / MAD per group. Where a group's MAD is zero (most of its values
+    equal) the mean absolute deviation is used instead, and a group where both are near zero
+    (all values equal, up to rounding) gets a z-score of 0. Groups are sorted once with NumPy, so every group is done in one pass.
+
+    Args:
+        codes (numpy.ndarray): Group number of each value (0..n-1, -1 for no group)
+        values (numpy.ndarray): float64 values, NaN for missing
+
+    Returns:
+        tuple: (z-scores with NaN where not computed, number of values in each value's group)
+    """
+    z = np.full(len(values), np.nan)
+    counts = np.zeros(len(values), dtype=np.int64)
+    present = (codes >= 0) & ~np.isnan(values)
+    if not present.any():
+        return z, counts
+
+    positions = np.flatnonzero(present)
+    group = codes[positions]
+    order = np.lexsort((values[positions], group))
+    positions, group = positions[order], group[order]
+    sorted_values = values[positions]
+
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    sizes = np.diff(np.r_[starts, len(group)])
+    # Median of each sorted run: the middle value, or the mean of the two middle values
+    low = starts + (sizes - 1) // 2
+    high = starts + sizes // 2
+    medians = (sorted_values[low] + sorted_values[high]) / 2
+    run = np.repeat(np.arange(len(starts)), sizes)
+    deviations = np.abs(sorted_values - medians[run])
+
+    # The MAD is the median of the deviations, which need sorting again within each group
+    deviation_order = np.lexsort((deviations, run))
+    sorted_deviations = deviations[deviation_order]
+    mad = (sorted_deviations[low] + sorted_deviations[high]) / 2
+    mean_ad = np.bincount(run, weights=deviations) / sizes
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(mad > DEVIATION_EPSILON, mad / MAD_SCALE,
+                         np.where(mean_ad > DEVIATION_EPSILON, mean_ad * MEAN_AD_SCALE, 0.0))
+        scores = np.where(scale[run] > 0, (sorted_values - medians[run]) / scale[run], 0.0)
+    z[positions] = scores
+    counts[positions] = sizes[run]
+    return z, counts
+
+
+def quality_report(dataset, config):
+    """
+    Check every row of a dataset generation
+
+    Args:
+        dataset (MatchDataset): The generation to check
+        config (dict): The game configuration
+
+    Returns:
+        dict: {'data_version', 'rows', 'summary', 'missing_columns', 'columns', 'teams', 'scouters',
+              'issues'}. 'columns' counts missing, out-of-range and outlier values per column,
+              'teams' and 'scouters' the rows with at least one issue, and 'issues' lists flagged
+              values (schema violations and out-of-range values first, then the strongest outliers).
+    """
+    start = time.perf_counter()
+    frame = dataset.frame
+    rows = len(frame)
+    include_columns = config.get('include_columns', [])
+    missing_columns = [col for col in include_columns if col not in frame.columns]
+
+    def numbers(col):
+        if frame[col].dtype == bool or frame[col].dtype.kind in 'iuf':
+            return frame[col].to_numpy(dtype=float, na_value=np.nan)
+        return pd.to_numeric(frame[col].astype(object), errors='coerce').to_numpy(dtype=float)
+
+    teams = numbers('Team Number') if 'Team Number' in frame.columns else np.full(rows, np.nan)
+    matches = numbers('Match Number') if 'Match Number' in frame.columns else np.full(rows, np.nan)
+    scouters = frame['Scouter Name'].astype(object).to_numpy() if 'Scouter Name' in frame.columns else None
+
+    # Each check is (kind, column, boolean mask of flagged rows, detail, values, z-scores or None)
+    checks = []
+    for key, values in (('Team Number', teams), ('Match Number', matches)):
+        bad = np.isnan(values) | (values <= 0) | (values != np.floor(values))
+        checks.append(('schema', key, bad, f"{key} is missing or not a positive whole number", values, None))
+
+    ranges = value_ranges(config)
+    columns = {}
+    for col in include_columns:
+        if col not in frame.columns:
+            continue
+        values = numbers(col)
+        missing = np.isnan(values)
+        columns[col] = {'missing': int(missing.sum()), 'out_of_range': 0, 'outliers': 0}
+        checks.append(('schema', col, missing, 'Missing or not a number', values, None))
+
+        rule = ranges.get(col)
+        if rule is not None:
+            if rule[0] == 'values':
+                bad = ~missing & ~np.isin(values, rule[1])
+                detail = f"Not one of {', '.join(str(_plain(value)) for value in rule[1])}"
+            else:
+                _, low, high = rule
+                bad = ~missing & ((values < low) | (values > high))
+                if not np.isfinite(high):
+                    detail = f"Less than {_plain(low)}"
+                elif not np.isfinite(low):
+                    detail = f"Greater than {_plain(high)}"
+                else:
+                    detail = f"Outside {_plain(low)} to {_plain(high)}"
+            columns[col]['out_of_range'] = int(bad.sum())
+            checks.append(('range', col, bad, detail, values, None))
+
+    # Per-team outliers of every numeric measure and of the match score
+    team_codes = pd.Series(teams).groupby(teams, sort=False, dropna=True).ngroup()
+    team_codes = team_codes.fillna(-1).to_numpy(dtype=np.int64)
+    measures = [(col, numbers(col)) for col in include_columns
+                if col in frame.columns and not col.endswith(FLAG_SUFFIX)]
+    measures.append(('Score', np.asarray(dataset.scores, dtype=float)))
+    for col, values in measures:
+        z, counts = robust_z_scores(team_codes, values)
+        outliers = (counts >= MIN_TEAM_ROWS) & (np.abs(np.nan_to_num(z)) > OUTLIER_THRESHOLD)
+        columns.setdefault(col, {'missing': 0, 'out_of_range': 0, 'outliers': 0})['outliers'] = int(outliers.sum())
+        checks.append(('outlier', col, outliers, 'Unusual for this team', values, z))
+
+    flagged_rows = np.zeros(rows, dtype=bool)
+    summary = {'schema_violations': 0, 'out_of_range': 0, 'outliers': 0}
+    summary_key = {'schema': 'schema_violations', 'range': 'out_of_range', 'outlier': 'outliers'}
+    issues, outlier_issues = [], []
+    for kind, col, mask, detail, values, z in checks:
+        summary[summary_key[kind]] += int(mask.sum())
+        flagged_rows |= mask
+        positions = np.flatnonzero(mask)
+        if z is not None:
+            # Only the strongest outliers of each column can make the list
+            positions = positions[np.argsort(-np.abs(z[positions]), kind='stable')]
+        for position in positions[:MAX_REPORTED_ISSUES]:
+            issue = {
+                'type': kind,
+                'row': int(position),
+                'team_number': _plain(teams[position]),
+                'match_number': _plain(matches[position]),
+                'scouter': _plain(scouters[position]) if scouters is not None else None,
+                'column': col,
+                'value': _plain(values[position]),
+                'detail': detail
+            }
+            if z is not None:
+                issue['z'] = round(float(z[position]), 2)
+                outlier_issues.append(issue)
+            else:
+                issues.append(issue)
+    outlier_issues.sort(key=lambda issue: -abs(issue['z']))
+    issues = (issues + outlier_issues)[:MAX_REPORTED_ISSUES]
+
+    def counts_by(labels):
+        if labels is None or not flagged_rows.any():
+            return {}
+        counted = pd.Series(labels[flagged_rows]).dropna().value_counts()
+        return {str(_plain(label)): int(count) for label, count in counted.items()}
+
+    summary['rows_flagged'] = int(flagged_rows.sum())
+    summary['missing_columns'] = len(missing_columns)
+    report = {
+        'data_version': dataset.data_version,
+        'rows': rows,
+        'summary': summary,
+        'missing_columns': missing_columns,
+        'columns': columns,
+        'teams': counts_by(teams),
+        'scouters': counts_by(scouters),
+        'issues': issues,
+        'computed_at': time.time(),
+        'compute_ms': round((time.perf_counter() - start) * 1000, 1)
+    }
+    logger.info(f"Checked data version {dataset.data_version}: {summary['rows_flagged']} of {rows} rows flagged "
+                f"in {report['compute_ms']:.0f} ms")
+    return report
+
+
+class DataQualityMonitor:
+    """
+    Cache of quality reports, one per dataset generation and configuration.
+
+    The first request for a generation runs the check (others asking at the same time wait for
+    it rather than running it again); later requests are served from the cache.
+    """
+
+    def __init__(self, config_provider, max_reports=MAX_REPORTS):
+        # Callable returning the current game configuration
+        self.config_provider = config_provider
+        self.max_reports = max_reports
+        self.lock = threading.Lock()
+        self.reports = OrderedDict()
+        self.check_count = 0
+
+    def report(self, dataset):
+        """
+        Get the quality report of a dataset generation, checking it if this is the first request
+
+        Args:
+            dataset (MatchDataset): The generation
+
+        Returns:
+            dict: See quality_report
+        """
+        key = (dataset.data_version, dataset.version.digest, dataset.config_signature)
+        with self.lock:
+            report = self.reports.get(key)
+            if report is None:
+                report = quality_report(dataset, self.config_provider())
+                self.check_count += 1
+                self.reports[key] = report
+                while len(self.reports) > self.max_reports:
+                    self.reports.popitem(last=False)
+            else:
+                self.reports.move_to_end(key)
+        return report
+
+    def cached(self, dataset):
+        """
+        Get the quality report of a dataset generation only if it was already checked
+
+        For callers that must not run the check themselves, such as the dashboard on the Tk thread.
+
+        Returns:
+            dict or None: See quality_report
+        """
+        key = (dataset.data_version, dataset.version.digest, dataset.config_signature)
+        with self.lock:
+            return self.reports.get(key)
+
+    def latest(self):
+        """The most recently used report, or None if nothing was checked yet"""
+        with self.lock:
+            return next(reversed(self.reports.values()), None)
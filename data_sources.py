@@ -0,0 +1,425 @@
+"""
+Data sources for HeroScout
+The match rows can come from more than the shared OneDrive workbook: the local output of the QR
+code scanner (qrcode.py), folders of exported workbooks and other HeroScout servers (such as a
+backup laptop). Each source is checked on its own, all of them concurrently in a thread pool, and
+only re-read when it changed. The reload pipeline appends the rows of every source to the
+workbook's rows, where row_dedup drops the rows several sources share and merges conflicting
+reports, so all sources end up in one dataset generation.
+"""
+
+import os
+import time
+import hashlib
+import threading
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import openpyxl
+import pandas as pd
+import requests
+
+from match_data import MATCH_SHEET, config_signature, hash_file
+from sheet_reader import frame_from_records, read_sheet_columns
+from live_ingest import parse_qr_text, validate_rows
+
+# Set up logging
+logger = logging.getLogger('DataSources')
+
+# Sheet qrcode.py writes scanned codes to: a timestamp, then one QR value per cell
+SCANNER_SHEET = 'qr_codes'
+
+# Files a folder source reads
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm')
+
+# Seconds to wait for a peer server to connect and to answer
+PEER_TIMEOUT = (5, 30)
+
+# Header carrying the shared 'peer_secret' that lets a peer read /export_rows without a login
+PEER_SECRET_HEADER = 'X-HeroScout-Peer-Secret'
+
+# Source types accepted in the 'data_sources' setting
+SOURCE_TYPES = ('url', 'file', 'folder', 'peer')
+
+
+def read_scanner_rows(file_path, config):
+    """
+    Read the codes saved by qrcode.py as canonical row dicts
+
+    Args:
+        file_path (str): Path to the scanner workbook
+        config (dict): The game configuration (QR column order and validation)
+
+    Returns:
+        tuple: (valid row dicts, number of codes that could not be read)
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        lines = []
+        for row in workbook[SCANNER_SHEET].iter_rows(min_row=2, values_only=True):
+            values = [str(value) for value in row[1:] if value is not None and str(value).strip()]
+            if values:
+                lines.append(' '.join(values))
+    finally:
+        workbook.close()
+    records, unreadable = parse_qr_text('\n'.join(lines), config)
+    valid, rejected, _ = validate_rows(records, config)
+    return valid, len(unreadable) + len(rejected)
+
+
+def read_workbook_rows(file_path, columns, config):
+    """
+    Read the rows of a workbook: the 'Match Data' sheet (or the first sheet), or the codes of a
+    qrcode.py workbook
+
+    Returns:
+        pandas.DataFrame: Raw rows, resolved to canonical columns by the reload pipeline
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        sheets = workbook.sheetnames
+    finally:
+        workbook.close()
+    if SCANNER_SHEET in sheets and MATCH_SHEET not in sheets:
+        records, rejected = read_scanner_rows(file_path, config)
+        if rejected:
+            logger.warning(f"Skipped {rejected} unreadable QR codes in {os.path.basename(file_path)}")
+        return frame_from_records(records)
+    return read_sheet_columns(file_path, MATCH_SHEET, columns, first_sheet_fallback=True)
+
+
+class DataSource(ABC):
+    """
+    One place match rows come from.
+
+    Subclasses implement location and _fetch(), which checks the source, re-reads it if it
+    changed and returns True in that case. frame holds the source's raw rows (None for a source
+    whose rows are read elsewhere, like the main workbook) and digest identifies their content.
+    Fetches of one source never overlap, so it can be fetched on demand while a refresh runs.
+    """
+
+    kind = None
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.frame = None
+        self.digest = None
+        self.fetch_count = 0
+        self.change_count = 0
+        self.error_count = 0
+        self.last_fetch = None
+        self.last_change = None
+        self.last_latency_ms = None
+        self.last_result = None
+        self.last_error = None
+
+    @property
+    @abstractmethod
+    def location(self):
+        """Where the rows come from (path or URL), for reports"""
+
+    @abstractmethod
+    def _fetch(self):
+        """Check the source, re-read it if it changed and return True in that case"""
+
+    def fetch(self):
+        """
+        Check the source and re-read it if it changed
+
+        Returns:
+            str: 'changed', 'unchanged' or 'error' (the rows read before are kept)
+        """
+        with self.lock:
+            start = time.perf_counter()
+            try:
+                result = 'changed' if self._fetch() else 'unchanged'
+                self.last_error = None
+            except Exception as e:
+                result = 'error'
+                self.last_error = str(e)
+                self.error_count += 1
+                logger.warning(f"Failed to fetch data source '{self.name}': {str(e)}")
+            self.last_latency_ms = round((time.perf_counter() - start) * 1000, 1)
+            self.last_fetch = time.time()
+            self.fetch_count += 1
+            if result == 'changed':
+                self.change_count += 1
+                self.last_change = self.last_fetch
+            self.last_result = result
+            return result
+
+    def describe(self):
+        """Freshness and latency of the source, for /data_sources and the dashboard"""
+        now = time.time()
+        return {
+            'name': self.name,
+            'type': self.kind,
+            'location': self.location,
+            'rows': len(self.frame) if self.frame is not None else None,
+            'digest': self.digest[:12] if self.digest else None,
+            'last_fetch': self.last_fetch,
+            'last_change': self.last_change,
+            'age_seconds': round(now - self.last_change, 1) if self.last_change else None,
+            'latency_ms': self.last_latency_ms,
+            'last_result': self.last_result,
+            'last_error': self.last_error,
+            'fetches': self.fetch_count,
+            'changes': self.change_count,
+            'errors': self.error_count
+        }
+
+
+class FileSource(DataSource):
+    """
+    A workbook on this machine, such as the scanner's qr_codes.xlsx.
+
+    The file is only hashed when its size or modification time changed, and only re-read when
+    its content (or, for scanner workbooks, the configuration the codes are split with) changed.
+    A file caught half-written fails to read and the previous rows are kept.
+    """
+
+    kind = 'file'
+
+    def __init__(self, name, path, columns, config_provider):
+        super().__init__(name)
+        self.path = path
+        # Callables returning the headers to read and the game configuration
+        self.columns = columns
+        self.config_provider = config_provider
+        self.stamp = None
+
+    @property
+    def location(self):
+        return self.path
+
+    def _fetch(self):
+        config = self.config_provider()
+        stat = os.stat(self.path)
+        signature = config_signature(config)
+        stamp = (stat.st_size, stat.st_mtime_ns, signature)
+        if stamp == self.stamp:
+            return False
+        digest = f"{hash_file(self.path)[:16]}-{signature}"
+        if digest != self.digest:
+            self.frame = read_workbook_rows(self.path, self.columns(), config)
+        changed = digest != self.digest
+        self.digest = digest
+        self.stamp = stamp
+        return changed
+
+
+class UrlSource(FileSource):
+    """
+    A workbook behind a share link, downloaded conditionally by a WorkbookDownloader.
+
+    Without columns the source only downloads (the main workbook, which the repository parses);
+    on_download is called with the local path after every new download.
+    """
+
+    kind = 'url'
+
+    def __init__(self, name, url, local_path, downloader, columns=None, config_provider=None, on_download=None):
+        super().__init__(name, local_path, columns, config_provider)
+        self.url = url
+        self.downloader = downloader
+        self.on_download = on_download
+
+    @property
+    def location(self):
+        return self.url
+
+    def _fetch(self):
+        downloaded = self.downloader.download(self.url, self.path)
+        if downloaded and self.on_download is not None:
+            self.on_download(self.path)
+        if self.columns is None:
+            return downloaded
+        return super()._fetch()
+
+
+class FolderSource(DataSource):
+    """
+    Every workbook in a folder (e.g. exports copied from scanning laptops), read as one source.
+
+    Files are tracked individually, so only new or changed files are read; a file that fails to
+    read keeps its previous rows and is reported in file_errors.
+    """
+
+    kind = 'folder'
+
+    def __init__(self, name, folder, columns, config_provider):
+        super().__init__(name)
+        self.folder = folder
+        self.columns = columns
+        self.config_provider = config_provider
+        self.files = {}
+        self.file_errors = {}
+
+    @property
+    def location(self):
+        return self.folder
+
+    def _fetch(self):
+        paths = sorted(os.path.join(self.folder, name) for name in os.listdir(self.folder)
+                       if name.lower().endswith(WORKBOOK_EXTENSIONS) and not name.startswith(('~$', '.')))
+        changed = set(paths) != set(self.files)
+        self.files = {path: self.files.get(path) or FileSource(os.path.basename(path), path, self.columns,
+                                                                self.config_provider)
+                      for path in paths}
+        self.file_errors = {}
+        for path, source in self.files.items():
+            if source.fetch() == 'changed':
+                changed = True
+            elif source.last_result == 'error':
+                self.file_errors[source.name] = source.last_error
+        if not changed:
+            return False
+
+        frames = [source.frame for source in self.files.values() if source.frame is not None]
+        self.frame = pd.concat(frames, ignore_index=True) if frames else None
+        self.digest = hashlib.sha256(' '.join(source.digest or '' for source in self.files.values())
+                                     .encode('utf-8')).hexdigest()
+        return True
+
+    def describe(self):
+        description = super().describe()
+        description['files'] = len(self.files)
+        description['file_errors'] = self.file_errors
+        return description
+
+
+class PeerSource(DataSource):
+    """
+    Another HeroScout server, read through its /export_rows route.
+
+    Requests carry the ETag of the last answer, so a peer whose rows are unchanged answers 304
+    with no body. With login required on the peer, both servers need the same 'peer_secret'
+    setting; it is sent in the PEER_SECRET_HEADER header, which the peer checks instead of a login.
+    """
+
+    kind = 'peer'
+
+    def __init__(self, name, base_url, secret=None, timeout=PEER_TIMEOUT):
+        super().__init__(name)
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        if secret:
+            self.session.headers[PEER_SECRET_HEADER] = secret
+        self.etag = None
+
+    @property
+    def location(self):
+        return self.base_url
+
+    def _fetch(self):
+        headers = {'If-None-Match': self.etag} if self.etag and self.frame is not None else {}
+        response = self.session.get(f"{self.base_url}/export_rows", headers=headers, timeout=self.timeout,
+                                    allow_redirects=False)
+        if response.status_code == 304:
+            return False
+        if 300 <= response.status_code < 400 or response.status_code == 403:
+            raise PermissionError("The peer requires a login; set the same 'peer_secret' on both servers")
+        response.raise_for_status()
+        payload = response.json()
+        # The peer's ETag identifies its rows; data versions change with every rebuild
+        digest = f"{self.name}-{response.headers.get('ETag') or payload['data_version']}"
+        if digest != self.digest:
+            self.frame = frame_from_records(payload['rows'], payload.get('columns'))
+        changed = digest != self.digest
+        self.digest = digest
+        self.etag = response.headers.get('ETag')
+        return changed
+
+
+def build_source(spec, base_dir, cache_dir, columns, config_provider, downloader_factory, peer_secret=None):
+    """
+    Create a source from one entry of the 'data_sources' setting
+
+    Args:
+        spec (dict): {'type': 'url', 'file', 'folder' or 'peer', 'name', and 'url' or 'path';
+                     optionally 'secret' for peers}
+        base_dir (str): Directory relative paths are resolved against
+        cache_dir (str): Directory downloaded workbooks are kept in
+        columns (callable): Returns the headers to read
+        config_provider (callable): Returns the game configuration
+        downloader_factory (callable): Creates a WorkbookDownloader from a state file path
+        peer_secret (str): Secret sent to peers whose entry has no 'secret' of its own
+
+    Returns:
+        DataSource: The source
+
+    Raises:
+        ValueError: If the entry has an unknown type or lacks its url or path
+    """
+    kind = spec.get('type')
+    if kind not in SOURCE_TYPES:
+        raise ValueError(f"Unknown data source type '{kind}', expected one of {', '.join(SOURCE_TYPES)}")
+    target = spec.get('url') if kind in ('url', 'peer') else spec.get('path')
+    if not target:
+        raise ValueError(f"Data source of type '{kind}' needs {'a url' if kind in ('url', 'peer') else 'a path'}")
+    name = spec.get('name') or f"{kind}:{target}"
+    if kind == 'peer':
+        return PeerSource(name, target, secret=spec.get('secret') or peer_secret)
+    if kind == 'url':
+        os.makedirs(cache_dir, exist_ok=True)
+        safe_name = hashlib.sha256(name.encode('utf-8')).hexdigest()[:12]
+        local_path = os.path.join(cache_dir, f"{safe_name}.xlsx")
+        downloader = downloader_factory(os.path.join(cache_dir, f"{safe_name}.download_state.json"))
+        return UrlSource(name, target, local_path, downloader, columns, config_provider)
+    path = target if os.path.isabs(target) else os.path.join(base_dir, target)
+    if kind == 'folder':
+        return FolderSource(name, path, columns, config_provider)
+    return FileSource(name, path, columns, config_provider)
+
+
+class DataSources:
+    """
+    The set of sources, fetched concurrently.
+
+    refresh() checks every source at once in a thread pool, so a slow peer or share link does
+    not hold up the others.
+    """
+
+    def __init__(self, sources=(), workers=None):
+        self.sources = list(sources)
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.pool = None
+
+    def add(self, source):
+        """Add a source; names must be unique"""
+        if any(existing.name == source.name for existing in self.sources):
+            raise ValueError(f"Duplicate data source name '{source.name}'")
+        self.sources.append(source)
+
+    def refresh(self):
+        """
+        Fetch every source concurrently
+
+        Returns:
+            dict: {source name: 'changed', 'unchanged' or 'error'}
+        """
+        with self.lock:
+            if not self.sources:
+                return {}
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers or len(self.sources),
+                                               thread_name_prefix='DataSource')
+            futures = [(source.name, self.pool.submit(source.fetch)) for source in self.sources]
+            return {name: future.result() for name, future in futures}
+
+    def frames(self):
+        """
+        Get the rows of the sources that have their own
+
+        Returns:
+            list: (name, digest, raw frame) per source, in the configured order
+        """
+        return [(source.name, source.digest, source.frame) for source in self.sources if source.frame is not None]
+
+    def report(self):
+        """Freshness and latency of every source"""
+        return [source.describe() for source in self.sources]
@@ -0,0 +1,131 @@
+"""
+Dataset change log for HeroScout
+Keeps the per-team tables and row hashes of recent dataset generations so /changes can answer
+"what changed since version N" with only the teams whose tables changed and the matches that
+gained rows, instead of clients downloading every table again.
+"""
+
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from match_data import unmatched_rows
+from derived_tables import DerivedTableError, to_native
+
+# Set up logging
+logger = logging.getLogger('DatasetChanges')
+
+# Per-team tables sent to clients, keyed by team number
+DELTA_TABLES = ['team_averages', 'rankings', 'match_counts', 'defense']
+
+# Number of recent versions a client can ask for changes since
+MAX_VERSIONS = 32
+
+
+class VersionRecord:
+    """What the change log keeps of one generation: its per-team tables, row hashes and match numbers"""
+
+    def __init__(self, dataset):
+        self.data_version = dataset.data_version
+        self.tables = {}
+        self.errors = {}
+        for name in DELTA_TABLES:
+            table = dataset.tables.get(name)
+            if isinstance(table, DerivedTableError):
+                self.errors[name] = table.message
+            elif table is not None:
+                # JSON object keys are strings, so compare and send teams the same way
+                self.tables[name] = {str(team): value for team, value in table.items()}
+        self.row_hashes = dataset.row_hashes
+        frame = dataset.frame
+        self.match_numbers = (frame['Match Number'].to_numpy(dtype=float, na_value=np.nan)
+                              if 'Match Number' in frame.columns else None)
+
+
+class ChangeLog:
+    """
+    Bounded history of dataset versions.
+
+    Record every published generation; changes(since) diffs the current version against an
+    earlier one, or returns every table when that version is no longer (or never was) recorded
+    in this log, so a version from another log or an earlier server run is never diffed against.
+    """
+
+    def __init__(self, max_versions=MAX_VERSIONS):
+        self.max_versions = max_versions
+        self.lock = threading.Lock()
+        self.records = OrderedDict()
+
+    def record(self, dataset):
+        """Remember a newly published generation (recording the newest one again does nothing)"""
+        with self.lock:
+            if self.records and next(reversed(self.records)) == dataset.data_version:
+                return
+        record = VersionRecord(dataset)
+        with self.lock:
+            self.records[record.data_version] = record
+            while len(self.records) > self.max_versions:
+                self.records.popitem(last=False)
+
+    def changes(self, since):
+        """
+        Get the changes between an earlier version and the newest one
+
+        Args:
+            since (int): A version the client already has, or None
+
+        Returns:
+            dict: {'version', 'since', 'full', 'tables', 'removed', 'errors', 'teams', 'matches',
+                  'rows_added', 'rows_removed'}. With 'full' True, 'tables' holds every team;
+                  otherwise only the teams whose entry changed, with teams that disappeared listed
+                  in 'removed'.
+        """
+        with self.lock:
+            if not self.records:
+                return None
+            current = next(reversed(self.records.values()))
+            previous = self.records.get(since)
+
+        result = {
+            'version': current.data_version,
+            'since': since,
+            'full': previous is None,
+            'tables': {},
+            'removed': {},
+            'errors': current.errors,
+            'teams': [],
+            'matches': [],
+            'rows_added': 0,
+            'rows_removed': 0
+        }
+
+        if previous is None:
+            # Unknown or expired version: send everything
+            result['tables'] = current.tables
+            return result
+        if previous is current:
+            return result
+
+        changed_teams = set()
+        for name, table in current.tables.items():
+            old_table = previous.tables.get(name, {})
+            changed = {team: value for team, value in table.items() if old_table.get(team) != value}
+            removed = [team for team in old_table if team not in table]
+            result['tables'][name] = changed
+            result['removed'][name] = removed
+            changed_teams.update(changed)
+            changed_teams.update(removed)
+        result['teams'] = sorted(changed_teams, key=lambda team: (len(team), team))
+
+        added = unmatched_rows(current.row_hashes, previous.row_hashes)
+        removed_rows = unmatched_rows(previous.row_hashes, current.row_hashes)
+        result['rows_added'] = int(len(added))
+        result['rows_removed'] = int(len(removed_rows))
+        if current.match_numbers is not None and len(added):
+            matches = current.match_numbers[added]
+            matches = matches[~np.isnan(matches)]
+            result['matches'] = [int(match) if float(match).is_integer() else to_native(match)
+                                 for match in np.unique(matches)]
+        return result
@@ -0,0 +1,223 @@
+"""
+Persistent derived-table cache for HeroScout
+Saves what a dataset generation computes from its rows (scores, per-team aggregates and every
+derived table) to one compact .npz file per generation, keyed by the workbook's content hash,
+the configuration signature and a hash of the final rows. After a restart, a generation whose
+keys match is loaded in milliseconds instead of being scored and aggregated again.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import logging
+
+import numpy as np
+import pandas as pd
+
+from team_aggregates import TeamAggregates
+from derived_tables import DerivedTableError
+
+# Set up logging
+logger = logging.getLogger('DerivedCache')
+
+# Bump when the file layout or the meaning of a derived table changes so old entries are ignored
+DERIVED_CACHE_FORMAT = 1
+
+# Number of cached generations to keep before the oldest are pruned
+MAX_ENTRIES = 8
+
+# TeamAggregates state saved as arrays
+AGGREGATE_ARRAYS = ('count', 'sum', 'sumsq', 'max', 'rows', 'score')
+
+
+def cache_key(workbook_digest, signature, hashes):
+    """
+    Build the cache key of a generation
+
+    Args:
+        workbook_digest (str): Content hash of the workbook
+        signature (str): match_data.config_signature of the configuration (scoring rules included)
+        hashes (numpy.ndarray): Row hashes of the final frame, covering live rows and deduplication
+
+    Returns:
+        str: A file-name-safe key
+    """
+    rows_digest = hashlib.sha256(np.ascontiguousarray(hashes, dtype=np.uint64).tobytes()).hexdigest()[:12]
+    return f"{workbook_digest[:16]}-{signature}-{rows_digest}"
+
+
+def encode_table(table):
+    """A derived table as JSON: ordered [key, value] pairs (so integer team keys survive), a list, or an error"""
+    if isinstance(table, DerivedTableError):
+        return {'error': table.message, 'status': table.status}
+    if isinstance(table, dict):
+        return {'pairs': [[key, value] for key, value in table.items()]}
+    return {'list': table}
+
+
+def decode_table(data):
+    """Rebuild a derived table saved by encode_table"""
+    if 'error' in data:
+        return DerivedTableError(data['error'], data['status'])
+    if 'pairs' in data:
+        return {key: value for key, value in data['pairs']}
+    return data['list']
+
+
+def aggregate_state(aggregates):
+    """
+    Split per-team aggregates into JSON metadata and arrays
+
+    Returns:
+        tuple: (dict or None, {name: numpy.ndarray}); metadata is None for aggregates that are
+               not TeamAggregates (e.g. SQLite-backed ones, which persist on their own)
+    """
+    if isinstance(aggregates, DerivedTableError):
+        return {'error': aggregates.message, 'status': aggregates.status}, {}
+    if not isinstance(aggregates, TeamAggregates):
+        return None, {}
+    meta = {'columns': aggregates.columns, 'row_total': aggregates.row_total,
+            'teams': [team.item() if isinstance(team, np.generic) else team for team in aggregates.teams]}
+    return meta, {f"aggregates_{name}": getattr(aggregates, name) for name in AGGREGATE_ARRAYS}
+
+
+def restore_aggregates(meta, arrays):
+    """
+    Rebuild per-team aggregates from aggregate_state
+
+    Args:
+        meta (dict or None): The metadata
+        arrays (mapping): The arrays, by name
+
+    Returns:
+        TeamAggregates, DerivedTableError or None
+    """
+    if meta is None:
+        return None
+    if 'error' in meta:
+        return DerivedTableError(meta['error'], meta['status'])
+    aggregates = TeamAggregates(meta['columns'])
+    for name in AGGREGATE_ARRAYS:
+        setattr(aggregates, name, arrays[f"aggregates_{name}"])
+    aggregates.teams = list(meta['teams'])
+    aggregates.index = {team: slot for slot, team in enumerate(aggregates.teams)}
+    aggregates.row_total = meta['row_total']
+    return aggregates
+
+
+class DerivedTableCache:
+    """
+    Directory of derived-table files, one per generation.
+
+    Files are written to a temporary name and renamed into place, so a crash mid-write never
+    leaves a readable partial entry.
+    """
+
+    def __init__(self, cache_dir, max_entries=MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saves = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.derived.npz")
+
+    def has(self, key):
+        """Check whether a generation is cached"""
+        return os.path.exists(self._path(key))
+
+    def save(self, key, scores, aggregates, tables):
+        """
+        Save a generation's derived data
+
+        Aggregates other than TeamAggregates (e.g. SQLite-backed ones, which persist on their own)
+        are not saved; the tables always are.
+
+        Args:
+            key (str): From cache_key
+            scores (pandas.Series): Score per row
+            aggregates (TeamAggregates, StoreAggregates or DerivedTableError): Per-team aggregates
+            tables (dict): {table_name: table or DerivedTableError}
+
+        Returns:
+            bool: True if the entry was written
+        """
+        if self.has(key):
+            return True
+        aggregate_meta, aggregate_arrays = aggregate_state(aggregates)
+        arrays = dict(aggregate_arrays, scores=scores.to_numpy(dtype=float))
+        meta = {
+            'format': DERIVED_CACHE_FORMAT,
+            'tables': {name: encode_table(table) for name, table in tables.items()},
+            'aggregates': aggregate_meta
+        }
+
+        try:
+            with self.lock:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.cache_dir)
+                try:
+                    with os.fdopen(fd, 'wb') as file:
+                        np.savez(file, meta=np.array(json.dumps(meta)), **arrays)
+                    os.replace(tmp_path, self._path(key))
+                except Exception:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+                self.saves += 1
+                self._prune()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save derived tables for {key}: {str(e)}")
+            return False
+
+    def load(self, key, index):
+        """
+        Load a generation's derived data
+
+        Args:
+            key (str): From cache_key
+            index (pandas.Index): Index of the frame, which the scores are aligned with
+
+        Returns:
+            tuple or None: (scores, aggregates or None if they were not saved, tables), or None
+                           if the generation is not cached
+        """
+        try:
+            with np.load(self._path(key), allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if meta.get('format') != DERIVED_CACHE_FORMAT or len(data['scores']) != len(index):
+                    self.misses += 1
+                    return None
+                scores = pd.Series(data['scores'], index=index, name='Score')
+                aggregates = restore_aggregates(meta['aggregates'], data)
+            tables = {name: decode_table(table) for name, table in meta['tables'].items()}
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.error(f"Failed to load derived tables for {key}, rebuilding: {str(e)}")
+            self.misses += 1
+            return None
+        # Mark the entry as recently used so pruning keeps it
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        self.hits += 1
+        return scores, aggregates, tables
+
+    def _prune(self):
+        """Remove the least recently used entries beyond max_entries"""
+        try:
+            entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                       if name.endswith('.derived.npz')]
+            entries.sort(key=os.path.getmtime, reverse=True)
+            for stale in entries[self.max_entries:]:
+                os.remove(stale)
+        except OSError as e:
+            logger.warning(f"Could not prune derived tables: {str(e)}")
@@ -0,0 +1,177 @@
+"""
+Derived tables for HeroScout
+Team lists, per-team averages, rankings, match counts and the defense table, computed once per
+dataset generation instead of once per request.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from column_schema import widen_floats
+
+# Set up logging
+logger = logging.getLogger('DerivedTables')
+
+
+class DerivedTableError(Exception):
+    """A table could not be built; carries the message and HTTP status the route should return"""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def to_native(value):
+    """Convert NumPy scalars to native Python types for JSON serialization, NaN/inf to None"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if pd.isna(value) or (isinstance(value, (int, float, np.number)) and np.isinf(value)):
+        return None
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+
+def json_records(frame):
+    """
+    Convert rows to JSON-ready dicts: missing cells (NaN, <NA>) become None, since jsonify would
+    otherwise write NaN, which browsers cannot parse, or fail on <NA>
+
+    Returns:
+        list: One {column: value} dict per row
+    """
+    return [{col: to_native(value) for col, value in record.items()} for record in frame.to_dict(orient='records')]
+
+
+def defense_table(df):
+    """
+    Defense metrics per team with an overall defense score, best defenders first
+
+    Returns:
+        dict: {team_number: {'score': float, 'metrics': {metric: float}}}
+    """
+    # Average at full precision
+    df = widen_floats(df)
+
+    # Check if defense metrics exist in the data
+    defense_metrics = [col for col in ('Defense Performed', 'Defense Quality', 'Defense Time') if col in df.columns]
+
+    if not defense_metrics:
+        # If no explicit defense columns, create a simpler metric based on breakdowns and fouls
+        # Work on a copy so the shared match frame is not modified
+        df = df.copy()
+        df['Defense Rating'] = 0
+
+        # Teams that break down less frequently might be more reliable for defense
+        if 'Broke (T/F)' in df.columns:
+            # Lower break rate is better for defense (invert the value)
+            df['Defense Rating'] += (1 - df['Broke (T/F)'].fillna(0)) * 2
+
+        # Teams with more fouls might be playing more aggressively on defense
+        if 'Major Fouls' in df.columns:
+            # Normalize major fouls to a 0-1 scale for the dataset
+            max_fouls = df['Major Fouls'].max() if df['Major Fouls'].max() > 0 else 1
+            df['Defense Rating'] += df['Major Fouls'].fillna(0) / max_fouls
+
+        if 'Minor Fouls' in df.columns:
+            # Normalize minor fouls to a 0-1 scale but with less weight than major fouls
+            max_fouls = df['Minor Fouls'].max() if df['Minor Fouls'].max() > 0 else 1
+            df['Defense Rating'] += (df['Minor Fouls'].fillna(0) / max_fouls) * 0.5
+
+        defense_metrics = ['Defense Rating']
+
+    # Group by team and calculate defense metrics
+    team_defense = df.groupby('Team Number')[defense_metrics].mean().reset_index()
+
+    # Process the data to ensure metrics are in proper ranges
+    for col in defense_metrics:
+        if col == 'Defense Performed':
+            # Ensure Defense Performed is in 0-1 range (representing percentage)
+            # If values are already large (>1), assume they're incorrectly scaled
+            if team_defense[col].max() > 1:
+                team_defense[col] = team_defense[col] / 100
+
+            # Cap at 1.0 to ensure percentage is valid
+            team_defense[col] = team_defense[col].clip(0, 1)
+
+        elif col == 'Defense Quality':
+            # Normalize to a 0-5 scale if not already
+            if team_defense[col].max() > 5:
+                team_defense[col] = (team_defense[col] / team_defense[col].max()) * 5
+
+    # Calculate an overall defense score (weighted average if multiple metrics exist)
+    if len(defense_metrics) > 1:
+        # Create a weighted average based on metric importance
+        weights = {
+            'Defense Performed': 0.4,
+            'Defense Quality': 0.4,
+            'Defense Time': 0.2,
+            'Defense Rating': 1.0
+        }
+
+        team_defense['Overall Defense'] = sum(
+            team_defense[metric] * weights.get(metric, 0.3)
+            for metric in defense_metrics
+        )
+    else:
+        # Just use the single metric
+        team_defense['Overall Defense'] = team_defense[defense_metrics[0]]
+
+    # Sort by defense score (descending)
+    team_defense = team_defense.sort_values('Overall Defense', ascending=False)
+
+    # Filter out team 0 and any invalid teams
+    team_defense = team_defense[team_defense['Team Number'] > 0]
+
+    defense_teams = {}
+    for _, row in team_defense.iterrows():
+        defense_teams[int(row['Team Number'])] = {
+            'score': float(row['Overall Defense']),
+            'metrics': {metric: float(row[metric]) for metric in defense_metrics}
+        }
+    return defense_teams
+
+
+def build_derived_tables(df, aggregates, config):
+    """
+    Build every derived table for one dataset generation
+
+    A table that fails to build is stored as its DerivedTableError so the route can report it,
+    without stopping the other tables from being built.
+
+    Args:
+        df (pandas.DataFrame): Match rows
+        aggregates (TeamAggregates or DerivedTableError): Running per-team totals for df
+        config (dict): The game configuration
+
+    Returns:
+        dict: {table_name: table or DerivedTableError}
+    """
+    def from_aggregates(name):
+        if isinstance(aggregates, DerivedTableError):
+            raise aggregates
+        return getattr(aggregates, name)()
+
+    builders = {
+        'teams': lambda: from_aggregates('team_numbers'),
+        'team_averages': lambda: from_aggregates('averages'),
+        'rankings': lambda: from_aggregates('rankings'),
+        'match_counts': lambda: from_aggregates('match_counts'),
+        'defense': lambda: defense_table(df),
+    }
+
+    tables = {}
+    for name, build in builders.items():
+        try:
+            tables[name] = build()
+        except DerivedTableError as e:
+            tables[name] = e
+        except Exception as e:
+            logger.error(f"Failed to build derived table '{name}': {str(e)}")
+            tables[name] = DerivedTableError(str(e), 500)
+    return tables
@@ -0,0 +1,358 @@
+"""
+Event and day partitions for HeroScout
+Watches the per-event and per-day workbook folders (Days/, SHSCOUTEXCEL/), ingests new or changed
+workbooks on a thread pool and builds datasets for any selection of events and days by
+concatenating the partitions' canonical frames. Each selection keeps its own change log, so
+/changes works for a filtered view too.
+"""
+
+import os
+import glob
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from match_data import MATCH_SHEET, FileVersion, MatchDataset, config_signature, column_signature, hash_file, row_hashes
+from sheet_reader import read_sheet_columns
+from sidecar_store import SidecarStore
+from column_schema import schema_resolver
+from scoring import score_frame
+from team_aggregates import TeamAggregates
+from derived_tables import DerivedTableError, build_derived_tables
+from row_dedup import dedup_frame
+from dataset_changes import ChangeLog
+from single_flight import single_flight
+
+# Set up logging
+logger = logging.getLogger('EventPartitions')
+
+# Folders holding one workbook per event or per event day
+PARTITION_FOLDERS = ['Days', 'SHSCOUTEXCEL']
+
+# Day names recognised at the start of a workbook name, e.g. ThursdayOKTU.xlsx
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Filter value selecting every event
+ALL_EVENTS = 'ALL'
+
+# Number of event/day selections whose change history is kept
+MAX_CHANGE_LOGS = 16
+
+
+def partition_key(file_path):
+    """
+    Get the (event, day) a partition workbook belongs to from its file name
+
+    'Days/ThursdayOKTU.xlsx' is event 'OKTU' on Thursday, 'SHSCOUTEXCEL/OKOK-SHSCOUT.xlsx' is
+    event 'OKOK' with no day.
+
+    Returns:
+        tuple: (event, day) with the event upper-cased and day None if the name has no day
+    """
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    day = None
+    for weekday in WEEKDAYS:
+        if stem.lower().startswith(weekday.lower()):
+            day = weekday
+            stem = stem[len(weekday):].lstrip(' -_')
+            break
+    event = stem.split('-')[0].strip() or os.path.basename(os.path.dirname(file_path))
+    return event.upper(), day
+
+
+def parse_partition(file_path, columns):
+    """Read the match sheet (or the first sheet) of one partition workbook"""
+    return read_sheet_columns(file_path, MATCH_SHEET, columns, first_sheet_fallback=True)
+
+
+def worker_pool(workers):
+    """
+    Create the pool used to parse several workbooks at once
+
+    Workbooks are parsed in threads, not processes: avg.py runs the window, the server and
+    background threads at import time, so forking it can deadlock on a lock held by another
+    thread, and spawned workers would run avg.py again. Threads overlap the file reads and zip
+    decompression, but openpyxl's XML parsing holds the GIL, so ingest is bounded by one core:
+    several workbooks take about as long as parsing them one by one (measured by
+    benchmarks/bench_ingest.py). Sidecars make this a cost of new or changed workbooks only.
+    """
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='WorkbookParser')
+
+
+class Partition:
+    """One ingested workbook: its event and day, file version and canonical frame with scores"""
+
+    def __init__(self, file_path, version, signature, frame, scores):
+        self.file_path = file_path
+        self.event, self.day = partition_key(file_path)
+        self.version = version
+        self.config_signature = signature
+        self.frame = frame
+        self.scores = scores
+
+    def describe(self):
+        """Summary shown by /get_partitions"""
+        return {
+            'event': self.event,
+            'day': self.day,
+            'file': os.path.basename(self.file_path),
+            'rows': len(self.frame),
+            'version': self.version.digest[:12]
+        }
+
+
+class EventPartitions:
+    """
+    Partitioned multi-event dataset.
+
+    A watcher thread polls the partition folders; workbooks whose content hash changed are
+    parsed on a thread pool (one core, see worker_pool) and kept as canonical frames. select() builds (and caches) a
+    complete MatchDataset for the partitions matching an event and/or day filter, so every
+    route can serve a filtered view through the same code path as the live workbook.
+    """
+
+    def __init__(self, base_dir, folders, columns, config_provider, cache_dir=None, workers=None,
+                 poll_interval=10, max_selections=4):
+        self.folders = [os.path.join(base_dir, folder) for folder in folders]
+        # Callable returning the set of headers to materialize
+        self.columns = columns
+        # Callable returning the current game configuration
+        self.config_provider = config_provider
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.poll_interval = poll_interval
+        self.max_selections = max_selections
+        self.sidecars = SidecarStore(cache_dir, max_sidecars=32) if cache_dir else None
+        self.lock = threading.Lock()
+        self.partitions = {}
+        self.selections = OrderedDict()
+        # ChangeLog per (event, day) filter, recording every dataset built for it
+        self.change_logs = OrderedDict()
+        self.generation = 0
+        # Data version of the last built dataset (milliseconds at build time, always increasing, so
+        # versions of different selections never collide and keep increasing across restarts)
+        self.data_version = 0
+        self.ingest_count = 0
+        self.last_scan = None
+        self.thread = None
+
+    def start(self):
+        """Ingest the current workbooks in the background and keep watching the folders"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._watch, name='EventPartitions', daemon=True)
+            self.thread.start()
+
+    def _watch(self):
+        while True:
+            try:
+                self.scan()
+            except Exception as e:
+                logger.error(f"Partition scan failed: {str(e)}")
+            time.sleep(self.poll_interval)
+
+    def _workbooks(self):
+        """List the partition workbooks, skipping Office lock files"""
+        paths = []
+        for folder in self.folders:
+            for path in sorted(glob.glob(os.path.join(folder, '*.xlsx'))):
+                if not os.path.basename(path).startswith('~$'):
+                    paths.append(path)
+        return paths
+
+    def scan(self):
+        """Ingest new or changed workbooks and drop removed ones"""
+        config = self.config_provider()
+        signature = config_signature(config)
+        columns = self.columns()
+
+        workbooks = self._workbooks()
+        changed = []
+        for path in workbooks:
+            current = self.partitions.get(path)
+            stat = os.stat(path)
+            if (current is not None and current.config_signature == signature
+                    and (stat.st_mtime, stat.st_size) == (current.version.mtime, current.version.size)):
+                continue
+            version = FileVersion(stat.st_mtime, stat.st_size, hash_file(path))
+            if current is not None and current.config_signature == signature and current.version.digest == version.digest:
+                # Touched but unchanged
+                current.version = version
+                continue
+            changed.append((path, version))
+
+        removed = set(self.partitions) - set(workbooks)
+        if changed:
+            self._ingest(changed, columns, config, signature)
+        if removed:
+            with self.lock:
+                for path in removed:
+                    self.partitions.pop(path, None)
+                self.selections.clear()
+            logger.info(f"Removed {len(removed)} partition(s)")
+        self.last_scan = time.time()
+
+    def _load_frames(self, changed, columns):
+        """Get the raw frames for changed workbooks from sidecars, parsing the rest on the worker pool"""
+        frames = {}
+        to_parse = []
+        for path, version in changed:
+            key = f"{version.digest}-{column_signature(columns)}"
+            frame = self.sidecars.load(key) if self.sidecars is not None else None
+            if frame is not None:
+                frames[path] = frame
+            else:
+                to_parse.append((path, key))
+
+        if to_parse:
+            with worker_pool(min(self.workers, len(to_parse))) as pool:
+                futures = {path: pool.submit(parse_partition, path, columns) for path, _ in to_parse}
+                for path, future in futures.items():
+                    try:
+                        frames[path] = future.result()
+                    except Exception as e:
+                        logger.error(f"Failed to parse partition {os.path.basename(path)}: {str(e)}")
+
+        if self.sidecars is not None:
+            for path, key in to_parse:
+                if path in frames:
+                    self.sidecars.write(key, frames[path])
+        return frames
+
+    def _ingest(self, changed, columns, config, signature):
+        frames = self._load_frames(changed, columns)
+        rules = config.get('scoring_rules', {})
+        ingested = {}
+        for path, version in changed:
+            raw = frames.get(path)
+            if raw is None:
+                continue
+            frame = schema_resolver.resolve(raw, config)
+            ingested[path] = Partition(path, version, signature, frame, score_frame(frame, rules))
+
+        with self.lock:
+            self.partitions.update(ingested)
+            self.selections.clear()
+            self.ingest_count += len(ingested)
+        for partition in ingested.values():
+            logger.info(f"Ingested partition {partition.event}/{partition.day or '-'} "
+                        f"({len(partition.frame)} rows from {os.path.basename(partition.file_path)})")
+
+    def list_partitions(self):
+        """Describe every ingested partition, ordered by event and day"""
+        with self.lock:
+            partitions = list(self.partitions.values())
+        return sorted((partition.describe() for partition in partitions),
+                      key=lambda item: (item['event'], item['day'] or '', item['file']))
+
+    def _matching(self, event, day):
+        event = event.upper() if event else None
+        with self.lock:
+            partitions = list(self.partitions.values())
+        return sorted(
+            (partition for partition in partitions
+             if (event in (None, ALL_EVENTS) or partition.event == event)
+             and (day is None or (partition.day or '').lower() == day.lower())),
+            key=lambda partition: partition.file_path
+        )
+
+    def select(self, event=None, day=None):
+        """
+        Get a dataset for the partitions matching an event and/or day filter
+
+        Args:
+            event (str): Event code (case-insensitive), 'all' for every event, or None
+            day (str): Day name (case-insensitive) or None
+
+        Returns:
+            MatchDataset or None: The combined dataset, or None if no partition matches
+        """
+        partitions = self._matching(event, day)
+        if not partitions:
+            return None
+
+        key = tuple((partition.file_path, partition.version.digest, partition.config_signature)
+                    for partition in partitions)
+        with self.lock:
+            dataset = self.selections.get(key)
+            if dataset is not None:
+                self.selections.move_to_end(key)
+
+        if dataset is None:
+            # Requests arriving together for the same selection share one build
+            dataset = single_flight.do('select_partitions', key, lambda: self._build(partitions))
+            with self.lock:
+                self.selections[key] = dataset
+                while len(self.selections) > self.max_selections:
+                    self.selections.popitem(last=False)
+        # Filters matching the same partitions share the dataset, so each filter's log records it
+        # when first served through that filter
+        self._change_log(event, day).record(dataset)
+        return dataset
+
+    def _change_log(self, event, day):
+        """Get the change log of an event/day filter, creating it if needed"""
+        event = event.upper() if event else ALL_EVENTS
+        selection = (event, day.lower() if day else None)
+        with self.lock:
+            log = self.change_logs.get(selection)
+            if log is None:
+                log = self.change_logs[selection] = ChangeLog()
+                while len(self.change_logs) > MAX_CHANGE_LOGS:
+                    self.change_logs.popitem(last=False)
+            else:
+                self.change_logs.move_to_end(selection)
+            return log
+
+    def changes(self, event=None, day=None, since=None):
+        """
+        Get what changed in the dataset of an event and/or day filter since an earlier version of it
+
+        Args:
+            event (str): Event code (case-insensitive), 'all' for every event, or None
+            day (str): Day name (case-insensitive) or None
+            since (int): A version of this selection the client already has, or None
+
+        Returns:
+            dict or None: See ChangeLog.changes; None if no partition matches
+        """
+        if self.select(event, day) is None:
+            return None
+        return self._change_log(event, day).changes(since)
+
+    def _build(self, partitions):
+        """Concatenate partitions into one complete dataset generation"""
+        config = self.config_provider()
+        frames = []
+        for partition in partitions:
+            # Tag each row with its partition so cross-event history stays distinguishable
+            frames.append(partition.frame.assign(Event=partition.event, Day=partition.day or ''))
+        frame = pd.concat(frames, ignore_index=True)
+        # Restore the compact dtypes lost when partitions with different categories are combined
+        frame = schema_resolver.resolve(frame, config)
+        # The same team-match can be in more than one workbook (e.g. an event file and its day file)
+        frame, dedup = dedup_frame(frame, config)
+        if dedup['rows_out'] == dedup['rows_in'] and not dedup['conflicts']:
+            scores = pd.concat([partition.scores for partition in partitions], ignore_index=True)
+        else:
+            scores = score_frame(frame, config.get('scoring_rules', {}))
+
+        try:
+            aggregates = TeamAggregates.from_frame(frame, scores, config.get('include_columns', []))
+        except DerivedTableError as e:
+            aggregates = e
+        tables = build_derived_tables(frame, aggregates, config)
+
+        digest = hashlib.sha256('\n'.join(partition.version.digest for partition in partitions).encode('utf-8')).hexdigest()
+        version = FileVersion(max(partition.version.mtime for partition in partitions),
+                              sum(partition.version.size for partition in partitions), digest)
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+            self.data_version = max(self.data_version + 1, int(time.time() * 1000))
+            data_version = self.data_version
+        return MatchDataset(generation, version, partitions[0].config_signature, frame, scores, aggregates,
+                            tables, row_hashes(frame), data_version=data_version)
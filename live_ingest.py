@@ -0,0 +1,319 @@
+"""
+Live row ingestion for HeroScout
+Parses batches of scouting rows posted to /ingest (JSON, CSV or the whitespace-separated QR text
+the scanner produces), validates them against the configured columns and keeps them in a durable
+append-only journal, so they can be folded into the live dataset without waiting for the workbook.
+"""
+
+import io
+import os
+import csv
+import json
+import time
+import uuid
+import threading
+import logging
+
+import numpy as np
+
+from sheet_reader import frame_from_records, match_columns, notes_columns
+from column_schema import FLAG_SUFFIX, column_aliases, schema_resolver
+
+# Set up logging
+logger = logging.getLogger('LiveIngest')
+
+# Columns at the start of every QR code, before the include_columns
+QR_LEADING_COLUMNS = ['Scouter Name', 'Match Number', 'Team Number', 'Drive Team Location', 'Starting Location']
+
+# Column receiving the free-text words left over at the end of a QR code
+QR_NOTES_COLUMN = 'Additional Observations'
+
+# Multi-word values the scanner keeps together when splitting a QR code
+QR_PHRASES = ['No Card']
+
+
+class IngestError(Exception):
+    """A batch that cannot be parsed at all"""
+    pass
+
+
+def qr_fields(config):
+    """
+    Get the column order of a QR code: 'qr_columns' from the configuration, or the sheet layout
+    (leading key columns, then include_columns, then the notes)
+    """
+    return config.get('qr_columns') or QR_LEADING_COLUMNS + config.get('include_columns', [])
+
+
+def parse_qr_text(text, config):
+    """
+    Split QR codes (one per line) into row dicts, the same way qrcode.py splits them
+
+    Returns:
+        tuple: (list of row dicts, list of {'row', 'error'} for lines that do not fit)
+    """
+    fields = qr_fields(config)
+    records, rejected = [], []
+    lines = [line for line in text.splitlines() if line.strip()]
+    for i, line in enumerate(lines):
+        for phrase in QR_PHRASES:
+            line = line.replace(phrase, phrase.replace(' ', '_'))
+        parts = [part.replace('_', ' ') if part.replace('_', ' ') in QR_PHRASES else part for part in line.split()]
+        if len(parts) < len(fields):
+            rejected.append({'row': i, 'error': f"Expected at least {len(fields)} values, got {len(parts)}"})
+            continue
+        record = dict(zip(fields, parts))
+        if len(parts) > len(fields):
+            record[QR_NOTES_COLUMN] = ' '.join(parts[len(fields):])
+        records.append(record)
+    return records, rejected
+
+
+def parse_csv_text(text):
+    """Read CSV text with a header row into row dicts"""
+    return [dict(row) for row in csv.DictReader(io.StringIO(text))], []
+
+
+def parse_json_rows(payload):
+    """Accept a list of row objects, or {'rows': [...]}"""
+    rows = payload.get('rows') if isinstance(payload, dict) else payload
+    if not isinstance(rows, list):
+        raise IngestError("Expected a list of rows or an object with a 'rows' list")
+    records, rejected = [], []
+    for i, row in enumerate(rows):
+        if isinstance(row, dict):
+            records.append(row)
+        else:
+            rejected.append({'row': i, 'error': 'Row is not an object'})
+    return records, rejected
+
+
+def parse_batch(body, content_type, config, data_format=None):
+    """
+    Parse a posted batch in whichever format it is in
+
+    Args:
+        body (str): The request body
+        content_type (str): The request's Content-Type
+        config (dict): The game configuration
+        data_format (str): 'json', 'csv' or 'qr' to override detection
+
+    Returns:
+        tuple: (list of row dicts, list of {'row', 'error'} for rows that could not be read)
+    """
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    data_format = (data_format or '').lower()
+    if not data_format:
+        if content_type.endswith('json'):
+            data_format = 'json'
+        elif content_type == 'text/csv':
+            data_format = 'csv'
+        else:
+            # Plain text: CSV if the first line is a header naming the team column, otherwise QR codes
+            first_line = body.lstrip().split('\n', 1)[0]
+            data_format = 'csv' if ',' in first_line and 'Team Number' in first_line else 'qr'
+
+    if data_format == 'json':
+        try:
+            return parse_json_rows(json.loads(body))
+        except ValueError as e:
+            raise IngestError(f"Invalid JSON: {str(e)}")
+    if data_format == 'csv':
+        return parse_csv_text(body)
+    if data_format == 'qr':
+        return parse_qr_text(body, config)
+    raise IngestError(f"Unknown format '{data_format}'")
+
+
+def validate_rows(records, config):
+    """
+    Check rows against the configuration: every include_columns value present and numeric (or a
+    true/false value for (T/F) columns), and a positive team and match number
+
+    Column names are mapped to their canonical names first; columns the server never uses are
+    dropped and reported.
+
+    Returns:
+        tuple: (valid row dicts with canonical names, list of {'row', 'error'}, list of ignored columns)
+    """
+    aliases = column_aliases(config)
+    rename = {}
+    for name, alternatives in aliases.items():
+        for alt in alternatives:
+            rename.setdefault(alt, name)
+    known = set(match_columns(config)) | set(notes_columns())
+    include_columns = config.get('include_columns', [])
+
+    canonical_records, rejected, ignored = [], [], set()
+    for i, record in enumerate(records):
+        row = {}
+        for key, value in record.items():
+            name = key if key in aliases else rename.get(key, key)
+            if name not in known:
+                ignored.add(key)
+                continue
+            row[name] = None if isinstance(value, str) and not value.strip() else value
+        missing = [col for col in include_columns if row.get(col) is None]
+        if missing:
+            rejected.append({'row': i, 'error': f"Missing values for {', '.join(missing)}"})
+            continue
+        canonical_records.append((i, row))
+
+    if not canonical_records:
+        return [], rejected, sorted(ignored)
+
+    # Type the batch like a sheet and check the coerced values
+    frame = schema_resolver.resolve(frame_from_records([row for _, row in canonical_records]), config)
+    problems = [[] for _ in canonical_records]
+    checks = [(frame[key].to_numpy(dtype=float, na_value=np.nan) > 0 if key in frame.columns else np.zeros(len(frame), dtype=bool),
+               f"{key} must be a positive number") for key in ('Team Number', 'Match Number')]
+    checks += [(~np.isnan(frame[col].to_numpy(dtype=float)), f"'{col}' is not a number")
+               for col in include_columns if col in frame.columns and not col.endswith(FLAG_SUFFIX)]
+    for passed, message in checks:
+        for position in np.flatnonzero(~passed):
+            problems[position].append(message)
+
+    valid = []
+    for (i, row), problem in zip(canonical_records, problems):
+        if problem:
+            rejected.append({'row': i, 'error': '; '.join(problem)})
+        else:
+            valid.append(row)
+    rejected.sort(key=lambda item: item['row'])
+    return valid, rejected, sorted(ignored)
+
+
+class IngestJournal:
+    """
+    Append-only JSON-lines journal of ingested rows.
+
+    Each batch is written as one line per row and flushed to disk (fsync) before it is folded
+    into the live dataset, so accepted rows survive a restart. Rows that reach a published
+    workbook are compacted away, and the rows of one event can be cleared, by rewriting the
+    file atomically.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.row_count = 0
+        self.batch_count = 0
+        self.compacted_rows = 0
+
+    def append(self, records, source=None, event=None):
+        """
+        Durably append a batch of validated rows
+
+        Args:
+            records (list): Validated row dicts
+            source (str): Who posted the batch
+            event (str): Event the batch was scouted at, used by clear()
+
+        Returns:
+            str: The batch id
+        """
+        batch_id = uuid.uuid4().hex[:12]
+        received = time.time()
+        lines = ''.join(
+            json.dumps({'batch': batch_id, 'received': received, 'source': source, 'event': event, 'row': record},
+                       default=str) + '\n'
+            for record in records
+        )
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self.row_count += len(records)
+            self.batch_count += 1
+        return batch_id
+
+    def _entries(self):
+        """Read every journal entry, skipping unreadable (e.g. partially written) lines"""
+        entries = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        entry = None
+                    if not isinstance(entry, dict) or 'row' not in entry:
+                        logger.warning(f"Skipping unreadable journal line {line_number}")
+                        continue
+                    entries.append(entry)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _rewrite(self, entries):
+        """Replace the journal with the given entries; the old file stays until the new one is complete"""
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(entry, default=str) + '\n' for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.row_count = len(entries)
+
+    def load(self):
+        """
+        Read every journaled row, skipping a partially written last line
+
+        Returns:
+            list: Row dicts in ingestion order
+        """
+        with self.lock:
+            records = [entry['row'] for entry in self._entries()]
+            self.row_count = len(records)
+        return records
+
+    def compact(self, published):
+        """
+        Drop the rows a published workbook already contains
+
+        Args:
+            published (callable): Takes a list of row dicts and returns a boolean array marking
+                                  the rows that are in the workbook
+
+        Returns:
+            int: Number of rows dropped
+        """
+        with self.lock:
+            entries = self._entries()
+            if not entries:
+                return 0
+            dropped = np.asarray(published([entry['row'] for entry in entries]), dtype=bool)
+            if not dropped.any():
+                return 0
+            self._rewrite([entry for entry, drop in zip(entries, dropped) if not drop])
+            self.compacted_rows += int(dropped.sum())
+        logger.info(f"Compacted {int(dropped.sum())} journaled rows that are now in the workbook")
+        return int(dropped.sum())
+
+    def clear(self, event=None):
+        """
+        Drop the journaled rows of one event, or every row
+
+        Args:
+            event (str): Event code (case-insensitive); None clears the whole journal
+
+        Returns:
+            list: The row dicts still journaled, in ingestion order
+        """
+        with self.lock:
+            entries = self._entries()
+            if event is None:
+                kept = []
+            else:
+                kept = [entry for entry in entries if str(entry.get('event') or '').upper() != event.upper()]
+            if len(kept) != len(entries):
+                self._rewrite(kept)
+        logger.info(f"Cleared {len(entries) - len(kept)} journaled rows"
+                    + (f" of event {event.upper()}" if event is not None else ""))
+        return [entry['row'] for entry in kept]
@@ -0,0 +1,329 @@
+"""
+Shared match-data repository for HeroScout
+Parses the 'Match Data' sheet once per workbook version and hands every route the same frame
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from sidecar_store import SidecarStore
+from row_index import RowIndex
+from column_schema import widen_floats
+from sheet_reader import read_sheet_columns, notes_columns
+from single_flight import single_flight
+from derived_tables import to_native
+from team_aggregates import MAX_COLUMNS
+from match_store import StoreAggregates
+
+# Set up logging
+logger = logging.getLogger('MatchData')
+
+# Name of the sheet every route reads
+MATCH_SHEET = 'Match Data'
+
+# Identity of one version of the workbook on disk
+FileVersion = namedtuple('FileVersion', ['mtime', 'size', 'digest'])
+
+
+def config_signature(config):
+    """Return a short stable hash of the configuration keys that affect parsing and derived tables"""
+    relevant = {key: config.get(key) for key in ('team_column', 'include_columns', 'column_mappings', 'scoring_rules',
+                                                 'duplicate_policy', 'preferred_scouters')}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+def column_signature(columns):
+    """Return a short stable hash of a set of column names"""
+    return hashlib.sha256('\n'.join(sorted(columns)).encode('utf-8')).hexdigest()[:12]
+
+
+def numeric_columns(frame):
+    """Columns row_hashes compares as numbers (numbers and true/false flags)"""
+    return [col for col in frame.columns if frame[col].dtype == bool or frame[col].dtype.kind in 'iuf']
+
+
+def _canonical_text(values):
+    """A column's cells as text for hashing, with '' for missing cells; categoricals are converted once per category"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = np.append(values.cat.categories.astype(str).to_numpy(dtype=object), '')
+        return categories[values.cat.codes.to_numpy()]
+    return values.astype(object).where(values.notna(), '').astype(str).to_numpy()
+
+
+def row_hashes(frame, numeric=None):
+    """
+    Return one 64-bit hash per row of its cell values, used to recognise rows across workbooks
+
+    The hash does not depend on the column dtypes: numbers and flags are hashed as float64 and
+    everything else as text, so a row hashes the same whether its counts are stored as uint8 or
+    int16, with or without missing cells in the column, or came from a live batch.
+
+    Args:
+        frame (pandas.DataFrame): Canonical rows
+        numeric (list): Columns to hash as numbers (default: numeric_columns(frame)); pass the
+                        same list when comparing frames whose columns may be inferred differently
+    """
+    numeric = set(numeric_columns(frame) if numeric is None else numeric)
+    normalized = {}
+    for col in frame.columns:
+        values = frame[col]
+        if col in numeric:
+            normalized[col] = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        else:
+            normalized[col] = _canonical_text(values)
+    return pd.util.hash_pandas_object(pd.DataFrame(normalized, columns=list(frame.columns), index=frame.index),
+                                      index=False).to_numpy()
+
+
+def unmatched_rows(hashes, other):
+    """
+    Positions of rows in hashes with no matching row in other, counting duplicates, so the second
+    copy of a row only matches if other also has it twice
+
+    Args:
+        hashes (numpy.ndarray): Row hashes from row_hashes
+        other (numpy.ndarray): Row hashes to match against
+
+    Returns:
+        numpy.ndarray: Positions into hashes, ascending
+    """
+    if len(hashes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+    counts = pd.Series(other).value_counts() if len(other) else pd.Series(dtype=np.int64)
+    available = counts.reindex(hashes).fillna(0).to_numpy()
+    return np.flatnonzero(occurrence >= available)
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MatchDataset:
+    """
+    One complete, immutable generation of match data: the parsed frame, the per-row scores, the
+    running per-team aggregates, team and match row indexes and every derived table. Requests
+    only ever see a fully built generation.
+    """
+
+    def __init__(self, generation, version, config_signature, frame, scores, aggregates, tables, hashes, memory=None,
+                 data_version=None):
+        self.generation = generation
+        # Version clients compare against (see dataset_changes), increasing with every generation
+        self.data_version = data_version if data_version is not None else generation
+        self.version = version
+        self.config_signature = config_signature
+        self.frame = frame
+        self.scores = scores
+        self.aggregates = aggregates
+        self.tables = tables
+        # Per-row hashes, compared against the next workbook to detect append-only changes
+        self.row_hashes = hashes
+        # Row positions per team and per match, so lookups never scan the whole frame
+        self.team_index = RowIndex(frame['Team Number']) if 'Team Number' in frame.columns else RowIndex([])
+        self.match_index = RowIndex(frame['Match Number']) if 'Match Number' in frame.columns else RowIndex([])
+        # Per-column memory before and after the compact dtypes (see column_schema.memory_report)
+        self.memory = memory
+        self.built_at = time.time()
+
+    def _stored_rows(self, column, value):
+        """Rows queried from the SQLite store behind this generation, or None without a current store"""
+        if isinstance(self.aggregates, StoreAggregates):
+            return self.aggregates.stored_rows(column, value)
+        return None
+
+    def team_rows(self, team_number):
+        """Get the rows scouted for one team, in sheet order, widened to full precision (empty frame if none)"""
+        rows = self._stored_rows('Team Number', team_number)
+        if rows is not None:
+            return rows
+        return widen_floats(self.frame.iloc[self.team_index.positions(team_number)])
+
+    def match_rows(self, match_number):
+        """Get the rows scouted for one match, in sheet order, widened to full precision (empty frame if none)"""
+        rows = self._stored_rows('Match Number', match_number)
+        if rows is not None:
+            return rows
+        return widen_floats(self.frame.iloc[self.match_index.positions(match_number)])
+
+    def team_summary(self, team_number, columns):
+        """
+        Get the average of each column over one team's rows (the maximum for Endgame Barge)
+
+        With a SQLite store the aggregates run in the database; otherwise they are computed from
+        the team's rows.
+
+        Returns:
+            dict or None: {column: JSON-friendly value}, or None if the team has no rows
+        """
+        if isinstance(self.aggregates, StoreAggregates):
+            summary = self.aggregates.team_summary(team_number, columns)
+            if summary is not None:
+                return summary or None
+        rows = self.team_rows(team_number)
+        if rows.empty:
+            return None
+        return {col: to_native(rows[col].max() if col in MAX_COLUMNS else rows[col].mean())
+                for col in columns if col in rows.columns}
+
+    def memory_summary(self):
+        """
+        Report the memory held by this generation
+
+        Returns:
+            dict: The per-column report for the frame, plus bytes held by scores, row hashes and indexes
+        """
+        summary = dict(self.memory or {})
+        summary['generation'] = self.generation
+        summary['derived_bytes'] = {
+            'scores': int(self.scores.memory_usage(index=False)),
+            'row_hashes': int(self.row_hashes.nbytes),
+            'team_index': int(self.team_index.order.nbytes),
+            'match_index': int(self.match_index.order.nbytes)
+        }
+        return summary
+
+
+class MatchDataRepository:
+    """
+    Process-wide cache of the parsed 'Match Data' sheet.
+
+    The workbook is only re-parsed when its content hash changes. The hash itself is only
+    recomputed when the file's mtime or size changes, so the common case is a single os.stat.
+    The returned frame is shared between all requests and must be treated as read-only;
+    callers that need extra columns should build new frames or series instead of assigning.
+
+    Only the columns returned by the columns callable are loaded. The free-text notes are
+    loaded separately, and only when get_notes() is called.
+    """
+
+    def __init__(self, file_path, sheet_name=MATCH_SHEET, cache_dir=None, columns=None):
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.lock = threading.Lock()
+        self.version = None
+        self.frame = None
+        self.frame_columns = None
+        self.notes = None
+        self.notes_digest = None
+        self.parse_count = 0
+        self.sidecar_loads = 0
+        # Callable returning the set of headers to materialize
+        self.columns = columns
+        # Optional columnar snapshots so restarts can skip openpyxl
+        self.sidecars = SidecarStore(cache_dir) if cache_dir else None
+
+    def set_file_path(self, file_path):
+        """Point the repository at a different workbook and drop the cached frame"""
+        with self.lock:
+            if file_path != self.file_path:
+                self.file_path = file_path
+                self.version = None
+                self.frame = None
+                self.notes = None
+
+    def _stat_version(self):
+        """Return the FileVersion of the workbook, reusing the cached hash when mtime and size match"""
+        stat = os.stat(self.file_path)
+        if self.version is not None and (stat.st_mtime, stat.st_size) == (self.version.mtime, self.version.size):
+            return self.version
+        return FileVersion(stat.st_mtime, stat.st_size, hash_file(self.file_path))
+
+    def _parse(self, digest, columns):
+        """Load the match sheet from its sidecar snapshot, or parse the workbook and write one"""
+        # The snapshot depends on which columns were materialized as well as on the workbook
+        key = digest if columns is None else f"{digest}-{column_signature(columns)}"
+        if self.sidecars is not None:
+            frame = self.sidecars.load(key)
+            if frame is not None:
+                self.sidecar_loads += 1
+                return frame
+
+        if columns is None:
+            with pd.ExcelFile(self.file_path, engine='openpyxl') as xls:
+                frame = pd.read_excel(xls, sheet_name=self.sheet_name)
+        else:
+            frame = read_sheet_columns(self.file_path, self.sheet_name, columns)
+        self.parse_count += 1
+
+        if self.sidecars is not None:
+            self.sidecars.write(key, frame)
+        return frame
+
+    def get_frame(self):
+        """
+        Get the parsed match sheet for the current workbook version
+
+        Returns:
+            pandas.DataFrame: The shared, read-only 'Match Data' frame
+
+        Raises:
+            FileNotFoundError: If the workbook does not exist
+        """
+        columns = self.columns() if self.columns is not None else None
+        with self.lock:
+            version = self._stat_version()
+            if self.frame is not None and version.digest == self.version.digest and columns == self.frame_columns:
+                # Same content (possibly re-written or touched), keep the parsed frame
+                self.version = version
+                return self.frame
+
+        # Parsed outside the lock, so version checks never wait on it; concurrent callers for the
+        # same workbook and columns share one parse
+        def parse():
+            frame = self._parse(version.digest, columns)
+            logger.info(f"Parsed '{self.sheet_name}' ({len(frame)} rows, version {version.digest[:12]})")
+            return frame
+
+        frame = single_flight.do('parse', (version.digest, column_signature(columns or [])), parse)
+        with self.lock:
+            # Never replace a newer workbook parsed meanwhile by another caller
+            if self.version is None or self.frame is None or version.mtime >= self.version.mtime:
+                self.frame = frame
+                self.frame_columns = columns
+                self.version = version
+        return frame
+
+    def get_notes(self):
+        """
+        Get the team, match, scouter and free-text observation columns, loaded on first use
+
+        Returns:
+            pandas.DataFrame: The notes frame for the current workbook version (read-only)
+        """
+        with self.lock:
+            version = self._stat_version()
+            if self.notes is not None and self.notes_digest == version.digest:
+                return self.notes
+
+        notes = single_flight.do('parse_notes', (version.digest,),
+                                 lambda: read_sheet_columns(self.file_path, self.sheet_name, notes_columns()))
+        with self.lock:
+            self.notes = notes
+            self.notes_digest = version.digest
+        return notes
+
+    def refresh(self):
+        """Load the workbook now if it changed, e.g. right after a download"""
+        try:
+            self.get_frame()
+        except Exception as e:
+            logger.error(f"Failed to refresh match data: {str(e)}")
+
+    def get_version(self):
+        """Get the FileVersion of the currently cached frame, or None if nothing is loaded"""
+        with self.lock:
+            return self.version
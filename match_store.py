@@ -0,0 +1,318 @@
+"""
+SQLite match store for HeroScout
+Optional storage engine that mirrors the canonical 'Match Data' frame into a local SQLite database
+(WAL mode, indexed on team, match and scouter). Rows are upserted by content hash, so a refresh
+only writes the rows that changed, and per-team aggregates and single-team or single-match lookups
+run as indexed SQL queries.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import logging
+
+import numpy as np
+import pandas as pd
+
+from team_aggregates import MAX_COLUMNS, averaged_columns
+
+# Set up logging
+logger = logging.getLogger('MatchStore')
+
+# Bump when the layout of the bookkeeping columns or the row hashes change
+STORE_FORMAT = 2
+
+# Indexed columns (when present in the data)
+INDEXED_COLUMNS = ['Team Number', 'Match Number', 'Scouter Name']
+
+
+def quote(name):
+    """Quote a column name as an SQLite identifier"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_type(dtype):
+    """SQLite column type for a pandas dtype"""
+    if dtype == bool or dtype.kind in 'iu':
+        return 'INTEGER'
+    if dtype.kind == 'f':
+        return 'REAL'
+    return 'TEXT'
+
+
+def _sql_values(values, sql_type):
+    """Convert a column to a list of Python values SQLite can store, with None for missing cells"""
+    if sql_type == 'INTEGER':
+        return [None if pd.isna(value) else int(value) for value in values.tolist()]
+    if sql_type == 'REAL':
+        return [None if pd.isna(value) else float(value) for value in values.tolist()]
+    return [None if pd.isna(value) else str(value) for value in values.tolist()]
+
+
+class SQLiteMatchStore:
+    """
+    Canonical match rows in SQLite.
+
+    Every row is keyed by its content hash plus an occurrence number, so identical rows scouted
+    twice are both kept. sync() inserts new rows, deletes rows that disappeared and updates the
+    sheet position of rows that moved, leaving unchanged rows untouched.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.connection.commit()
+        self.columns = []
+        # Number of completed syncs, so readers can tell which generation the table holds
+        self.sync_count = 0
+        self.upserted_rows = 0
+        self.deleted_rows = 0
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.connection.close()
+
+    def _get_meta(self, key):
+        row = self.connection.execute('SELECT value FROM store_meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _ensure_schema(self, columns):
+        """Create the matches table for a column layout, recreating it if the layout changed"""
+        layout = json.dumps({'format': STORE_FORMAT, 'columns': columns})
+        if self._get_meta('layout') == layout:
+            return
+
+        self.connection.execute('DROP TABLE IF EXISTS matches')
+        definitions = ', '.join(f"{quote(name)} {sql_type}" for name, sql_type in columns)
+        self.connection.execute(
+            f"CREATE TABLE matches (_row_hash INTEGER NOT NULL, _occurrence INTEGER NOT NULL, "
+            f"_position INTEGER NOT NULL, _score REAL, {definitions}, PRIMARY KEY (_row_hash, _occurrence))"
+        )
+        names = [name for name, _ in columns]
+        for name in INDEXED_COLUMNS:
+            if name in names:
+                index_name = 'idx_' + ''.join(ch if ch.isalnum() else '_' for ch in name.lower())
+                self.connection.execute(f"CREATE INDEX {index_name} ON matches ({quote(name)})")
+        self.connection.execute('INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)', ('layout', layout))
+        logger.info(f"Created SQLite match table with {len(columns)} columns")
+
+    def sync(self, frame, scores, hashes, score_key=None):
+        """
+        Bring the matches table in line with a canonical frame
+
+        Args:
+            frame (pandas.DataFrame): The canonical match frame
+            scores (pandas.Series): Score per row, aligned with frame
+            hashes (numpy.ndarray): Row hashes from match_data.row_hashes
+            score_key (str): Identity of the scoring rules; stored scores are rewritten when it changes
+        """
+        columns = [(str(name), _sql_type(frame[name].dtype)) for name in frame.columns]
+
+        # Number identical rows so each one gets its own key
+        signed = np.asarray(hashes, dtype=np.uint64).view(np.int64)
+        occurrences = pd.Series(signed).groupby(signed).cumcount().to_numpy()
+        keys = list(zip(signed.tolist(), occurrences.tolist()))
+
+        with self.lock:
+            with self.connection:
+                self._ensure_schema(columns)
+                existing = {
+                    (row_hash, occurrence): position
+                    for row_hash, occurrence, position in
+                    self.connection.execute('SELECT _row_hash, _occurrence, _position FROM matches')
+                }
+
+                wanted = dict(zip(keys, range(len(keys))))
+                stale = [key for key in existing if key not in wanted]
+                moved = [(position, *key) for key, position in wanted.items()
+                         if key in existing and existing[key] != position]
+                new_positions = [position for key, position in wanted.items() if key not in existing]
+
+                if stale:
+                    self.connection.executemany('DELETE FROM matches WHERE _row_hash = ? AND _occurrence = ?', stale)
+                if moved:
+                    self.connection.executemany(
+                        'UPDATE matches SET _position = ? WHERE _row_hash = ? AND _occurrence = ?', moved)
+                if score_key != self._get_meta('score_key'):
+                    # Scoring rules changed: rewrite the scores of the rows that are kept
+                    kept = [position for key, position in wanted.items() if key in existing]
+                    self.connection.executemany(
+                        'UPDATE matches SET _score = ? WHERE _row_hash = ? AND _occurrence = ?',
+                        [(float(scores.iloc[position]), *keys[position]) for position in kept])
+                    self.connection.execute('INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)',
+                                            ('score_key', score_key))
+                if new_positions:
+                    new_rows = frame.iloc[new_positions]
+                    values = [_sql_values(new_rows[name], sql_type) for name, sql_type in columns]
+                    records = zip(
+                        [keys[position][0] for position in new_positions],
+                        [keys[position][1] for position in new_positions],
+                        new_positions,
+                        scores.iloc[new_positions].astype(float).tolist(),
+                        *values
+                    )
+                    placeholders = ', '.join('?' * (4 + len(columns)))
+                    names = ', '.join(quote(name) for name, _ in columns)
+                    self.connection.executemany(
+                        f"INSERT INTO matches (_row_hash, _occurrence, _position, _score, {names}) "
+                        f"VALUES ({placeholders}) "
+                        f"ON CONFLICT (_row_hash, _occurrence) DO UPDATE SET _position = excluded._position",
+                        records
+                    )
+
+            self.columns = [name for name, _ in columns]
+            self.sync_count += 1
+            self.upserted_rows += len(new_positions)
+            self.deleted_rows += len(stale)
+        logger.info(f"Synced SQLite match store: {len(new_positions)} upserted, {len(stale)} deleted, "
+                    f"{len(moved)} moved")
+
+    def query(self, sql, params=()):
+        """Run a read query and return all rows"""
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+
+class StoreAggregates:
+    """
+    Per-team tables computed with SQL aggregates over a SQLiteMatchStore.
+
+    Offers the same table methods as TeamAggregates, so build_derived_tables can use either.
+    While the store still holds the generation these aggregates were built for, one team's
+    averages and the rows of one team or match are also queried from the store per request,
+    using its indexes, instead of being cut from the in-memory frame.
+    """
+
+    def __init__(self, store, columns, dtypes=None):
+        self.store = store
+        self.columns = list(columns)
+        # Canonical dtypes of the synced frame, to restore flags and numbers read back from SQLite
+        self.dtypes = dtypes
+        self.sync_count = store.sync_count
+
+    @classmethod
+    def from_frame(cls, store, df, include_columns):
+        """Pick the aggregated columns the same way TeamAggregates does"""
+        return cls(store, averaged_columns(df, include_columns), df.dtypes)
+
+    def is_current(self):
+        """Check whether the store still holds the rows these aggregates were built from"""
+        return self.dtypes is not None and self.store.sync_count == self.sync_count
+
+    def stored_rows(self, column, value):
+        """
+        Get the rows with one value in an indexed column, in sheet order
+
+        Args:
+            column (str): 'Team Number' or 'Match Number'
+            value: The team or match number
+
+        Returns:
+            pandas.DataFrame or None: The rows, indexed by their position in the frame and widened to
+                                      full precision, or None if the store holds a newer generation
+        """
+        if not self.is_current():
+            return None
+        names = list(self.dtypes.index)
+        rows = self.store.query(
+            f"SELECT _position, {', '.join(quote(name) for name in names)} FROM matches "
+            f"WHERE {quote(column)} = ? ORDER BY _position", (value,))
+        frame = pd.DataFrame([row[1:] for row in rows], columns=names,
+                             index=pd.Index([row[0] for row in rows], dtype=np.int64))
+        for name, dtype in self.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                # Categories are stored as text; map them back to the original (possibly numeric) values
+                lookup = {str(category): category for category in dtype.categories}
+                frame[name] = pd.Categorical(frame[name].map(lookup), dtype=dtype)
+            elif isinstance(dtype, pd.api.extensions.ExtensionDtype):
+                # Team and match numbers with missing cells
+                frame[name] = pd.to_numeric(frame[name]).astype(dtype)
+            elif dtype == bool:
+                frame[name] = frame[name].astype(bool)
+            elif dtype.kind in 'iuf':
+                frame[name] = pd.to_numeric(frame[name]).astype(np.float64 if dtype.kind == 'f' else np.int64)
+        return frame
+
+    def team_summary(self, team_number, columns):
+        """
+        Average (maximum for Endgame Barge) of each column over one team's rows
+
+        Returns:
+            dict or None: {column: value}, empty if the team has no rows, or None if the store holds
+                          a newer generation
+        """
+        if not self.is_current():
+            return None
+        columns = [col for col in columns if col in self.dtypes.index]
+        selects = ['COUNT(*)'] + [f"{'MAX' if col in MAX_COLUMNS else 'AVG'}({quote(col)})" for col in columns]
+        row = self.store.query(
+            f"SELECT {', '.join(selects)} FROM matches WHERE {quote('Team Number')} = ?", (team_number,))[0]
+        if not row[0]:
+            return {}
+        return {col: None if value is None or np.isinf(value) else value for col, value in zip(columns, row[1:])}
+
+    def _team_filter(self):
+        return f"{quote('Team Number')} IS NOT NULL AND {quote('Team Number')} != 0"
+
+    def team_numbers(self):
+        """Sorted list of team numbers, as returned by /get_all_teams"""
+        team = quote('Team Number')
+        rows = self.store.query(f"SELECT DISTINCT {team} FROM matches WHERE {self._team_filter()} ORDER BY {team}")
+        return [int(row[0]) for row in rows]
+
+    def averages(self):
+        """Per-team averages (max for Endgame Barge), as returned by /get_all_team_averages"""
+        team = quote('Team Number')
+        selects = [f"{'MAX' if col in MAX_COLUMNS else 'AVG'}({quote(col)})" for col in self.columns]
+        if not selects:
+            return {}
+        rows = self.store.query(
+            f"SELECT {team}, {', '.join(selects)} FROM matches WHERE {self._team_filter()} GROUP BY {team}")
+        return {
+            int(row[0]): {col: None if value is None else float(value) for col, value in zip(self.columns, row[1:])}
+            for row in rows
+        }
+
+    def rankings(self):
+        """Total score per team, best first, as returned by /get_team_rankings"""
+        team = quote('Team Number')
+        rows = self.store.query(
+            f"SELECT {team}, SUM(_score) AS total FROM matches WHERE {self._team_filter()} "
+            f"GROUP BY {team} ORDER BY total DESC, {team}")
+        return {int(row[0]): float(row[1]) for row in rows}
+
+    def match_counts(self):
+        """Number of scouted rows per team, as returned by /get_team_match_counts"""
+        team = quote('Team Number')
+        rows = self.store.query(
+            f"SELECT {team}, COUNT(*) FROM matches WHERE {self._team_filter()} GROUP BY {team} ORDER BY {team}")
+        return {str(int(row[0])): int(row[1]) for row in rows}
+
+
+def open_store(engine, db_path):
+    """
+    Open the configured storage engine
+
+    Args:
+        engine (str): 'memory' (default, no store) or 'sqlite'
+        db_path (str): Path of the SQLite database
+
+    Returns:
+        SQLiteMatchStore or None
+    """
+    if engine != 'sqlite':
+        return None
+    try:
+        return SQLiteMatchStore(db_path)
+    except sqlite3.Error as e:
+        logger.error(f"Failed to open SQLite match store, using in-memory tables: {str(e)}")
+        return None
@@ -0,0 +1,131 @@
+"""
+Adaptive refresh scheduling for HeroScout
+Decides when the workbook is checked next. While downloads keep bringing new rows (matches are
+being played) the interval shrinks towards a minimum; while the workbook is unchanged (breaks,
+lunch) or the download fails, it grows exponentially towards a maximum. Every delay gets random
+jitter so several servers polling one share link spread out, and a manual trigger wakes the
+downloader at once.
+"""
+
+import time
+import random
+import threading
+import logging
+
+# Set up logging
+logger = logging.getLogger('RefreshScheduler')
+
+# Interval multiplier after a download with new data, an unchanged workbook and a failed download
+SPEEDUP_FACTOR = 0.5
+UNCHANGED_FACTOR = 1.5
+ERROR_FACTOR = 2.0
+
+# Delays vary randomly by up to this fraction of the interval
+JITTER = 0.2
+
+# Default bounds of the interval, in seconds
+MIN_INTERVAL = 30
+MAX_INTERVAL = 900
+
+
+class RefreshScheduler:
+    """
+    Interval between workbook checks, adapted to what the last checks found.
+
+    The configured base interval (a number, or a callable so configuration changes apply on the
+    next check) is where the interval starts and what a change after a quiet period returns to.
+    """
+
+    def __init__(self, base_interval, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, jitter=JITTER):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.trigger_event = threading.Event()
+        self.interval = None
+        self.next_check = None
+        self.last_check = None
+        self.last_change = None
+        self.last_outcome = None
+        # Checks in a row with the same outcome
+        self.streak = 0
+        self.manual_triggers = 0
+
+    def _base(self):
+        base = self.base_interval() if callable(self.base_interval) else self.base_interval
+        return min(max(float(base), self.min_interval), self.max_interval)
+
+    def record(self, outcome):
+        """
+        Adapt the interval to the outcome of a check
+
+        Args:
+            outcome (str): 'changed' (a new workbook), 'unchanged' or 'error'
+
+        Returns:
+            float: The new interval in seconds
+        """
+        with self.lock:
+            now = time.time()
+            interval = self.interval if self.interval is not None else self._base()
+            if outcome == 'changed':
+                # Coming out of a quiet period, start from the base interval rather than the backed-off one
+                interval = max(self.min_interval, min(interval, self._base()) * SPEEDUP_FACTOR)
+                self.last_change = now
+            elif outcome == 'error':
+                interval = min(self.max_interval, interval * ERROR_FACTOR)
+            else:
+                interval = min(self.max_interval, interval * UNCHANGED_FACTOR)
+            self.streak = self.streak + 1 if outcome == self.last_outcome else 1
+            self.last_outcome = outcome
+            self.last_check = now
+            self.interval = interval
+            return interval
+
+    def wait(self):
+        """
+        Sleep until the next check is due or a refresh is triggered
+
+        Returns:
+            bool: True if the wait was cut short by trigger()
+        """
+        with self.lock:
+            interval = self.interval if self.interval is not None else self._base()
+            delay = interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            self.next_check = time.time() + delay
+        # Only a trigger this wait consumed is cleared; clearing unconditionally after the wait would
+        # also drop one that arrived while the caller was still busy with the previous check
+        triggered = self.trigger_event.wait(delay)
+        if triggered:
+            self.trigger_event.clear()
+        return triggered
+
+    def trigger(self):
+        """Wake the downloader to check the workbook now"""
+        with self.lock:
+            self.manual_triggers += 1
+        logger.info("Refresh requested")
+        self.trigger_event.set()
+
+    def status(self):
+        """
+        Report the schedule
+
+        Returns:
+            dict: 'interval_seconds' (effective interval), 'base_interval_seconds',
+                  'next_check_in_seconds', 'last_check', 'last_change', 'last_outcome', 'streak'
+                  and 'manual_triggers'
+        """
+        with self.lock:
+            now = time.time()
+            return {
+                'interval_seconds': round(self.interval if self.interval is not None else self._base(), 1),
+                'base_interval_seconds': self._base(),
+                'next_check_in_seconds': round(max(self.next_check - now, 0), 1) if self.next_check else None,
+                'last_check': self.last_check,
+                'last_change': self.last_change,
+                'last_outcome': self.last_outcome,
+                'streak': self.streak,
+                'manual_triggers': self.manual_triggers
+            }
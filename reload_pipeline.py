@@ -0,0 +1,452 @@
+"""
+Background reload pipeline for HeroScout
+Parses a new workbook, rebuilds every derived table, then swaps the live dataset pointer in one
+step, so requests always read a complete generation and never wait on parsing.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import logging
+
+import numpy as np
+import pandas as pd
+
+from match_data import MatchDataset, config_signature, row_hashes
+from scoring import score_frame
+from derived_tables import DerivedTableError, build_derived_tables
+from team_aggregates import TeamAggregates
+from column_schema import schema_resolver, memory_report
+from match_store import StoreAggregates
+from sheet_reader import frame_from_records
+from dataset_changes import ChangeLog
+from row_dedup import content_hashes, dedup_frame, has_conflicts, numeric_columns
+from derived_cache import cache_key
+
+# Set up logging
+logger = logging.getLogger('ReloadPipeline')
+
+
+class ReloadPipeline:
+    """
+    Double-buffered dataset holder fed by a background worker thread.
+
+    The live generation is only ever replaced by a fully built one. Readers take a reference to
+    self.dataset and keep using it for the whole request, even if a newer generation is published
+    while they run.
+
+    When a new workbook is the previous one plus appended rows (same columns, same hashes for the
+    existing rows), only the new rows are scored and folded into a copy of the running per-team
+    aggregates. Any edit to an earlier row triggers a full rebuild.
+
+    With a SQLiteMatchStore, each generation is upserted into the store and the per-team tables
+    are computed there with SQL aggregates instead. With a SnapshotStore, the row hashes of each
+    published workbook are saved as that snapshot's row index. With a DerivedTableCache, the
+    scores, aggregates and tables of every generation are saved to disk, and a full rebuild whose
+    workbook, configuration and rows match a saved generation (typically the first load after a
+    restart) loads them instead of recomputing. With a SharedDatasetWriter, every generation is
+    also published as a memory-mapped file for other server processes to attach to. With a
+    DataQualityMonitor, every generation's quality report is computed here, on the worker, so
+    readers (the dashboard in particular) only ever look it up.
+
+    With DataSources, the rows of every other source (local scanner workbooks, folders, peer
+    servers) follow the workbook's rows; a source that changes triggers a full rebuild.
+
+    Rows ingested live (add_live_rows) are queued for the worker and kept after the workbook's
+    rows in every generation, so a new batch is an append and is folded into the aggregates
+    without a full rebuild. Exact duplicates and conflicting reports of one team-match are then
+    resolved by row_dedup; a row that only adds a new team-match stays an append. Live rows that
+    a new workbook already contains are dropped, from memory and from the IngestJournal.
+
+    Each generation gets a data version (milliseconds at publish time, always increasing, so
+    versions also keep increasing across restarts) and is recorded in a ChangeLog for /changes.
+    """
+
+    def __init__(self, repository, config_provider, store=None, snapshots=None, derived_cache=None, shared=None,
+                 sources=None, journal=None, quality=None):
+        self.repository = repository
+        # Callable returning the current game configuration
+        self.config_provider = config_provider
+        # Optional SQLiteMatchStore backing the per-team tables
+        self.store = store
+        # Optional SnapshotStore indexed with every published workbook
+        self.snapshots = snapshots
+        # Optional DerivedTableCache persisting each generation's derived data across restarts
+        self.derived_cache = derived_cache
+        # Optional SharedDatasetWriter publishing each generation for other processes
+        self.shared = shared
+        # Optional DataSources whose rows are merged with the workbook's
+        self.sources = sources
+        self.published_sources = ()
+        # Optional IngestJournal the live rows are kept in
+        self.journal = journal
+        # Optional DataQualityMonitor that checks every generation once it is published
+        self.quality = quality
+        self.dataset = None
+        self.generation = 0
+        self.data_version = 0
+        self.changes = ChangeLog()
+        # Rows ingested through /ingest that are not in the workbook, as raw row dicts
+        self.live_records = []
+        self.live_lock = threading.Lock()
+        # Bumped whenever live rows are removed rather than appended
+        self.live_epoch = 0
+        self.published_live_rows = 0
+        self.published_live_epoch = 0
+        # Content hashes of every row before deduplication, to spot re-sent rows, and the last report
+        self.seen_rows = None
+        self.dedup_report = None
+        self.reload_count = 0
+        self.incremental_count = 0
+        self.full_rebuild_count = 0
+        self.cached_load_count = 0
+        self.last_error = None
+        self.last_build_seconds = None
+        self.reload_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start the background worker and queue the initial load"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='ReloadPipeline', daemon=True)
+            self.thread.start()
+        self.request_reload()
+
+    def request_reload(self):
+        """Ask the worker to check for a new workbook or configuration; never blocks"""
+        self.wakeup.set()
+
+    def add_live_rows(self, records):
+        """
+        Queue validated rows (canonical column names) for the next generation; never blocks
+
+        The worker folds them in as an append, so they are normally live within milliseconds.
+
+        Args:
+            records (list): Row dicts from live_ingest.validate_rows
+        """
+        with self.live_lock:
+            self.live_records = self.live_records + list(records)
+        self.request_reload()
+
+    def clear_live_rows(self, event=None):
+        """
+        Remove the live rows of one event (all live rows if event is None) from the journal and the dataset
+
+        Args:
+            event (str): Event code the rows were ingested for (case-insensitive)
+
+        Returns:
+            int: Number of live rows removed
+        """
+        with self.live_lock:
+            before = len(self.live_records)
+            if self.journal is not None:
+                remaining = self.journal.clear(event)
+            else:
+                remaining = [] if event is None else self.live_records
+            self.live_records = remaining
+            self.live_epoch += 1
+        self.request_reload()
+        return max(before - len(remaining), 0)
+
+    def _live_rows_published(self, frame, config):
+        """
+        Get a function marking which row dicts have the same content as a row of frame
+
+        Returns:
+            callable: Takes a list of row dicts and returns a boolean array
+        """
+        columns = list(frame.columns)
+        numeric = numeric_columns(frame)
+        known = pd.Index(content_hashes(frame, numeric))
+
+        def published(records):
+            if not records:
+                return np.zeros(0, dtype=bool)
+            rows = schema_resolver.resolve(frame_from_records(records), config).reindex(columns=columns)
+            return pd.Index(content_hashes(rows, numeric)).isin(known)
+        return published
+
+    def _retire_live_rows(self, frame, live, epoch, config):
+        """
+        Drop the live rows a new workbook already contains, here and in the journal
+
+        Returns:
+            tuple: (live rows to merge, live epoch)
+        """
+        published = self._live_rows_published(frame, config)
+        found = published(live)
+        if not found.any():
+            return live, epoch
+        with self.live_lock:
+            if self.live_epoch != epoch:
+                # Rows were cleared meanwhile; retire on the next reload
+                return live, epoch
+            remaining = [record for record, done in zip(live, found) if not done]
+            self.live_records = remaining + self.live_records[len(live):]
+            self.live_epoch += 1
+            epoch = self.live_epoch
+        if self.journal is not None:
+            self.journal.compact(published)
+        logger.info(f"{int(found.sum())} live rows are now in the workbook")
+        return remaining, epoch
+
+    def drop_known_rows(self, records, config):
+        """
+        Remove rows whose exact content is already in the live dataset (or earlier in the batch)
+
+        Args:
+            records (list): Row dicts from live_ingest.validate_rows
+            config (dict): The game configuration
+
+        Returns:
+            tuple: (new row dicts, number of duplicates dropped)
+        """
+        seen = self.seen_rows
+        if not records or seen is None:
+            return records, 0
+        columns, numeric, index = seen
+        frame = schema_resolver.resolve(frame_from_records(records), config).reindex(columns=columns)
+        hashes = content_hashes(frame, numeric)
+        duplicate = pd.Index(hashes).isin(index) | pd.Series(hashes).duplicated().to_numpy()
+        return [record for record, dup in zip(records, duplicate) if not dup], int(duplicate.sum())
+
+    def _with_extra_rows(self, frame, extra, live, epoch, version, config):
+        """Append the rows of the other data sources, then the live rows, to the workbook's canonical frame"""
+        parts = [schema_resolver.resolve(source_frame, config, frame_key=('source', name, digest))
+                 for name, digest, source_frame in extra]
+        if live:
+            parts.append(schema_resolver.resolve(frame_from_records(live), config))
+        if not parts:
+            return frame
+        # Columns the workbook does not have (e.g. the notes) would change the frame's layout
+        parts = [part[[col for col in part.columns if col in frame.columns]] for part in parts]
+        combined = pd.concat([frame] + parts, ignore_index=True)
+        # Restore the compact dtypes lost when the frames are combined
+        key = (version.digest, epoch, len(live)) + tuple(digest for _, digest, _ in extra)
+        return schema_resolver.resolve(combined, config, frame_key=key)
+
+    def _dedup_tail(self, current, version, signature, sources_key, live, epoch, config):
+        """
+        Deduplicate only the live rows added since the current generation
+
+        Applies when the workbook, configuration and other sources are unchanged and live rows were
+        only added: the new rows are checked against the content hashes of every row seen so far
+        and appended to the current frame, unless one reports a team-match the dataset already has
+        and the duplicate_policy merges conflicts.
+
+        Returns:
+            tuple or None: (frame, seen rows, dedup report), or None if all rows must be deduplicated
+        """
+        seen, report, published = self.seen_rows, self.dedup_report, self.published_live_rows
+        if (current is None or seen is None or report is None or current.version.digest != version.digest
+                or current.config_signature != signature or self.published_sources != sources_key
+                or self.published_live_epoch != epoch or len(live) <= published):
+            return None
+        columns, numeric, index = seen
+        tail = schema_resolver.resolve(frame_from_records(live[published:]), config).reindex(columns=columns)
+        hashes = content_hashes(tail, numeric)
+        duplicate = pd.Index(hashes).isin(index) | pd.Series(hashes).duplicated().to_numpy()
+        tail = tail[~duplicate]
+        if report['policy'] != 'keep' and len(tail) and has_conflicts(current.frame, tail):
+            return None
+
+        frame = current.frame
+        if len(tail):
+            # Restore the compact dtypes lost when the frames are combined
+            frame = schema_resolver.resolve(pd.concat([frame, tail], ignore_index=True), config)
+        report = dict(report, rows_in=report['rows_in'] + len(hashes),
+                      exact_duplicates=report['exact_duplicates'] + int(duplicate.sum()), rows_out=len(frame))
+        return frame, (columns, numeric, index.append(pd.Index(hashes))), report
+
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            self.reload()
+
+    def reload(self, force=False):
+        """
+        Build a new generation if the workbook, another data source or the configuration changed, then publish it
+
+        Args:
+            force (bool): Rebuild even if nothing changed, without using saved derived tables
+
+        Returns:
+            MatchDataset or None: The live generation after the reload
+        """
+        with self.reload_lock:
+            config = self.config_provider()
+            signature = config_signature(config)
+            try:
+                raw = self.repository.get_frame()
+                version = self.repository.get_version()
+                with self.live_lock:
+                    live, epoch = self.live_records, self.live_epoch
+                extra = self.sources.frames() if self.sources is not None else []
+                sources_key = tuple((name, digest) for name, digest, _ in extra)
+                current = self.dataset
+                if (not force and current is not None and current.version.digest == version.digest
+                        and current.config_signature == signature and self.published_live_rows == len(live)
+                        and self.published_live_epoch == epoch and self.published_sources == sources_key):
+                    return current
+
+                # Canonical names and compact dtypes, resolved once per workbook and schema
+                workbook = schema_resolver.resolve(raw, config, frame_key=version.digest)
+                new_workbook = current is None or current.version.digest != version.digest
+                if live and new_workbook:
+                    live, epoch = self._retire_live_rows(workbook, live, epoch, config)
+                frame = workbook
+                tail = None if force else self._dedup_tail(current, version, signature, sources_key, live, epoch,
+                                                           config)
+                if tail is not None:
+                    frame, seen, dedup = tail
+                else:
+                    frame = self._with_extra_rows(frame, extra, live, epoch, version, config)
+                    content = content_hashes(frame)
+                    seen = (list(frame.columns), numeric_columns(frame), pd.Index(content))
+                    frame, dedup = dedup_frame(frame, config, hashes=content)
+            except Exception as e:
+                # Keep serving the previous generation
+                self.last_error = str(e)
+                logger.error(f"Reload failed, keeping generation {self.generation}: {str(e)}")
+                return self.dataset
+
+            start = time.perf_counter()
+            try:
+                hashes = row_hashes(frame)
+                appended = not force and self._is_append(current, frame, hashes, signature)
+                key = cache_key(version.digest, signature, hashes) if self.derived_cache is not None else None
+                cached = None if appended or force or key is None else self.derived_cache.load(key, frame.index)
+                rules = config.get('scoring_rules', {})
+                if appended:
+                    # Only the new rows need scoring
+                    new_scores = score_frame(frame.iloc[len(current.frame):], rules)
+                    scores = pd.concat([current.scores, new_scores])
+                    self.incremental_count += 1
+                    mode = 'incremental'
+                elif cached is not None:
+                    scores, aggregates, tables = cached
+                    self.cached_load_count += 1
+                    mode = 'cached'
+                else:
+                    scores = score_frame(frame, rules)
+                    self.full_rebuild_count += 1
+                    mode = 'full'
+                if cached is None:
+                    aggregates = self._build_aggregates(current if appended else None, frame, scores, hashes,
+                                                        signature, config)
+                    tables = build_derived_tables(frame, aggregates, config)
+                elif aggregates is None or self.store is not None:
+                    # SQLite-backed aggregates are not saved; the store keeps its own rows
+                    aggregates = self._build_aggregates(None, frame, scores, hashes, signature, config)
+                memory = memory_report(raw, frame)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Failed to build derived tables, keeping generation {self.generation}: {str(e)}")
+                return current
+
+            data_version = max(self.data_version + 1, int(time.time() * 1000))
+            dataset = MatchDataset(self.generation + 1, version, signature, frame, scores, aggregates, tables, hashes, memory,
+                                   data_version=data_version)
+            self.last_build_seconds = time.perf_counter() - start
+            self.last_error = None
+            self.reload_count += 1
+            # Publish: a single reference assignment, atomic for readers
+            self.generation = dataset.generation
+            self.data_version = data_version
+            self.published_live_rows = len(live)
+            self.published_live_epoch = epoch
+            self.published_sources = sources_key
+            self.seen_rows = seen
+            self.dedup_report = dedup
+            self.dataset = dataset
+            self.changes.record(dataset)
+            logger.info(f"Published generation {dataset.generation} ({len(frame)} rows, {mode}, "
+                        f"built in {self.last_build_seconds * 1000:.0f} ms)")
+            if self.snapshots is not None and (new_workbook or current.config_signature != signature):
+                # The snapshot holds the workbook alone, without the live and other sources' rows
+                self.snapshots.index(version.digest, workbook, row_hashes(workbook), signature)
+            if key is not None and mode != 'cached':
+                self.derived_cache.save(key, scores, aggregates, tables)
+            if self.shared is not None:
+                self.shared.publish(dataset)
+            if self.quality is not None:
+                try:
+                    self.quality.report(dataset)
+                except Exception as e:
+                    logger.warning(f"Failed to check data quality of generation {dataset.generation}: {str(e)}")
+            return dataset
+
+    @staticmethod
+    def _is_append(current, frame, hashes, signature):
+        """Check whether frame is the current generation's frame plus rows appended at the end"""
+        if current is None:
+            return False
+        if current.config_signature != signature or list(frame.columns) != list(current.frame.columns):
+            return False
+        old_rows = len(current.row_hashes)
+        return len(hashes) >= old_rows and np.array_equal(hashes[:old_rows], current.row_hashes)
+
+    def _build_aggregates(self, previous, frame, scores, hashes, signature, config):
+        """
+        Build the per-team aggregates for a new generation
+
+        With a store, the frame is upserted and SQL-backed aggregates are returned. Otherwise the
+        appended rows are folded into a copy of the previous generation's aggregates, or the
+        aggregates are built from scratch when previous is None.
+
+        Returns:
+            TeamAggregates, StoreAggregates or DerivedTableError
+        """
+        include_columns = config.get('include_columns', [])
+        try:
+            if self.store is not None:
+                try:
+                    self.store.sync(frame, scores, hashes, score_key=signature)
+                    return StoreAggregates.from_frame(self.store, frame, include_columns)
+                except sqlite3.Error as e:
+                    logger.error(f"SQLite match store failed, using in-memory aggregates: {str(e)}")
+
+            if previous is not None and isinstance(previous.aggregates, TeamAggregates):
+                offset = len(previous.frame)
+                aggregates = previous.aggregates.copy()
+                aggregates.add_rows(frame.iloc[offset:], scores.iloc[offset:])
+                return aggregates
+            return TeamAggregates.from_frame(frame, scores, include_columns)
+        except DerivedTableError as e:
+            return e
+
+    def is_stale(self):
+        """Check cheaply (one os.stat) whether the workbook or configuration changed since the last load"""
+        dataset = self.dataset
+        if dataset is None:
+            return True
+        if dataset.config_signature != config_signature(self.config_provider()):
+            return True
+        version = self.repository.get_version()
+        try:
+            stat = os.stat(self.repository.file_path)
+        except OSError:
+            return False
+        return version is None or (stat.st_mtime, stat.st_size) != (version.mtime, version.size)
+
+    def current(self):
+        """
+        Get the live generation
+
+        Only the very first call (before any generation exists) waits for a load. Afterwards a
+        change on disk just schedules a background reload and the current generation is returned.
+
+        Returns:
+            MatchDataset or None: The live generation, or None if nothing could be loaded
+        """
+        dataset = self.dataset
+        if dataset is None:
+            return self.reload()
+        if self.is_stale():
+            self.request_reload()
+        return dataset
@@ -0,0 +1,166 @@
+"""
+Duplicate and conflicting row resolution for HeroScout
+The same robot in the same match can be reported more than once: a QR code scanned twice, a row
+both ingested live and uploaded in the workbook, or two scouters covering one robot. Exact
+duplicates are dropped by content hash; the remaining reports of one team in one match are
+merged under the configured duplicate_policy. Everything is hash-based and runs in O(n).
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from column_schema import schema_resolver
+from match_data import numeric_columns, row_hashes
+
+# Set up logging
+logger = logging.getLogger('RowDedup')
+
+# How conflicting reports of one team in one match are merged:
+#   'keep'      - keep every report (only exact duplicates are dropped)
+#   'latest'    - keep the report that arrived last (later in the sheet, or ingested later)
+#   'preferred' - keep the report of the scouter listed first in preferred_scouters, else the latest
+#   'mean'      - average the numeric columns, other columns from the first report
+# 'keep' is the default so two scouters' reports still count separately, as they always have;
+# merging changes team averages and is opt-in.
+DUPLICATE_POLICIES = ('keep', 'latest', 'preferred', 'mean')
+DEFAULT_POLICY = 'keep'
+
+# Columns identifying one robot in one match ('Event' only in multi-event datasets)
+CONFLICT_KEY_COLUMNS = ['Event', 'Team Number', 'Match Number']
+
+# Number of conflicts listed in the report
+MAX_REPORTED_CONFLICTS = 50
+
+
+def content_hashes(frame, numeric=None):
+    """
+    Return one 64-bit hash per row of its (team, match, scouter, payload) content
+
+    This is match_data.row_hashes, which does not depend on the column dtypes, so a row hashes
+    the same whether it came from the workbook, a live batch or a frame whose dtypes were widened.
+
+    Args:
+        frame (pandas.DataFrame): Canonical rows
+        numeric (list): Columns to hash as numbers (default: numeric_columns(frame))
+    """
+    return row_hashes(frame, numeric)
+
+
+def has_conflicts(frame, new_rows):
+    """
+    Check whether any new row reports a team-match that frame, or another new row, already has
+
+    Rows missing a key are never in conflict, as in dedup_frame.
+
+    Args:
+        frame (pandas.DataFrame): Deduplicated canonical rows
+        new_rows (pandas.DataFrame): Canonical rows to add, with the same columns
+    """
+    if 'Team Number' not in frame.columns or 'Match Number' not in frame.columns:
+        return False
+    key_columns = [col for col in CONFLICT_KEY_COLUMNS if col in frame.columns]
+    numeric = ['Team Number', 'Match Number']
+    complete = new_rows[key_columns].notna().all(axis=1).to_numpy()
+    new_keys = pd.Index(content_hashes(new_rows[key_columns], numeric)[complete])
+    return bool(new_keys.isin(content_hashes(frame[key_columns], numeric)).any() or new_keys.duplicated().any())
+
+
+def _chosen_positions(group_codes, positions, frame, policy, preferred):
+    """For each conflict group, the position of the report to keep under 'latest' or 'preferred'"""
+    order = pd.DataFrame({'group': group_codes, 'position': positions})
+    if policy == 'preferred' and 'Scouter Name' in frame.columns:
+        rank = {name: i for i, name in enumerate(preferred)}
+        scouters = frame['Scouter Name'].astype(object).to_numpy()[positions]
+        order['rank'] = [rank.get(name, len(rank)) for name in scouters]
+        # Best-ranked scouter first, latest report breaking ties
+        order = order.sort_values(['group', 'rank', 'position'], ascending=[True, True, False])
+        return order.groupby('group', sort=True)['position'].first().to_numpy()
+    return order.groupby('group', sort=True)['position'].max().to_numpy()
+
+
+def dedup_frame(frame, config, hashes=None):
+    """
+    Drop exact duplicate rows and merge conflicting reports of one team in one match
+
+    The surviving (or merged) report of a team-match takes the position of its first report, so
+    rows that only gain new team-matches at the end stay an append for the reload pipeline.
+
+    Args:
+        frame (pandas.DataFrame): Canonical match rows, in arrival order
+        config (dict): The game configuration (duplicate_policy, preferred_scouters)
+        hashes (numpy.ndarray): content_hashes(frame), if already computed
+
+    Returns:
+        tuple: (deduplicated frame, report dict)
+    """
+    policy = config.get('duplicate_policy', DEFAULT_POLICY)
+    if policy not in DUPLICATE_POLICIES:
+        logger.warning(f"Unknown duplicate_policy '{policy}', using '{DEFAULT_POLICY}'")
+        policy = DEFAULT_POLICY
+    report = {'policy': policy, 'rows_in': len(frame), 'exact_duplicates': 0, 'conflicts': 0,
+              'merged_rows': 0, 'rows_out': len(frame), 'conflict_examples': []}
+    if len(frame) == 0:
+        return frame, report
+
+    # Exact duplicates: the same content seen before
+    duplicated = pd.Series(content_hashes(frame) if hashes is None else hashes).duplicated().to_numpy()
+    report['exact_duplicates'] = int(duplicated.sum())
+    if duplicated.any():
+        frame = frame[~duplicated].reset_index(drop=True)
+
+    if policy == 'keep' or 'Team Number' not in frame.columns or 'Match Number' not in frame.columns:
+        report['rows_out'] = len(frame)
+        return frame, report
+
+    # Conflicts: more than one remaining report for a team-match (rows without both keys are left alone)
+    key_columns = [col for col in CONFLICT_KEY_COLUMNS if col in frame.columns]
+    keys = frame[key_columns]
+    codes = keys.groupby(key_columns, sort=False, dropna=True, observed=True).ngroup()
+    codes = codes.fillna(-1).to_numpy(dtype=np.int64)
+    valid = codes >= 0
+    sizes = np.bincount(codes[valid], minlength=codes.max() + 1 if valid.any() else 0)
+    in_conflict = valid & (sizes[np.where(valid, codes, 0)] > 1)
+    if not in_conflict.any():
+        report['rows_out'] = len(frame)
+        return frame, report
+
+    positions = np.flatnonzero(in_conflict)
+    group_codes = codes[positions]
+    # Position of each group's first report, which receives the merged or chosen report
+    first = pd.Series(positions).groupby(group_codes, sort=True).min().to_numpy()
+
+    # Each kept row is read from source: the chosen report for 'latest'/'preferred', itself otherwise
+    source = np.arange(len(frame))
+    if policy != 'mean':
+        source[first] = _chosen_positions(group_codes, positions, frame, policy, config.get('preferred_scouters', []))
+    keep = ~in_conflict
+    keep[first] = True
+    result = frame.iloc[source[keep]].reset_index(drop=True)
+
+    if policy == 'mean':
+        merged_at = np.searchsorted(np.flatnonzero(keep), first)
+        numeric = [col for col in numeric_columns(frame) if col not in key_columns]
+        averaged = frame.iloc[positions][numeric].astype(float).groupby(group_codes, sort=True).mean()
+        for col in numeric:
+            values = result[col].to_numpy(dtype=np.float64, copy=True)
+            values[merged_at] = averaged[col].to_numpy()
+            result[col] = values
+        # Whole-number averages go back to the compact canonical dtypes; fractional ones stay float64
+        schema_resolver.compact(result, numeric)
+
+    report['conflicts'] = int(len(first))
+    report['merged_rows'] = int(len(positions))
+    report['rows_out'] = len(result)
+    scouters = frame['Scouter Name'].astype(object).to_numpy() if 'Scouter Name' in frame.columns else None
+    groups = np.unique(group_codes)
+    for group, start in zip(groups[:MAX_REPORTED_CONFLICTS], first):
+        members = positions[group_codes == group]
+        report['conflict_examples'].append({
+            'team_number': int(frame['Team Number'].iloc[start]),
+            'match_number': int(frame['Match Number'].iloc[start]),
+            'reports': int(len(members)),
+            'scouters': [str(scouters[m]) for m in members] if scouters is not None else []
+        })
+    return result, report
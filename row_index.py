@@ -0,0 +1,61 @@
+"""
+Row indexes for HeroScout
+Maps a key column (team number, match number) to the positions of its rows, built once per
+dataset generation so lookups are a dictionary hit and a slice instead of a full-column scan.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class RowIndex:
+    """
+    Sorted-offset index over one key column.
+
+    The row positions are stably sorted by key, so each key owns one contiguous run of
+    positions, still in sheet order. Missing keys are left out of the index.
+    """
+
+    def __init__(self, values):
+        keys = pd.Series(values).to_numpy()
+        present = np.flatnonzero(~pd.isna(keys))
+        order = present[np.argsort(keys[present], kind='stable')]
+        sorted_keys = keys[order]
+
+        # Offsets where each run of equal keys starts, plus the end of the last run
+        if len(sorted_keys):
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        else:
+            starts = np.zeros(0, dtype=np.int64)
+        ends = np.r_[starts[1:], len(sorted_keys)].astype(np.int64)
+
+        self.order = order
+        # Native Python keys, so an int team number finds a float key of the same value
+        self.offsets = {
+            key: (start, end) for key, start, end in zip(sorted_keys[starts].tolist(), starts.tolist(), ends.tolist())
+        }
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, key):
+        return key in self.offsets
+
+    def keys(self):
+        """Indexed keys in ascending order"""
+        return list(self.offsets)
+
+    def positions(self, key):
+        """
+        Get the row positions for a key
+
+        Args:
+            key: Key value, e.g. an int team number (matches float keys of the same value)
+
+        Returns:
+            numpy.ndarray: Row positions in sheet order; empty if the key is not indexed
+        """
+        span = self.offsets.get(key)
+        if span is None:
+            return self.order[:0]
+        return self.order[span[0]:span[1]]
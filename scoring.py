@@ -0,0 +1,174 @@
+"""
+Match scoring for HeroScout
+Row-by-row scoring used by the single-team views, and a vectorized equivalent used to score the
+whole dataset at once when derived tables are rebuilt.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Import the ConfigLoader for settings
+from config_loader import config_loader
+
+# Text values counted as a successful leave
+LEAVE_TRUE_STRINGS = ('TRUE', 'T', 'YES', 'Y', '1')
+
+# Define the scoring rules - Now accepts the scoring rules as a parameter
+def calculate_scores(row, scoring_rules=None):
+    score = 0
+    
+    # Get the current scoring rules
+    if scoring_rules is None:
+        scoring_rules = config_loader.get_value('scoring_rules', {})
+    
+    try:
+        # Handle Leave Bonus specially since it's boolean
+        if 'Leave Bonus (T/F)' in row and 'Leave Bonus (T/F)' in scoring_rules:
+            # Convert to boolean correctly
+            leave_bonus = False
+            leave_value = row['Leave Bonus (T/F)']
+            
+            if isinstance(leave_value, bool):
+                leave_bonus = leave_value
+            elif isinstance(leave_value, str):
+                leave_bonus = leave_value.upper() in ('TRUE', 'T', 'YES', 'Y', '1')
+            elif isinstance(leave_value, (int, float)):
+                leave_bonus = leave_value >= 0.5
+                
+            if leave_bonus:
+                score += scoring_rules['Leave Bonus (T/F)']
+        
+        # Process all other scoring columns
+        for column in scoring_rules:
+            # Skip Leave Bonus as we already handled it
+            if column == 'Leave Bonus (T/F)':
+                continue
+                
+            # Handle Endgame Barge specially since it's a lookup table
+            if column == 'Endgame Barge' and column in row:
+                try:
+                    # Get the barge value and convert to int for lookup
+                    barge_value = row[column]
+                    if pd.isna(barge_value):
+                        continue
+                        
+                    if isinstance(barge_value, (int, float)):
+                        # Round to nearest integer
+                        barge_key = str(round(barge_value))
+                        if barge_key in scoring_rules[column]:
+                            score += scoring_rules[column][barge_key]
+                except (ValueError, TypeError, KeyError) as e:
+                    print(f"Error processing Endgame Barge: {e}")
+                    continue
+            
+            # Handle all other numeric columns
+            elif column in row and column != 'Endgame Barge':
+                try:
+                    value = row[column]
+                    # Skip NaN values
+                    if pd.isna(value):
+                        continue
+                        
+                    # Convert to numeric if needed
+                    if isinstance(value, str):
+                        try:
+                            value = float(value)
+                        except (ValueError, TypeError):
+                            continue
+                            
+                    # Apply scoring
+                    if isinstance(value, (int, float)):
+                        score += value * scoring_rules[column]
+                except Exception as e:
+                    print(f"Error processing column {column}: {e}")
+                    continue
+    
+    except Exception as e:
+        print(f"Error calculating score: {e}")
+    
+    return score
+
+
+def _leave_bonus_mask(values):
+    """Vectorized version of the Leave Bonus truthiness check in calculate_scores"""
+    if values.dtype == bool:
+        return values.to_numpy()
+    if values.dtype.kind in 'iuf':
+        return (values.to_numpy(dtype=float) >= 0.5)
+
+    def truthy(value):
+        if isinstance(value, (bool, np.bool_)):
+            return bool(value)
+        if isinstance(value, str):
+            return value.upper() in LEAVE_TRUE_STRINGS
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            return value >= 0.5
+        return False
+    return np.array([truthy(value) for value in values], dtype=bool)
+
+
+def _numeric_values(values, parse_text=True):
+    """Convert a column to floats the way calculate_scores does, with NaN for skipped cells"""
+    if values.dtype.kind in 'biuf':
+        return values.to_numpy(dtype=float)
+
+    def convert(value):
+        if isinstance(value, (bool, np.bool_)):
+            return float(value)
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            return float(value)
+        if isinstance(value, str) and parse_text:
+            try:
+                return float(value)
+            except ValueError:
+                return np.nan
+        return np.nan
+    return np.array([convert(value) for value in values], dtype=float)
+
+
+def score_frame(df, scoring_rules=None):
+    """
+    Score every row of a match frame at once
+
+    Produces the same values as applying calculate_scores to each row, adding the columns in the
+    same order so totals match exactly.
+
+    Args:
+        df (pandas.DataFrame): Match rows
+        scoring_rules (dict, optional): Scoring rules, defaults to the configured rules
+
+    Returns:
+        pandas.Series: Score per row, aligned with df.index
+    """
+    if scoring_rules is None:
+        scoring_rules = config_loader.get_value('scoring_rules', {})
+
+    total = np.zeros(len(df), dtype=float)
+
+    if 'Leave Bonus (T/F)' in df.columns and 'Leave Bonus (T/F)' in scoring_rules:
+        total += np.where(_leave_bonus_mask(df['Leave Bonus (T/F)']), scoring_rules['Leave Bonus (T/F)'], 0)
+
+    for column, rule in scoring_rules.items():
+        if column == 'Leave Bonus (T/F)' or column not in df.columns:
+            continue
+        # Endgame Barge text cells are skipped rather than parsed
+        values = _numeric_values(df[column], parse_text=column != 'Endgame Barge')
+
+        if column == 'Endgame Barge':
+            if not isinstance(rule, dict):
+                continue
+            # Round to the nearest level (half to even, like round()) and look the points up
+            lookup = {}
+            for key, points in rule.items():
+                try:
+                    lookup[int(key)] = points
+                except (ValueError, TypeError):
+                    continue
+            finite = np.isfinite(values)
+            levels = np.rint(np.where(finite, values, 0)).astype(np.int64)
+            points = np.array([lookup.get(level, 0) for level in levels.tolist()], dtype=float)
+            total += np.where(finite, points, 0)
+        elif isinstance(rule, (int, float)) and not isinstance(rule, bool):
+            total += np.where(np.isnan(values), 0, values * rule)
+
+    return pd.Series(total, index=df.index, name='Score')
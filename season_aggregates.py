@@ -0,0 +1,238 @@
+"""
+Season aggregation for HeroScout
+Streams any number of event workbooks chunk by chunk and keeps only mergeable per-team partial
+states (counts, sums, sums of squares, maxima and a score histogram), so memory is bounded by the
+number of teams rather than the number of rows. Workbooks are folded on the ingest thread pool
+(bounded by one core, since parsing holds the GIL) and the partials are merged as they finish.
+"""
+
+import os
+import sys
+import json
+import glob
+import threading
+import logging
+from concurrent.futures import as_completed
+
+import numpy as np
+
+from match_data import MATCH_SHEET, config_signature
+from sheet_reader import iter_sheet_chunks, match_columns
+from column_schema import schema_resolver
+from scoring import score_frame
+from team_aggregates import TeamAggregates, averaged_columns
+from derived_tables import DerivedTableError
+from event_partitions import PARTITION_FOLDERS, worker_pool
+
+# Set up logging
+logger = logging.getLogger('SeasonAggregates')
+
+# Rows streamed per chunk
+CHUNK_ROWS = 5000
+
+# Score histogram: fixed-width bins starting at 0, the last bin open-ended
+HISTOGRAM_BIN_WIDTH = 10
+HISTOGRAM_BINS = 30
+
+
+class SeasonAggregates(TeamAggregates):
+    """TeamAggregates plus a per-team histogram of match scores, mergeable across workbooks"""
+
+    def __init__(self, columns, bin_width=HISTOGRAM_BIN_WIDTH, bins=HISTOGRAM_BINS):
+        super().__init__(columns)
+        self.bin_width = bin_width
+        self.histogram = np.zeros((0, bins), dtype=np.int64)
+        self.workbooks = 0
+
+    def _grow(self, new_teams):
+        super()._grow(new_teams)
+        extra = np.zeros((len(new_teams), self.histogram.shape[1]), dtype=np.int64)
+        self.histogram = np.vstack([self.histogram, extra])
+
+    def _fold(self, df, scores, keep, slots):
+        super()._fold(df, scores, keep, slots)
+        bins = np.clip(np.floor(scores / self.bin_width), 0, self.histogram.shape[1] - 1).astype(np.int64)
+        np.add.at(self.histogram, (slots, bins), 1)
+
+    def merge(self, other):
+        if (other.bin_width, other.histogram.shape[1]) != (self.bin_width, self.histogram.shape[1]):
+            raise ValueError('Cannot merge score histograms with different bins')
+        slots = super().merge(other)
+        self.histogram[slots] += other.histogram
+        self.workbooks += other.workbooks
+        return slots
+
+    def summary(self):
+        """
+        Per-team season statistics
+
+        Returns:
+            dict: {team_number: {'matches', 'score_mean', 'score_histogram', 'columns':
+                  {column: {'count', 'mean', 'std', 'max'}}}}
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self.sum / self.count
+            # Sample variance from the running sums, clipped against rounding below zero
+            variance = np.clip((self.sumsq - self.sum * means) / (self.count - 1), 0, None)
+            variance[self.count < 2] = np.nan
+
+        result = {}
+        for team, slot in self._reported_teams():
+            columns = {}
+            for i, col in enumerate(self.columns):
+                columns[col] = {
+                    'count': int(self.count[slot, i]),
+                    'mean': _finite(means[slot, i]),
+                    'std': _finite(np.sqrt(variance[slot, i])),
+                    'max': _finite(self.max[slot, i])
+                }
+            matches = int(self.rows[slot])
+            result[int(team)] = {
+                'matches': matches,
+                'score_mean': float(self.score[slot] / matches) if matches else None,
+                'score_histogram': self.histogram[slot].tolist(),
+                'columns': columns
+            }
+        return result
+
+
+def _finite(value):
+    """Convert a NumPy float to a JSON-friendly float, with None for NaN"""
+    return None if np.isnan(value) else float(value)
+
+
+def aggregate_workbook(file_path, config, chunk_rows=CHUNK_ROWS):
+    """
+    Fold one workbook into a SeasonAggregates, one chunk at a time
+
+    Args:
+        file_path (str): Path to the workbook
+        config (dict): The game configuration
+        chunk_rows (int): Rows per chunk
+
+    Returns:
+        SeasonAggregates or None: The partial state, or None if the sheet has no usable data
+    """
+    include_columns = config.get('include_columns', [])
+    rules = config.get('scoring_rules', {})
+    aggregates = None
+    for chunk in iter_sheet_chunks(file_path, MATCH_SHEET, match_columns(config), chunk_rows=chunk_rows,
+                                   first_sheet_fallback=True):
+        frame = schema_resolver.resolve(chunk, config)
+        if aggregates is None:
+            try:
+                aggregates = SeasonAggregates(averaged_columns(frame, include_columns))
+            except DerivedTableError:
+                return None
+        aggregates.add_rows(frame, score_frame(frame, rules))
+    if aggregates is not None:
+        aggregates.workbooks = 1
+    return aggregates
+
+
+def season_workbooks(paths):
+    """Expand folders into the .xlsx workbooks they contain, skipping Office lock files"""
+    workbooks = []
+    for path in paths:
+        candidates = sorted(glob.glob(os.path.join(path, '*.xlsx'))) if os.path.isdir(path) else [path]
+        workbooks.extend(p for p in candidates if not os.path.basename(p).startswith('~$'))
+    return workbooks
+
+
+def aggregate_season(paths, config, workers=None):
+    """
+    Aggregate every workbook in a list of files and folders on the ingest worker pool
+
+    Workbooks without usable match data, or whose columns differ from the first usable
+    workbook, are skipped and listed in the result.
+
+    Args:
+        paths (list): Workbook paths and/or folders of workbooks
+        config (dict): The game configuration
+        workers (int): Worker threads (default: up to 4); they overlap file reads, not parsing
+
+    Returns:
+        tuple: (SeasonAggregates or None, list of skipped workbook paths)
+    """
+    workbooks = season_workbooks(paths)
+    season = None
+    skipped = []
+    if not workbooks:
+        return season, skipped
+
+    workers = workers or min(4, os.cpu_count() or 1)
+    with worker_pool(min(workers, len(workbooks))) as pool:
+        futures = {pool.submit(aggregate_workbook, path, config): path for path in workbooks}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                partial = future.result()
+            except Exception as e:
+                logger.error(f"Failed to aggregate {os.path.basename(path)}: {str(e)}")
+                partial = None
+            if partial is None:
+                skipped.append(path)
+            elif season is None:
+                season = partial
+            else:
+                try:
+                    season.merge(partial)
+                except ValueError as e:
+                    logger.error(f"Skipping {os.path.basename(path)}: {str(e)}")
+                    skipped.append(path)
+    return season, skipped
+
+
+class SeasonAggregator:
+    """
+    Season aggregates for a fixed list of folders, recomputed only when a workbook is added,
+    removed or changed (by mtime and size) or the configuration changes.
+    """
+
+    def __init__(self, paths, config_provider, workers=None):
+        self.paths = paths
+        # Callable returning the current game configuration
+        self.config_provider = config_provider
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.key = None
+        self.result = None
+
+    def _key(self, config):
+        stats = []
+        for path in season_workbooks(self.paths):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stats.append((path, stat.st_mtime, stat.st_size))
+        return config_signature(config), tuple(stats)
+
+    def get(self):
+        """
+        Get the season report, aggregating again if anything changed
+
+        Returns:
+            dict: {'workbooks', 'rows', 'skipped', 'bin_width', 'teams'}
+        """
+        config = self.config_provider()
+        with self.lock:
+            key = self._key(config)
+            if key != self.key:
+                season, skipped = aggregate_season(self.paths, config, self.workers)
+                self.result = {
+                    'workbooks': season.workbooks if season else 0,
+                    'rows': season.row_total if season else 0,
+                    'skipped': [os.path.basename(path) for path in skipped],
+                    'bin_width': season.bin_width if season else HISTOGRAM_BIN_WIDTH,
+                    'teams': season.summary() if season else {}
+                }
+                self.key = key
+            return self.result
+
+
+if __name__ == '__main__':
+    # Usage: python season_aggregates.py <workbook or folder> [...]
+    from config_loader import config_loader
+    report = SeasonAggregator(sys.argv[1:] or PARTITION_FOLDERS, config_loader.get_config).get()
+    print(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,275 @@
+"""
+Shared dataset files for multi-process serving
+The process that builds dataset generations publishes each one as a single memory-mapped file:
+a small version header, a JSON layout, then the canonical frame's numeric columns, the scores,
+row hashes and per-team aggregate arrays. Other server processes attach to the file read-only,
+so every process shares one copy of the data in the page cache and a reload is one publish.
+"""
+
+import os
+import json
+import time
+import struct
+import tempfile
+import threading
+import logging
+
+import numpy as np
+import pandas as pd
+
+from match_data import FileVersion, MatchDataset
+from derived_cache import aggregate_state, decode_table, encode_table, restore_aggregates
+
+# Set up logging
+logger = logging.getLogger('SharedDataset')
+
+# File header: magic, format, data version, generation, layout length
+HEADER = struct.Struct('<8sIQQQ')
+MAGIC = b'HSDATA\x00\x00'
+
+# Bump when the file layout changes so readers ignore files they cannot read
+SHARED_FORMAT = 2
+
+# Arrays start on 64-byte boundaries
+ALIGNMENT = 64
+
+# Name of the pointer file naming the current dataset file
+POINTER_FILE = 'CURRENT'
+
+# Number of older dataset files left for readers still attached to them
+KEEP_FILES = 3
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _plain(value):
+    """A category label as a JSON value"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def read_header(path):
+    """
+    Read the version header of a dataset file
+
+    Returns:
+        dict or None: {'format', 'data_version', 'generation', 'layout_length'}, or None if the
+                      file is not a dataset file
+    """
+    with open(path, 'rb') as file:
+        data = file.read(HEADER.size)
+    if len(data) < HEADER.size:
+        return None
+    magic, file_format, data_version, generation, layout_length = HEADER.unpack(data)
+    if magic != MAGIC:
+        return None
+    return {'format': file_format, 'data_version': data_version, 'generation': generation,
+            'layout_length': layout_length}
+
+
+class SharedDatasetWriter:
+    """
+    Publishes dataset generations into a directory of dataset files.
+
+    Each generation is written to its own file (dataset-<data version>.bin) and then made current
+    by atomically replacing the pointer file, so readers never see a partial file and a file
+    stays valid for readers still mapping it (also on Windows, where a mapped file cannot be
+    replaced). The oldest files beyond keep_files are removed.
+    """
+
+    def __init__(self, shared_dir, keep_files=KEEP_FILES):
+        self.shared_dir = shared_dir
+        self.keep_files = keep_files
+        self.lock = threading.Lock()
+        self.publish_count = 0
+        self.last_publish_seconds = None
+
+    def publish(self, dataset):
+        """
+        Write a generation and make it the current one
+
+        Args:
+            dataset (MatchDataset): The generation
+
+        Returns:
+            str or None: Path of the dataset file, or None if it could not be written
+        """
+        start = time.perf_counter()
+        arrays = {'scores': dataset.scores.to_numpy(dtype=float),
+                  'row_hashes': np.asarray(dataset.row_hashes, dtype=np.uint64)}
+        columns = []
+        for i, col in enumerate(dataset.frame.columns):
+            series = dataset.frame[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                arrays[f"column{i}"] = series.cat.codes.to_numpy()
+                columns.append({'name': col, 'kind': 'categorical',
+                                'categories': [_plain(value) for value in series.cat.categories]})
+            elif isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and series.dtype.kind in 'iu':
+                # Team and match numbers with missing cells: the values (0 where missing) plus the mask
+                arrays[f"column{i}"] = series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)
+                arrays[f"mask{i}"] = series.isna().to_numpy()
+                columns.append({'name': col, 'kind': 'nullable'})
+            elif series.dtype.kind in 'biuf':
+                arrays[f"column{i}"] = series.to_numpy()
+                columns.append({'name': col, 'kind': 'array'})
+            else:
+                # Text columns are small and stay in the layout
+                columns.append({'name': col, 'kind': 'values',
+                                'values': [None if pd.isna(value) else _plain(value) for value in series.tolist()]})
+        aggregate_meta, aggregate_arrays = aggregate_state(dataset.aggregates)
+        arrays.update(aggregate_arrays)
+
+        offset = 0
+        entries = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            arrays[name] = array
+            offset = _align(offset)
+            entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += array.nbytes
+
+        layout = json.dumps({
+            'version': list(dataset.version),
+            'config_signature': dataset.config_signature,
+            'columns': columns,
+            'arrays': entries,
+            'aggregates': aggregate_meta,
+            'tables': {name: encode_table(table) for name, table in dataset.tables.items()},
+            'memory': dataset.memory,
+            'built_at': dataset.built_at
+        }, default=_plain).encode('utf-8')
+        data_start = _align(HEADER.size + len(layout))
+        header = HEADER.pack(MAGIC, SHARED_FORMAT, dataset.data_version, dataset.generation, len(layout))
+
+        name = f"dataset-{dataset.data_version}.bin"
+        path = os.path.join(self.shared_dir, name)
+        try:
+            with self.lock:
+                os.makedirs(self.shared_dir, exist_ok=True)
+                self._write_atomic(path, lambda file: self._write_file(file, header, layout, data_start, arrays, entries))
+                pointer = json.dumps({'file': name, 'data_version': dataset.data_version}).encode('utf-8')
+                self._write_atomic(os.path.join(self.shared_dir, POINTER_FILE), lambda file: file.write(pointer))
+                self.publish_count += 1
+                self._prune(name)
+        except Exception as e:
+            logger.error(f"Failed to publish data version {dataset.data_version}: {str(e)}")
+            return None
+        self.last_publish_seconds = time.perf_counter() - start
+        return path
+
+    def _write_atomic(self, path, write):
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.shared_dir)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                write(file)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _write_file(file, header, layout, data_start, arrays, entries):
+        file.write(header)
+        file.write(layout)
+        for name, array in arrays.items():
+            file.write(b'\x00' * (data_start + entries[name]['offset'] - file.tell()))
+            file.write(array.tobytes())
+
+    def _prune(self, current):
+        """Remove the oldest dataset files beyond keep_files, skipping files still in use"""
+        names = [name for name in os.listdir(self.shared_dir)
+                 if name.startswith('dataset-') and name.endswith('.bin') and name != current]
+        names.sort(key=lambda name: os.path.getmtime(os.path.join(self.shared_dir, name)), reverse=True)
+        for name in names[max(self.keep_files - 1, 0):]:
+            try:
+                os.remove(os.path.join(self.shared_dir, name))
+            except OSError:
+                # Still mapped by a reader on a platform that forbids removing it; try again next time
+                pass
+
+
+class SharedDatasetReader:
+    """
+    Read-only view of the current published generation.
+
+    current() checks the pointer file (one os.stat) and only attaches to a new dataset file when
+    a new generation was published. Numeric columns, scores, row hashes and aggregate arrays are
+    read-only views into the memory-mapped file, never copies.
+    """
+
+    def __init__(self, shared_dir):
+        self.shared_dir = shared_dir
+        self.lock = threading.Lock()
+        self.dataset = None
+        self.pointer_stat = None
+        self.attach_count = 0
+
+    def current(self):
+        """
+        Get the current published generation
+
+        Returns:
+            MatchDataset or None: The generation, or None if nothing was published yet
+        """
+        pointer_path = os.path.join(self.shared_dir, POINTER_FILE)
+        try:
+            stat = os.stat(pointer_path)
+        except FileNotFoundError:
+            return self.dataset
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if key == self.pointer_stat:
+            return self.dataset
+
+        with self.lock:
+            if key == self.pointer_stat:
+                return self.dataset
+            try:
+                with open(pointer_path, 'r', encoding='utf-8') as f:
+                    pointer = json.load(f)
+                if self.dataset is None or pointer['data_version'] != self.dataset.data_version:
+                    self.dataset = self._attach(os.path.join(self.shared_dir, pointer['file']), pointer['data_version'])
+                    self.attach_count += 1
+                self.pointer_stat = key
+            except Exception as e:
+                # Keep serving the generation already attached
+                logger.error(f"Failed to attach shared dataset: {str(e)}")
+            return self.dataset
+
+    @staticmethod
+    def _attach(path, data_version):
+        header = read_header(path)
+        if header is None or header['format'] != SHARED_FORMAT or header['data_version'] != data_version:
+            raise ValueError(f"{os.path.basename(path)} is not a readable dataset file")
+        mapped = np.memmap(path, dtype=np.uint8, mode='r')
+        layout = json.loads(bytes(mapped[HEADER.size:HEADER.size + header['layout_length']]).decode('utf-8'))
+        data_start = _align(HEADER.size + header['layout_length'])
+
+        def array(name):
+            entry = layout['arrays'][name]
+            dtype = np.dtype(entry['dtype'])
+            count = int(np.prod(entry['shape'])) if entry['shape'] else 1
+            start = data_start + entry['offset']
+            return mapped[start:start + count * dtype.itemsize].view(dtype).reshape(entry['shape'])
+
+        data = {}
+        for i, column in enumerate(layout['columns']):
+            if column['kind'] == 'categorical':
+                data[column['name']] = pd.Categorical.from_codes(array(f"column{i}"), column['categories'])
+            elif column['kind'] == 'nullable':
+                data[column['name']] = pd.arrays.IntegerArray(array(f"column{i}"), array(f"mask{i}"))
+            elif column['kind'] == 'array':
+                data[column['name']] = array(f"column{i}")
+            else:
+                data[column['name']] = np.array(column['values'], dtype=object)
+        frame = pd.DataFrame(data, copy=False)
+        scores = pd.Series(array('scores'), index=frame.index, name='Score', copy=False)
+        arrays = {name: array(name) for name in layout['arrays'] if name.startswith('aggregates_')}
+
+        dataset = MatchDataset(header['generation'], FileVersion(*layout['version']), layout['config_signature'],
+                               frame, scores, restore_aggregates(layout['aggregates'], arrays),
+                               {name: decode_table(table) for name, table in layout['tables'].items()},
+                               array('row_hashes'), layout['memory'], data_version=header['data_version'])
+        dataset.built_at = layout['built_at']
+        return dataset
@@ -0,0 +1,226 @@
+"""
+Streaming reader for the 'Match Data' sheet
+Walks the workbook with openpyxl in read-only mode and only materializes the columns the server
+actually uses, building typed NumPy arrays directly instead of going through pd.read_excel.
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from column_schema import COLUMN_ALIASES, column_aliases
+
+# Key columns every route relies on
+KEY_COLUMNS = ['Team Number', 'Match Number', 'Scouter Name', 'Drive Team Location', 'Starting Location']
+
+# Columns read by get_defense_teams that are not part of include_columns
+DEFENSE_COLUMNS = ['Defense Performed', 'Defense Quality', 'Defense Time', 'Broke (T/F)', 'Minor Fouls', 'Major Fouls']
+
+# Columns read by get_all_notes
+NOTES_COLUMNS = ['Team Number', 'Match Number', 'Additional Observations', 'Scouter Name']
+
+
+def match_columns(config):
+    """
+    Get the set of sheet headers the routes need for a configuration
+
+    Args:
+        config (dict): The game configuration (include_columns, column_mappings, scoring_rules, team_column)
+
+    Returns:
+        frozenset: Header names to materialize
+    """
+    wanted = set(KEY_COLUMNS) | set(DEFENSE_COLUMNS)
+    wanted.add(config.get('team_column', 'Team Number'))
+    wanted.update(config.get('include_columns', []))
+    wanted.update(config.get('scoring_rules', {}).keys())
+
+    aliases = column_aliases(config)
+    for name in list(wanted):
+        wanted.update(aliases.get(name, []))
+    return frozenset(wanted)
+
+
+def notes_columns():
+    """Get the set of sheet headers needed by the notes view"""
+    wanted = set(NOTES_COLUMNS)
+    for name in NOTES_COLUMNS:
+        wanted.update(COLUMN_ALIASES.get(name, []))
+    return frozenset(wanted)
+
+
+# Text cells pd.read_excel treats as missing
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+# Text cells pd.read_excel turns into booleans
+TRUE_STRINGS = frozenset(['True', 'TRUE', 'true'])
+FALSE_STRINGS = frozenset(['False', 'FALSE', 'false'])
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _parse_number(text):
+    """Parse a numeric text cell the way pd.read_excel does, or return None"""
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _normalize_text(values):
+    """
+    Apply pd.read_excel's text handling to a column that contains strings: NA markers become
+    missing, and numeric or boolean text is converted if every cell in the column converts
+    """
+    values = [None if isinstance(value, str) and value in NA_STRINGS else value for value in values]
+    strings = [value for value in values if isinstance(value, str)]
+    if not strings:
+        return values
+
+    # Boolean text is only converted when the column holds nothing but text
+    if all(value in TRUE_STRINGS or value in FALSE_STRINGS for value in strings):
+        if all(value is None or isinstance(value, str) for value in values):
+            return [value if value is None else value in TRUE_STRINGS for value in values]
+
+    parsed = {value: _parse_number(value) for value in set(strings)}
+    if all(number is not None for number in parsed.values()):
+        if all(value is None or _is_number(value) or isinstance(value, str) for value in values):
+            return [parsed[value] if isinstance(value, str) else value for value in values]
+    return values
+
+
+def _to_array(values):
+    """Convert one column of raw cell values to the narrowest NumPy array pandas would infer"""
+    present = [value for value in values if value is not None]
+    if not present:
+        return np.full(len(values), np.nan)
+
+    # Numeric columns (the common case) skip the text handling entirely
+    if not all(_is_number(value) for value in present):
+        values = _normalize_text(values)
+        present = [value for value in values if value is not None]
+        if not present:
+            return np.full(len(values), np.nan)
+
+    if all(_is_number(value) for value in present):
+        if len(present) == len(values) and all(isinstance(value, int) for value in present):
+            return np.array(values, dtype=np.int64)
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+    if len(present) == len(values) and all(isinstance(value, bool) for value in present):
+        return np.array(values, dtype=bool)
+
+    if all(isinstance(value, datetime.datetime) for value in present):
+        return pd.to_datetime(pd.Series(values)).to_numpy()
+
+    result = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        result[i] = np.nan if value is None else value
+    return result
+
+
+def frame_from_records(records, columns=None):
+    """
+    Build a raw frame from row dicts, typing each column the way a sheet column with the same
+    cells would be typed, so rows that did not come from the workbook resolve identically
+
+    Args:
+        records (list): Row dicts of header -> cell value (missing keys are empty cells)
+        columns (list): Column order (default: keys in order of first appearance)
+
+    Returns:
+        pandas.DataFrame: The raw frame
+    """
+    if columns is None:
+        columns = list(dict.fromkeys(key for record in records for key in record))
+    return pd.DataFrame({col: _to_array([record.get(col) for record in records]) for col in columns},
+                        columns=columns)
+
+
+def _wanted_headers(header, wanted):
+    """Get the positions and names of the wanted headers, keeping the first occurrence of each"""
+    positions = []
+    names = []
+    for position, name in enumerate(header):
+        if name is not None and str(name) in wanted and str(name) not in names:
+            positions.append(position)
+            names.append(str(name))
+    return positions, names
+
+
+def iter_sheet_chunks(file_path, sheet_name, wanted, chunk_rows=None, first_sheet_fallback=False):
+    """
+    Stream a sheet as frames of at most chunk_rows rows holding only the wanted columns
+
+    Each chunk infers its own dtypes, so a column can be integer in one chunk and float in the
+    next; callers that combine chunks should coerce them (e.g. with the schema resolver).
+
+    Args:
+        file_path (str): Path to the workbook
+        sheet_name (str): Name of the sheet to read
+        wanted (set): Header names to keep; other columns are never materialized
+        chunk_rows (int): Rows per chunk, or None for a single frame with every row
+        first_sheet_fallback (bool): Read the first sheet if sheet_name does not exist
+
+    Yields:
+        pandas.DataFrame: Frames with the wanted columns that exist in the sheet, in sheet order
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        if first_sheet_fallback and sheet_name not in workbook.sheetnames:
+            sheet = workbook.worksheets[0]
+        else:
+            sheet = workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        positions, names = _wanted_headers(header, wanted)
+
+        columns = [[] for _ in positions]
+        count = 0
+        for row in rows:
+            # Skip blank lines, matching pd.read_excel
+            if all(cell is None for cell in row):
+                continue
+            width = len(row)
+            for values, position in zip(columns, positions):
+                values.append(row[position] if position < width else None)
+            count += 1
+            if chunk_rows and count == chunk_rows:
+                yield pd.DataFrame({name: _to_array(values) for name, values in zip(names, columns)}, copy=False)
+                columns = [[] for _ in positions]
+                count = 0
+
+        if count or not chunk_rows:
+            yield pd.DataFrame({name: _to_array(values) for name, values in zip(names, columns)}, copy=False)
+    finally:
+        workbook.close()
+
+
+def read_sheet_columns(file_path, sheet_name, wanted, first_sheet_fallback=False):
+    """
+    Stream a sheet and build a frame holding only the wanted columns
+
+    Args:
+        file_path (str): Path to the workbook
+        sheet_name (str): Name of the sheet to read
+        wanted (set): Header names to keep; other columns are never materialized
+        first_sheet_fallback (bool): Read the first sheet if sheet_name does not exist
+
+    Returns:
+        pandas.DataFrame: Frame with the wanted columns that exist in the sheet, in sheet order
+    """
+    frames = list(iter_sheet_chunks(file_path, sheet_name, wanted, first_sheet_fallback=first_sheet_fallback))
+    return frames[0] if frames else pd.DataFrame()
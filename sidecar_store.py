@@ -0,0 +1,172 @@
+"""
+Columnar sidecar snapshots of the parsed 'Match Data' sheet
+Each snapshot is a directory of one .npy file per column plus a small meta.json, keyed by the
+workbook's content hash. Numeric columns are memory-mapped on load so a restart does not have to
+go back through openpyxl.
+"""
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Set up logging
+logger = logging.getLogger('SidecarStore')
+
+# Bump when the on-disk layout changes so old snapshots are ignored
+SIDECAR_FORMAT = 1
+
+# Number of snapshots to keep before the oldest are pruned
+MAX_SIDECARS = 5
+
+# Type tags for cells of object columns, so mixed columns round-trip exactly
+TAG_MISSING, TAG_STR, TAG_BOOL, TAG_INT, TAG_FLOAT = range(5)
+
+
+def _encode_object_column(values):
+    """Split an object column into a fixed-width unicode array and a per-cell type tag array"""
+    tags = np.empty(len(values), dtype=np.uint8)
+    text = []
+    for i, value in enumerate(values):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            tags[i] = TAG_MISSING
+            text.append('')
+        elif isinstance(value, (bool, np.bool_)):
+            tags[i] = TAG_BOOL
+            text.append('1' if value else '0')
+        elif isinstance(value, (int, np.integer)):
+            tags[i] = TAG_INT
+            text.append(str(int(value)))
+        elif isinstance(value, (float, np.floating)):
+            tags[i] = TAG_FLOAT
+            text.append(repr(float(value)))
+        else:
+            tags[i] = TAG_STR
+            text.append(str(value))
+    return np.array(text, dtype=str), tags
+
+
+def _decode_object_column(text, tags):
+    """Rebuild an object column from its unicode array and type tags"""
+    decoders = {
+        TAG_MISSING: lambda s: np.nan,
+        TAG_STR: str,
+        TAG_BOOL: lambda s: s == '1',
+        TAG_INT: int,
+        TAG_FLOAT: float,
+    }
+    result = np.empty(len(tags), dtype=object)
+    for i, (value, tag) in enumerate(zip(text.tolist(), tags.tolist())):
+        result[i] = decoders[tag](value)
+    return result
+
+
+class SidecarStore:
+    """
+    Directory of columnar snapshots keyed by workbook content hash.
+    """
+
+    def __init__(self, cache_dir, max_sidecars=MAX_SIDECARS):
+        self.cache_dir = cache_dir
+        self.max_sidecars = max_sidecars
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.sidecar")
+
+    def has(self, digest):
+        """Check whether a complete snapshot exists for a workbook hash"""
+        return os.path.exists(os.path.join(self._path(digest), 'meta.json'))
+
+    def write(self, digest, frame):
+        """
+        Write a frame as a columnar snapshot
+
+        Args:
+            digest (str): Content hash of the workbook the frame was parsed from
+            frame (pandas.DataFrame): The parsed sheet
+
+        Returns:
+            bool: True if the snapshot was written
+        """
+        if self.has(digest):
+            return True
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write into a temporary directory first and rename, so readers never see a partial snapshot
+            tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+            columns = []
+            for i, col in enumerate(frame.columns):
+                series = frame[col]
+                if series.dtype.kind in 'biufM':
+                    np.save(os.path.join(tmp_dir, f"{i}.npy"), series.to_numpy())
+                    columns.append({'name': str(col), 'kind': 'array'})
+                else:
+                    text, tags = _encode_object_column(series.to_numpy(dtype=object))
+                    np.save(os.path.join(tmp_dir, f"{i}.npy"), text)
+                    np.save(os.path.join(tmp_dir, f"{i}.tags.npy"), tags)
+                    columns.append({'name': str(col), 'kind': 'object'})
+
+            meta = {'format': SIDECAR_FORMAT, 'digest': digest, 'rows': len(frame), 'columns': columns}
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+
+            try:
+                os.replace(tmp_dir, self._path(digest))
+            except OSError:
+                # Another writer got there first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            self._prune()
+            logger.info(f"Wrote sidecar for {digest[:12]} ({len(frame)} rows)")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to write sidecar for {digest[:12]}: {str(e)}")
+            return False
+
+    def load(self, digest):
+        """
+        Load a snapshot, memory-mapping numeric columns
+
+        Args:
+            digest (str): Content hash of the workbook
+
+        Returns:
+            pandas.DataFrame or None: The frame, or None if no usable snapshot exists
+        """
+        path = self._path(digest)
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('format') != SIDECAR_FORMAT:
+                return None
+
+            data = {}
+            for i, column in enumerate(meta['columns']):
+                if column['kind'] == 'array':
+                    data[column['name']] = np.load(os.path.join(path, f"{i}.npy"), mmap_mode='r')
+                else:
+                    text = np.load(os.path.join(path, f"{i}.npy"))
+                    tags = np.load(os.path.join(path, f"{i}.tags.npy"))
+                    data[column['name']] = _decode_object_column(text, tags)
+            return pd.DataFrame(data, copy=False)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to load sidecar for {digest[:12]}: {str(e)}")
+            return None
+
+    def _prune(self):
+        """Remove the oldest snapshots beyond max_sidecars"""
+        try:
+            entries = [
+                os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                if name.endswith('.sidecar')
+            ]
+            entries.sort(key=os.path.getmtime, reverse=True)
+            for stale in entries[self.max_sidecars:]:
+                shutil.rmtree(stale, ignore_errors=True)
+        except OSError as e:
+            logger.warning(f"Could not prune sidecars: {str(e)}")
@@ -0,0 +1,86 @@
+"""
+Request coalescing (single-flight) for HeroScout
+When several requests need the same expensive result at the same moment (parsing a workbook that
+just landed, building a filtered dataset, comparing the same teams), only the first one computes
+it; the others wait for that computation and share its result. Calls are keyed by operation,
+data version and parameters, so a result is never shared across dataset generations.
+"""
+
+import threading
+import logging
+from concurrent.futures import Future
+
+# Set up logging
+logger = logging.getLogger('SingleFlight')
+
+
+class SingleFlight:
+    """
+    In-flight computations by key.
+
+    Only computations that are running are kept: once the first caller finishes, its result is
+    handed to the callers that were waiting and forgotten, so this never serves stale results.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inflight = {}
+        # Per operation: calls, computations run and calls that joined a running computation
+        self.counters = {}
+
+    def do(self, operation, key, func):
+        """
+        Run func, or wait for an identical call that is already running
+
+        Args:
+            operation (str): Name of the operation, e.g. 'parse' or 'compare_teams'
+            key (tuple): Data version and parameters identifying the result (hashable)
+            func (callable): Computes the result; called with no arguments
+
+        Returns:
+            The result of func, from this call or the one it joined. An exception raised by the
+            running call is raised in every caller waiting on it.
+        """
+        flight_key = (operation,) + tuple(key)
+        with self.lock:
+            counters = self.counters.setdefault(operation, {'calls': 0, 'executions': 0, 'coalesced': 0})
+            counters['calls'] += 1
+            future = self.inflight.get(flight_key)
+            if future is not None:
+                counters['coalesced'] += 1
+                leader = False
+            else:
+                future = self.inflight[flight_key] = Future()
+                counters['executions'] += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(flight_key, None)
+
+    def stats(self):
+        """
+        Report how often calls were coalesced
+
+        Returns:
+            dict: {operation: {'calls', 'executions', 'coalesced'}} plus 'in_flight', the number
+                  of computations running now
+        """
+        with self.lock:
+            report = {operation: dict(counters) for operation, counters in self.counters.items()}
+            report['in_flight'] = len(self.inflight)
+        return report
+
+
+# Process-wide instance shared by the repository, the snapshot store, partitions and routes
+single_flight = SingleFlight()
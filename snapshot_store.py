@@ -0,0 +1,314 @@
+"""
+Content-addressed snapshot store for downloaded workbooks
+Every downloaded workbook is kept once under its SHA-256 in a snapshot directory, with a manifest
+of download times and row counts. Each snapshot also gets a small row index (one 64-bit hash per
+canonical row plus the key columns), so two versions can be compared, and an earlier one
+restored, without loading either workbook into a DataFrame.
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import logging
+
+import numpy as np
+import pandas as pd
+
+from match_data import MATCH_SHEET, config_signature, hash_file, row_hashes, unmatched_rows
+from sheet_reader import read_sheet_columns
+from column_schema import schema_resolver
+from single_flight import single_flight
+
+# Set up logging
+logger = logging.getLogger('SnapshotStore')
+
+# Bump when the row index layout or the row hashes change so old indexes are rebuilt
+SNAPSHOT_FORMAT = 3
+
+# Number of snapshots to keep before the oldest are pruned
+MAX_SNAPSHOTS = 100
+
+# Columns stored next to the row hashes to describe added, removed and changed rows
+ROW_KEY_COLUMNS = ['Team Number', 'Match Number', 'Scouter Name']
+
+
+def _write_atomic(path, write):
+    """Write a file through a temporary file in the same directory and rename it into place"""
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            write(file)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _plain(value):
+    """A key cell as a JSON-friendly value: None if missing (team and match numbers with missing
+    cells are nullable integers, so present ones are already whole numbers)"""
+    if pd.isna(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _row_keys(frame):
+    """The key columns of a canonical frame as plain Python values"""
+    return pd.DataFrame({
+        col: pd.Series([_plain(value) for value in frame[col].tolist()], dtype=object)
+        for col in ROW_KEY_COLUMNS if col in frame.columns
+    })
+
+
+class SnapshotStore:
+    """
+    Directory of workbooks named by content hash, plus manifest.json and per-snapshot row indexes.
+
+    Files are written once: storing a workbook that is already present only records another
+    download in the manifest.
+    """
+
+    def __init__(self, snapshot_dir, columns, config_provider, max_snapshots=MAX_SNAPSHOTS):
+        self.snapshot_dir = snapshot_dir
+        # Callable returning the set of headers to materialize when indexing a snapshot
+        self.columns = columns
+        # Callable returning the current game configuration
+        self.config_provider = config_provider
+        self.max_snapshots = max_snapshots
+        self.lock = threading.Lock()
+        self.manifest = self._read_manifest()
+
+    def _path(self, digest):
+        return os.path.join(self.snapshot_dir, f"{digest}.xlsx")
+
+    def _index_path(self, digest):
+        return os.path.join(self.snapshot_dir, f"{digest}.rows.npz")
+
+    def _manifest_path(self):
+        return os.path.join(self.snapshot_dir, 'manifest.json')
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            # Drop entries whose workbook was removed by hand
+            return {digest: entry for digest, entry in manifest.items() if os.path.exists(self._path(digest))}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Failed to read snapshot manifest, starting a new one: {str(e)}")
+            return {}
+
+    def _write_manifest(self):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        data = json.dumps(self.manifest, indent=2, sort_keys=True).encode('utf-8')
+        _write_atomic(self._manifest_path(), lambda file: file.write(data))
+
+    def add(self, file_path, source=None):
+        """
+        Store a downloaded workbook under its content hash
+
+        Args:
+            file_path (str): Path of the workbook just downloaded
+            source (str): Where it came from, recorded in the manifest
+
+        Returns:
+            str: The snapshot's content hash
+        """
+        digest = hash_file(file_path)
+        now = time.time()
+        with self.lock:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            if not os.path.exists(self._path(digest)):
+                with open(file_path, 'rb') as src:
+                    _write_atomic(self._path(digest), lambda file: shutil.copyfileobj(src, file))
+                logger.info(f"Stored snapshot {digest[:12]} ({os.path.getsize(self._path(digest))} bytes)")
+
+            entry = self.manifest.get(digest)
+            if entry is None:
+                entry = self.manifest[digest] = {
+                    'digest': digest,
+                    'size': os.path.getsize(self._path(digest)),
+                    'rows': None,
+                    'first_downloaded': now,
+                    'downloads': 0
+                }
+            entry['last_downloaded'] = now
+            entry['downloads'] += 1
+            if source:
+                entry['source'] = source
+            self._prune()
+            self._write_manifest()
+        return digest
+
+    def _prune(self):
+        """Remove the least recently downloaded snapshots beyond max_snapshots"""
+        entries = sorted(self.manifest.values(), key=lambda entry: entry['last_downloaded'], reverse=True)
+        for entry in entries[self.max_snapshots:]:
+            digest = entry['digest']
+            for path in (self._path(digest), self._index_path(digest)):
+                if os.path.exists(path):
+                    os.remove(path)
+            del self.manifest[digest]
+
+    def list_snapshots(self):
+        """Manifest entries, newest download first"""
+        with self.lock:
+            entries = [dict(entry) for entry in self.manifest.values()]
+        return sorted(entries, key=lambda entry: entry['last_downloaded'], reverse=True)
+
+    def resolve(self, prefix):
+        """
+        Find a snapshot by its hash or a unique hash prefix
+
+        Returns:
+            str or None: The full content hash
+        """
+        prefix = (prefix or '').strip().lower()
+        if not prefix:
+            return None
+        with self.lock:
+            matches = [digest for digest in self.manifest if digest.startswith(prefix)]
+        return matches[0] if len(matches) == 1 else None
+
+    def index(self, digest, frame, hashes, signature):
+        """
+        Save the row index of a snapshot from an already parsed canonical frame
+
+        Called by the reload pipeline, so snapshots that were loaded never need parsing again.
+        Does nothing for workbooks that are not in the store.
+        """
+        with self.lock:
+            entry = self.manifest.get(digest)
+            if entry is None:
+                return
+            try:
+                self._save_index(digest, frame, hashes, signature)
+                entry['rows'] = len(frame)
+                self._write_manifest()
+            except Exception as e:
+                logger.error(f"Failed to index snapshot {digest[:12]}: {str(e)}")
+
+    def _save_index(self, digest, frame, hashes, signature):
+        # Nothing is pickled: whole-number key columns are saved as integers plus a missing-cell
+        # mask, and other key columns (scouter names) as JSON lists in the meta string
+        arrays = {'hashes': np.asarray(hashes, dtype=np.uint64)}
+        keys = _row_keys(frame)
+        text = {}
+        for i, col in enumerate(keys.columns):
+            values = keys[col].tolist()
+            if all(value is None or (isinstance(value, int) and not isinstance(value, bool)) for value in values):
+                mask = np.array([value is None for value in values], dtype=bool)
+                arrays[f"key{i}"] = np.array([0 if value is None else value for value in values], dtype=np.int64)
+                arrays[f"mask{i}"] = mask
+            else:
+                text[col] = values
+        meta = json.dumps({'format': SNAPSHOT_FORMAT, 'signature': signature, 'keys': list(keys.columns),
+                           'text': text})
+        _write_atomic(self._index_path(digest),
+                      lambda file: np.savez(file, meta=np.array(meta), **arrays))
+
+    def _load_index(self, digest):
+        """
+        Get (hashes, key frame) for a snapshot, parsing the workbook only if no current index exists
+        """
+        config = self.config_provider()
+        signature = config_signature(config)
+        try:
+            with np.load(self._index_path(digest), allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if meta.get('format') == SNAPSHOT_FORMAT and meta.get('signature') == signature:
+                    keys = {}
+                    for i, col in enumerate(meta['keys']):
+                        if col in meta['text']:
+                            values = meta['text'][col]
+                        else:
+                            values = [None if missing else int(value)
+                                      for value, missing in zip(data[f"key{i}"].tolist(), data[f"mask{i}"].tolist())]
+                        keys[col] = pd.Series(values, dtype=object)
+                    return data['hashes'], pd.DataFrame(keys)
+        except (OSError, ValueError, KeyError) as e:
+            # Missing, unreadable or damaged index: parse the workbook again below
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Row index of snapshot {digest[:12]} is unreadable, rebuilding: {str(e)}")
+
+        # Not loaded under the current configuration yet: parse it once and keep the index
+        # (concurrent diffs of the same snapshot share the parse)
+        def parse():
+            raw = read_sheet_columns(self._path(digest), MATCH_SHEET, self.columns())
+            frame = schema_resolver.resolve(raw, config)
+            hashes = row_hashes(frame)
+            self.index(digest, frame, hashes, signature)
+            return hashes, _row_keys(frame)
+
+        return single_flight.do('snapshot_index', (digest, signature), parse)
+
+    def diff(self, old, new):
+        """
+        Compare two snapshots row by row using their row hashes
+
+        Rows only in the newer snapshot are added, rows only in the older one removed (duplicates
+        are counted). An added and a removed row with the same team, match and scouter are
+        reported as one changed row.
+
+        Args:
+            old (str): Content hash of the older snapshot
+            new (str): Content hash of the newer snapshot
+
+        Returns:
+            dict: {'old', 'new', 'unchanged', 'added', 'removed', 'changed'} with the key columns
+                  of every added, removed and changed row
+        """
+        old_hashes, old_keys = self._load_index(old)
+        new_hashes, new_keys = self._load_index(new)
+        added = new_keys.iloc[unmatched_rows(new_hashes, old_hashes)]
+        removed = old_keys.iloc[unmatched_rows(old_hashes, new_hashes)]
+
+        key_columns = [col for col in ROW_KEY_COLUMNS if col in added.columns and col in removed.columns]
+        changed = []
+        if key_columns:
+            removed_by_key = {}
+            for position, key in zip(range(len(removed)), removed[key_columns].itertuples(index=False, name=None)):
+                removed_by_key.setdefault(key, []).append(position)
+            added_left, removed_used = [], set()
+            for position, key in zip(range(len(added)), added[key_columns].itertuples(index=False, name=None)):
+                candidates = removed_by_key.get(key)
+                if candidates:
+                    removed_used.add(candidates.pop(0))
+                    changed.append(dict(zip(key_columns, key)))
+                else:
+                    added_left.append(position)
+            added = added.iloc[added_left]
+            removed = removed.iloc[[i for i in range(len(removed)) if i not in removed_used]]
+
+        return {
+            'old': old,
+            'new': new,
+            'unchanged': int(len(new_hashes) - len(added) - len(changed)),
+            'added': added.to_dict(orient='records'),
+            'removed': removed.to_dict(orient='records'),
+            'changed': changed
+        }
+
+    def restore(self, digest, local_path):
+        """
+        Copy a snapshot back over the live workbook, atomically
+
+        Args:
+            digest (str): Content hash of the snapshot
+            local_path (str): Path of the live workbook
+
+        Returns:
+            bool: True if the snapshot was restored
+        """
+        path = self._path(digest)
+        if digest not in self.manifest or not os.path.exists(path):
+            return False
+        with open(path, 'rb') as src:
+            _write_atomic(local_path, lambda file: shutil.copyfileobj(src, file))
+        logger.info(f"Restored snapshot {digest[:12]} to {os.path.basename(local_path)}")
+        return True
@@ -98,8 +98,10 @@ const assistant = {
         
         // Preload data if available
         try {
-            this.dataCache = await $.get('/get_all_team_averages');
-            this.teamRankingsCache = await $.get('/get_team_rankings');
+            // Shared with the search and alliance selection caches, which keep it up to date
+            const tables = await dataStore.refresh();
+            this.dataCache = tables.team_averages;
+            this.teamRankingsCache = tables.rankings;
             console.log("Bob AI Assistant data preloaded successfully");
         } catch (error) {
             console.error("Error preloading Bob AI Assistant data:", error);
@@ -1803,131 +1803,61 @@ function getAllianceRecommendations(myTeamNumber, preference = 'offense', robotT
     // Set user's team number in state
     allianceSelectionState.myTeamNumber = myTeamNumber;
     
-    // First, load team rankings data
-    $.get('/get_team_rankings', function(rankingsData) {
+    // Rankings, averages, match counts and defense come from the shared data store, which only
+    // downloads the teams that changed since the last refresh
+    dataStore.refresh().then(function(tables) {
         // Store rankings data
-        allianceSelectionState.teamRankings = rankingsData;
+        allianceSelectionState.teamRankings = tables.rankings;
         
-        // If defense preference is selected, get defensive teams first
+        // If defense preference is selected, we need the defensive teams too
         if (preference === 'defense') {
-            $.get('/get_defense_teams', function(defenseData) {
-                allianceSelectionState.defenseTeamRankings = defenseData;
-                
-                // Now load team average data
-                $.get('/get_all_team_averages', function(data) {
-                    allianceSelectionState.teamData = data;
-                    
-                    // We also need to load match counts for each team
-                    $.get('/get_team_match_counts', function(matchCounts) {
-                        // Create mapping of team rankings for quick access with match counts
-                        const rankingsMap = {};
-                        if (allianceSelectionState.teamRankings) {
-                            // Convert to array of objects with team number, points, and match count
-                            const rankingsArray = Object.keys(allianceSelectionState.teamRankings).map(team => ({
-                                team: parseInt(team),
-                                points: allianceSelectionState.teamRankings[team],
-                                matchCount: matchCounts[team] || 1 // Default to 1 if not found
-                            }));
-                            
-                            // Sort by points (highest first)
-                            rankingsArray.sort((a, b) => b.points - a.points);
-                            
-                            // Create a map with team number -> {rank, points, matchCount}
-                            rankingsArray.forEach((item, index) => {
-                                rankingsMap[item.team] = {
-                                    rank: index + 1,
-                                    points: item.points,
-                                    matchCount: item.matchCount
-                                };
-                            });
-                            
-                            // Store the updated rankings with match counts
-                            allianceSelectionState.teamRankingsWithMatchCounts = rankingsMap;
-                        }
-                        
-                        // Calculate recommendations based on team data and rankings
-                        const recommendations = calculateRecommendations(myTeamNumber, preference, robotType);
-                        
-                        // Display recommendations
-                        showRecommendationsDialog(recommendations, preference, robotType);
-                        
-                        hideSpinner();
-                    }).fail(function() {
-                        // If getting match counts fails, still continue with the process
-                        // Calculate recommendations based on team data and rankings without match counts
-                        const recommendations = calculateRecommendations(myTeamNumber, preference, robotType);
-                        
-                        // Display recommendations
-                        showRecommendationsDialog(recommendations, preference, robotType);
-                        
-                        hideSpinner();
-                    });
-                }).fail(function(jqXHR, textStatus) {
-                    hideSpinner();
-                    showToast('Failed to load team data for recommendations', 'danger');
-                });
-            }).fail(function(jqXHR, textStatus) {
+            if (!tables.defense) {
                 hideSpinner();
                 showToast('Failed to load defense team data', 'danger');
+                return;
+            }
+            allianceSelectionState.defenseTeamRankings = tables.defense;
+        }
+        
+        allianceSelectionState.teamData = tables.team_averages;
+        const matchCounts = tables.match_counts || {};
+        
+        // Create mapping of team rankings for quick access with match counts
+        const rankingsMap = {};
+        if (allianceSelectionState.teamRankings) {
+            // Convert to array of objects with team number, points, and match count
+            const rankingsArray = Object.keys(allianceSelectionState.teamRankings).map(team => ({
+                team: parseInt(team),
+                points: allianceSelectionState.teamRankings[team],
+                matchCount: matchCounts[team] || 1 // Default to 1 if not found
+            }));
+            
+            // Sort by points (highest first)
+            rankingsArray.sort((a, b) => b.points - a.points);
+            
+            // Create a map with team number -> {rank, points, matchCount}
+            rankingsArray.forEach((item, index) => {
+                rankingsMap[item.team] = {
+                    rank: index + 1,
+                    points: item.points,
+                    matchCount: item.matchCount
+                };
             });
-        } else {
-            // For non-defense preferences, just get regular team data
-            $.get('/get_all_team_averages', function(data) {
-                allianceSelectionState.teamData = data;
-                
-                // We also need to load match counts for each team
-                $.get('/get_team_match_counts', function(matchCounts) {
-                    // Create mapping of team rankings for quick access with match counts
-                    const rankingsMap = {};
-                    if (allianceSelectionState.teamRankings) {
-                        // Add match counts to rankings
-                        const rankingsArray = Object.keys(allianceSelectionState.teamRankings).map(team => ({
-                            team: parseInt(team),
-                            points: allianceSelectionState.teamRankings[team],
-                            matchCount: matchCounts[team] || 1 // Default to 1 if not found
-                        }));
-                        
-                        // Sort by points
-                        rankingsArray.sort((a, b) => b.points - a.points);
-                        
-                        // Create map with match counts
-                        rankingsArray.forEach((item, index) => {
-                            rankingsMap[item.team] = {
-                                rank: index + 1,
-                                points: item.points,
-                                matchCount: item.matchCount
-                            };
-                        });
-                        
-                        // Store the updated rankings
-                        allianceSelectionState.teamRankingsWithMatchCounts = rankingsMap;
-                    }
-                    
-                    // Calculate recommendations
-                    const recommendations = calculateRecommendations(myTeamNumber, preference, robotType);
-                    
-                    // Display recommendations
-                    showRecommendationsDialog(recommendations, preference, robotType);
-                    
-                    hideSpinner();
-                }).fail(function() {
-                    // If getting match counts fails, still continue with the process
-                    // Calculate recommendations without match counts
-                    const recommendations = calculateRecommendations(myTeamNumber, preference, robotType);
-                    
-                    // Display recommendations
-                    showRecommendationsDialog(recommendations, preference, robotType);
-                    
-                    hideSpinner();
-                });
-            }).fail(function(jqXHR, textStatus) {
-                hideSpinner();
-                showToast('Failed to load team data for recommendations', 'danger');
-            });
+            
+            // Store the updated rankings with match counts
+            allianceSelectionState.teamRankingsWithMatchCounts = rankingsMap;
         }
+        
+        // Calculate recommendations based on team data and rankings
+        const recommendations = calculateRecommendations(myTeamNumber, preference, robotType);
+        
+        // Display recommendations
+        showRecommendationsDialog(recommendations, preference, robotType);
+        
+        hideSpinner();
     }).fail(function(jqXHR, textStatus) {
         hideSpinner();
-        showToast('Failed to load team rankings for recommendations', 'danger');
+        showToast('Failed to load team data for recommendations', 'danger');
     });
 }
 
@@ -7,11 +7,11 @@ let searchRefreshInterval;  // Variable to store the interval ID
 
 // Create a new endpoint to handle team search with stats
 function createTeamSearchEndpoint() {
-    // Use the Flask endpoint to get all team data
-    return $.get('/get_all_team_averages')
-        .then(function(allAverages) {
-            searchCache.allTeams = allAverages;
-            return allAverages;
+    // Use the shared data store: only the teams that changed since the last refresh are downloaded
+    return dataStore.refresh()
+        .then(function(tables) {
+            searchCache.allTeams = tables.team_averages;
+            return tables.team_averages;
         });
 }
 
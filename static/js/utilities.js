@@ -67,3 +67,57 @@ function getChartTitle() {
     };
     return metricLabels[metric] || 'Team Performance';
 }
+
+// Shared client copy of the per-team tables (team_averages, rankings, match_counts, defense).
+// The first refresh downloads every table; later refreshes ask /changes for only what changed
+// since our data version and merge it into the same objects, so references stay current.
+const dataStore = {
+    version: null,
+    tables: {},
+    pending: null,
+
+    refresh: function() {
+        // Callers that refresh at the same time share one request
+        if (this.pending) return this.pending;
+
+        const params = this.version === null ? {} : { since: this.version };
+        const store = this;
+        this.pending = $.get('/changes', params).then(function(delta) {
+            if (!delta.full && Object.keys(delta.tables).some(name => !store.tables[name])) {
+                // A table we never received (it failed to build before): start over with everything
+                return $.get('/changes').then(function(full) {
+                    store.applyDelta(full);
+                    return store.tables;
+                });
+            }
+            store.applyDelta(delta);
+            return store.tables;
+        });
+        this.pending.always(function() {
+            store.pending = null;
+        });
+        return this.pending;
+    },
+
+    applyDelta: function(delta) {
+        Object.keys(delta.tables).forEach(function(name) {
+            if (delta.full) {
+                // Replace the contents in place so existing references see the new data
+                const table = dataStore.tables[name] || {};
+                Object.keys(table).forEach(function(team) { delete table[team]; });
+                dataStore.tables[name] = Object.assign(table, delta.tables[name]);
+            } else {
+                Object.assign(dataStore.tables[name], delta.tables[name]);
+            }
+            (delta.removed[name] || []).forEach(function(team) {
+                delete dataStore.tables[name][team];
+            });
+        });
+        this.version = delta.version;
+
+        if (!delta.full && delta.teams.length > 0) {
+            console.log(`Data version ${delta.version}: ${delta.teams.length} teams changed, ` +
+                        `${delta.rows_added} rows added in matches ${delta.matches.join(', ')}`);
+        }
+    }
+};
@@ -0,0 +1,190 @@
+"""
+Running per-team aggregates for HeroScout
+Keeps per-team sums, counts, maxima, row counts and score totals that can be updated with only the
+rows appended since the last load, instead of regrouping the whole dataset on every refresh.
+"""
+
+import numpy as np
+import pandas as pd
+
+from derived_tables import DerivedTableError, to_native
+
+# Columns reported as a per-team maximum instead of an average
+MAX_COLUMNS = ('Endgame Barge',)
+
+
+def averaged_columns(df, include_columns):
+    """
+    Pick the columns to aggregate: the configured include columns that exist, or every numeric
+    column except Team Number and Match Number if none of them exist
+
+    Raises:
+        DerivedTableError: If Team Number is missing or there is nothing to aggregate
+    """
+    # Ensure Team Number is available
+    if 'Team Number' not in df.columns:
+        raise DerivedTableError('Team Number column not found in Excel file', 500)
+
+    valid_columns = [col for col in include_columns if col in df.columns]
+    if not valid_columns:
+        numeric_columns = df.select_dtypes(include=['number']).columns.tolist()
+        valid_columns = [col for col in numeric_columns if col not in ['Team Number', 'Match Number']]
+        if not valid_columns:
+            raise DerivedTableError('No valid numeric data columns found in the Excel file', 400)
+    return valid_columns
+
+
+class TeamAggregates:
+    """
+    Mergeable per-team running totals.
+
+    State is one row per team (in order of first appearance) in a set of NumPy arrays:
+    non-missing counts, sums, sums of squares and maxima per column, plus the number of scouted
+    rows and the total score. Rows with a missing team number are ignored, like pandas groupby
+    does. Two aggregates over different rows combine exactly with merge().
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.teams = []
+        self.index = {}
+        width = len(self.columns)
+        self.count = np.zeros((0, width))
+        self.sum = np.zeros((0, width))
+        self.sumsq = np.zeros((0, width))
+        self.max = np.zeros((0, width))
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.score = np.zeros(0)
+        self.row_total = 0
+
+    @classmethod
+    def from_frame(cls, df, scores, include_columns):
+        """Build aggregates from scratch for a full frame"""
+        aggregates = cls(averaged_columns(df, include_columns))
+        aggregates.add_rows(df, scores)
+        return aggregates
+
+    def copy(self):
+        """Return an independent copy, so a published generation is never modified"""
+        other = self.__class__.__new__(self.__class__)
+        other.__dict__ = {name: value.copy() if hasattr(value, 'copy') else value
+                          for name, value in self.__dict__.items()}
+        return other
+
+    def _grow(self, new_teams):
+        """Add zeroed state for teams seen for the first time"""
+        for team in new_teams:
+            self.index[team] = len(self.teams)
+            self.teams.append(team)
+        extra = len(new_teams)
+        width = len(self.columns)
+        self.count = np.vstack([self.count, np.zeros((extra, width))])
+        self.sum = np.vstack([self.sum, np.zeros((extra, width))])
+        self.sumsq = np.vstack([self.sumsq, np.zeros((extra, width))])
+        self.max = np.vstack([self.max, np.full((extra, width), np.nan)])
+        self.rows = np.concatenate([self.rows, np.zeros(extra, dtype=np.int64)])
+        self.score = np.concatenate([self.score, np.zeros(extra)])
+
+    def add_rows(self, df, scores):
+        """
+        Fold new rows into the running totals
+
+        Args:
+            df (pandas.DataFrame): The new rows
+            scores (pandas.Series): Score per new row, aligned with df
+        """
+        self.row_total += len(df)
+        if len(df) == 0:
+            return
+
+        codes, uniques = pd.factorize(df['Team Number'])
+        new_teams = [team for team in uniques if team not in self.index]
+        if new_teams:
+            self._grow(new_teams)
+
+        keep = codes >= 0
+        slots = np.array([self.index[team] for team in uniques], dtype=np.int64)[codes[keep]]
+        self._fold(df, scores.to_numpy(dtype=float)[keep], keep, slots)
+
+    def _fold(self, df, scores, keep, slots):
+        """Add the kept rows of df (with their scores) to the state rows given by slots"""
+        if self.columns:
+            values = np.column_stack([
+                df[col].to_numpy(dtype=float)[keep] for col in self.columns
+            ])
+            present = ~np.isnan(values)
+            filled = np.where(present, values, 0)
+            np.add.at(self.count, slots, present)
+            np.add.at(self.sum, slots, filled)
+            np.add.at(self.sumsq, slots, filled * filled)
+            np.fmax.at(self.max, slots, values)
+
+        np.add.at(self.rows, slots, 1)
+        np.add.at(self.score, slots, scores)
+
+    def merge(self, other):
+        """
+        Add another aggregate over different rows into this one
+
+        Args:
+            other (TeamAggregates): Aggregates over the same columns
+
+        Returns:
+            list: This aggregate's state rows for other's teams, in other's order
+        """
+        if other.columns != self.columns:
+            raise ValueError('Cannot merge aggregates over different columns')
+        new_teams = [team for team in other.teams if team not in self.index]
+        if new_teams:
+            self._grow(new_teams)
+        slots = [self.index[team] for team in other.teams]
+
+        # Each team appears once in other, so plain fancy-index updates are safe
+        self.count[slots] += other.count
+        self.sum[slots] += other.sum
+        self.sumsq[slots] += other.sumsq
+        self.max[slots] = np.fmax(self.max[slots], other.max)
+        self.rows[slots] += other.rows
+        self.score[slots] += other.score
+        self.row_total += other.row_total
+        return slots
+
+    def _reported_teams(self):
+        """Team numbers to report (excluding team 0), with their state rows"""
+        return [(team, slot) for slot, team in enumerate(self.teams) if team != 0]
+
+    def team_numbers(self):
+        """Sorted list of team numbers, as returned by /get_all_teams"""
+        numbers = []
+        for team, _ in self._reported_teams():
+            try:
+                numbers.append(int(team))
+            except (ValueError, TypeError):
+                continue
+        numbers.sort()
+        return numbers
+
+    def averages(self):
+        """Per-team averages (max for Endgame Barge), as returned by /get_all_team_averages"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self.sum / self.count
+        result = {}
+        for team, slot in self._reported_teams():
+            team_data = {}
+            for i, col in enumerate(self.columns):
+                value = self.max[slot, i] if col in MAX_COLUMNS else means[slot, i]
+                team_data[col] = to_native(value)
+            result[int(team)] = team_data
+        return result
+
+    def rankings(self):
+        """Total score per team, best first, as returned by /get_team_rankings"""
+        if not self.teams:
+            return {}
+        totals = pd.Series(self.score, index=self.teams).sort_index().sort_values(ascending=False)
+        totals = totals[totals.index != 0]
+        return {int(team): float(score) for team, score in totals.items()}
+
+    def match_counts(self):
+        """Number of scouted rows per team, as returned by /get_team_match_counts"""
+        return {str(int(team)): int(self.rows[slot]) for team, slot in sorted(self._reported_teams())}
@@ -0,0 +1,122 @@
+"""
+Shared fixtures for the HeroScout tests
+A small game configuration, a builder for scouting rows and an in-memory stand-in for the workbook
+repository, so the reload pipeline can be exercised without Excel files.
+
+Run from the repository root (pytest is not in requirements.txt, install it separately):
+    python -m pytest tests
+"""
+
+import os
+import sys
+import itertools
+
+import pytest
+
+# Allow importing the server modules from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from openpyxl import Workbook
+
+from match_data import MATCH_SHEET, FileVersion
+from sheet_reader import frame_from_records
+from column_schema import schema_resolver
+
+# A cut-down REEFSCAPE configuration: counts, a true/false column and a value table
+CONFIG = {
+    'team_column': 'Team Number',
+    'include_columns': ['Leave Bonus (T/F)', 'Coral L1 (#)', 'Coral L4 (#)', 'Algae Net (#)', 'Defense Performed',
+                        'Endgame Barge', 'Minor Fouls'],
+    'column_mappings': {},
+    'scoring_rules': {
+        'Leave Bonus (T/F)': 3,
+        'Coral L1 (#)': 2,
+        'Coral L4 (#)': 5,
+        'Algae Net (#)': 4,
+        'Endgame Barge': {'0': 0, '1': 2, '2': 6, '3': 12},
+        'Minor Fouls': -2
+    }
+}
+
+
+def match_row(team, match, scouter='Alex', coral=1, **values):
+    """
+    Build one scouting row with every include column filled in
+
+    Args:
+        team (int): Team number
+        match (int): Match number
+        scouter (str): Scouter name
+        coral (int): Value of every count column not given in values
+        **values: Other cells by column name (e.g. **{'Coral L4 (#)': 3})
+    """
+    row = {'Scouter Name': scouter, 'Match Number': match, 'Team Number': team, 'Drive Team Location': 'R1'}
+    for col in CONFIG['include_columns']:
+        if col.endswith('(T/F)'):
+            row[col] = True
+        elif col == 'Endgame Barge':
+            row[col] = 2
+        else:
+            row[col] = coral
+    row.update(values)
+    return row
+
+
+def write_workbook(path, rows):
+    """Write row dicts to a workbook's 'Match Data' sheet, one column per key of the first row"""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = MATCH_SHEET
+    headers = list(rows[0])
+    sheet.append(headers)
+    for row in rows:
+        sheet.append([row.get(header) for header in headers])
+    workbook.save(path)
+    return path
+
+
+def canonical(rows):
+    """The canonical frame of a list of row dicts, as the pipeline sees a sheet"""
+    return schema_resolver.resolve(frame_from_records(rows), CONFIG)
+
+
+class MemoryRepository:
+    """
+    Stands in for MatchDataRepository: serves a frame built from row dicts, with a new version
+    every time the rows are replaced
+    """
+
+    file_path = os.devnull
+
+    # Versions are unique across repositories, since canonical frames are cached by workbook digest
+    revisions = itertools.count(1)
+
+    def __init__(self, rows):
+        self.set_rows(rows)
+
+    def set_rows(self, rows):
+        self.rows = [dict(row) for row in rows]
+        self.frame = frame_from_records(self.rows)
+        revision = next(self.revisions)
+        self.version = FileVersion(float(revision), len(self.rows), f"workbook-{revision}")
+
+    def append_rows(self, rows):
+        self.set_rows(self.rows + list(rows))
+
+    def get_frame(self):
+        return self.frame
+
+    def get_version(self):
+        return self.version
+
+
+@pytest.fixture
+def config():
+    return dict(CONFIG)
+
+
+@pytest.fixture
+def rows():
+    """Two matches of six robots, every robot scouted once"""
+    teams = [31, 1209, 2165, 3247, 4522, 10626]
+    return [match_row(team, match, coral=(team + match) % 5) for match in (1, 2) for team in teams]
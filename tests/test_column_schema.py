@@ -0,0 +1,53 @@
+"""Canonical schema: alias headers, and numeric columns filled from several aliases"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from column_schema import SchemaPlan, schema_resolver
+
+CONFIG = {
+    'team_column': 'Team Number',
+    'include_columns': ['Coral L2/L3 (#)', 'Algae Net (#)'],
+    'column_mappings': {},
+    'scoring_rules': {'Coral L2/L3 (#)': 3}
+}
+
+
+def test_alias_is_renamed_to_the_canonical_name():
+    raw = pd.DataFrame({'Team': [31, 1209], 'Match': [1, 1], 'Barge Algae': [2, 0]})
+    frame = schema_resolver.resolve(raw, CONFIG)
+
+    assert list(frame.columns) == ['Team Number', 'Match Number', 'Algae Net (#)']
+    assert frame['Algae Net (#)'].tolist() == [2, 0]
+
+
+def test_separate_l2_and_l3_counts_are_summed():
+    raw = pd.DataFrame({'Team Number': [31, 1209, 2165], 'Coral L2': [1, None, None],
+                        'Coral L3': [2, 4, None]})
+    frame = schema_resolver.resolve(raw, CONFIG)
+
+    values = frame['Coral L2/L3 (#)'].to_numpy(dtype=float)
+    assert values[:2].tolist() == [3, 4]
+    # Missing in every alias stays missing, so averages still skip the cell
+    assert np.isnan(values[2])
+    assert SchemaPlan.compile(list(raw.columns), CONFIG).sums == {'Coral L2/L3 (#)': ['Coral L2', 'Coral L3']}
+
+
+def test_canonical_header_wins_over_its_aliases():
+    raw = pd.DataFrame({'Team Number': [31], 'Coral L2/L3 (#)': [5], 'Coral L2': [1], 'Coral L3': [2]})
+    frame = schema_resolver.resolve(raw, CONFIG)
+
+    assert frame['Coral L2/L3 (#)'].tolist() == [5]
+
+
+def test_text_aliases_keep_the_first_with_a_warning(caplog):
+    raw = pd.DataFrame({'Team Number': [31], 'Notes': ['fast'], 'Comments': ['tipped']})
+    with caplog.at_level(logging.WARNING, logger='ColumnSchema'):
+        plan = SchemaPlan.compile(list(raw.columns), CONFIG)
+    frame = plan.apply(raw)
+
+    assert frame['Additional Observations'].tolist() == ['fast']
+    assert frame['Comments'].tolist() == ['tipped']
+    assert "ignoring ['Comments']" in caplog.text
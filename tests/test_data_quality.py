@@ -0,0 +1,82 @@
+"""Data quality report: out-of-range values and per-team outliers"""
+
+import numpy as np
+
+from data_quality import DataQualityMonitor, quality_report, robust_z_scores
+from reload_pipeline import ReloadPipeline
+from conftest import CONFIG, MemoryRepository, match_row
+
+
+def build(rows):
+    return ReloadPipeline(MemoryRepository(rows), lambda: CONFIG).reload()
+
+
+def steady_team(team, matches=6, **values):
+    """A team scoring the same every match, except where values gives {match: {column: value}}"""
+    return [match_row(team, match, coral=2, **values.get(f"m{match}", {})) for match in range(1, matches + 1)]
+
+
+def test_out_of_range_values_are_counted_per_column():
+    rows = steady_team(31) + [
+        match_row(1209, 1, **{'Coral L1 (#)': -1}),
+        match_row(1209, 2, **{'Endgame Barge': 5}),
+        match_row(1209, 3, **{'Minor Fouls': 1})
+    ]
+    report = quality_report(build(rows), CONFIG)
+
+    assert report['columns']['Coral L1 (#)']['out_of_range'] == 1
+    assert report['columns']['Endgame Barge']['out_of_range'] == 1
+    assert report['columns']['Minor Fouls']['out_of_range'] == 0
+    assert report['summary']['out_of_range'] == 2
+    ranged = [(issue['team_number'], issue['column'], issue['value']) for issue in report['issues']
+              if issue['type'] == 'range']
+    assert sorted(ranged) == [(1209, 'Coral L1 (#)', -1), (1209, 'Endgame Barge', 5)]
+
+
+def test_configured_value_ranges_take_precedence():
+    config = dict(CONFIG, value_ranges={'Coral L4 (#)': [0, 12]})
+    rows = steady_team(31, m2={'Coral L4 (#)': 13})
+
+    report = quality_report(build(rows), config)
+    assert report['columns']['Coral L4 (#)']['out_of_range'] == 1
+
+
+def test_outliers_are_judged_against_the_team_own_matches():
+    # 2165 always scores 20 on L4, so 20 is only unusual for 31
+    rows = (steady_team(31, m4={'Coral L4 (#)': 20}) +
+            [match_row(2165, match, coral=2, **{'Coral L4 (#)': 20}) for match in range(1, 7)])
+    report = quality_report(build(rows), CONFIG)
+
+    assert report['columns']['Coral L4 (#)']['outliers'] == 1
+    outliers = [issue for issue in report['issues'] if issue['type'] == 'outlier' and issue['column'] == 'Coral L4 (#)']
+    assert [(issue['team_number'], issue['match_number'], issue['value']) for issue in outliers] == [(31, 4, 20)]
+    assert report['teams'] == {'31': 1}
+
+
+def test_teams_with_few_matches_and_constant_teams_are_not_flagged():
+    rows = steady_team(31, matches=3, m1={'Coral L4 (#)': 40}) + steady_team(1209)
+    report = quality_report(build(rows), CONFIG)
+
+    assert report['summary']['outliers'] == 0
+    assert report['summary']['rows_flagged'] == 0
+
+
+def test_robust_z_scores_per_group():
+    codes = np.array([0, 0, 0, 0, 0, 1, 1, -1])
+    values = np.array([1.0, 2.0, 2.0, 3.0, 30.0, 5.0, 5.0, 99.0])
+    z, counts = robust_z_scores(codes, values)
+
+    assert counts.tolist() == [5, 5, 5, 5, 5, 2, 2, 0]
+    assert z[4] > 3.5 and abs(z[1]) < 1e-9
+    assert z[5] == 0 and np.isnan(z[7])
+
+
+def test_monitor_checks_each_generation_once(rows):
+    monitor = DataQualityMonitor(lambda: CONFIG)
+    dataset = build(rows)
+
+    assert monitor.cached(dataset) is None
+    report = monitor.report(dataset)
+    assert monitor.report(dataset) is report
+    assert monitor.cached(dataset) is report
+    assert monitor.check_count == 1
@@ -0,0 +1,133 @@
+"""Other data sources: a folder of workbooks and a peer server, merged with the main workbook"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from data_sources import DataSources, FolderSource, PeerSource, PEER_SECRET_HEADER
+from reload_pipeline import ReloadPipeline
+from sheet_reader import match_columns
+from conftest import CONFIG, MemoryRepository, match_row, write_workbook
+
+SECRET = 's3cret'
+
+
+def folder_source(folder):
+    return FolderSource('laptops', str(folder), lambda: match_columns(CONFIG), lambda: CONFIG)
+
+
+def test_folder_reads_each_workbook_once(tmp_path):
+    write_workbook(str(tmp_path / 'laptop1.xlsx'), [match_row(31, 3), match_row(1209, 3)])
+    write_workbook(str(tmp_path / 'laptop2.xlsx'), [match_row(2165, 3)])
+    (tmp_path / 'notes.txt').write_text('not a workbook')
+    source = folder_source(tmp_path)
+
+    assert source.fetch() == 'changed'
+    assert len(source.frame) == 3
+    assert source.fetch() == 'unchanged'
+
+    write_workbook(str(tmp_path / 'laptop3.xlsx'), [match_row(3247, 3)])
+    (tmp_path / 'broken.xlsx').write_bytes(b'half-copied')
+    assert source.fetch() == 'changed'
+    assert len(source.frame) == 4
+    assert list(source.describe()['file_errors']) == ['broken.xlsx']
+
+
+def test_folder_rows_are_merged_with_the_workbook(rows, tmp_path):
+    write_workbook(str(tmp_path / 'laptop1.xlsx'), [match_row(31, 3, coral=4), match_row(77, 3)])
+    # Already in the workbook: dropped as an exact duplicate
+    write_workbook(str(tmp_path / 'laptop2.xlsx'), [rows[0]])
+    sources = DataSources([folder_source(tmp_path)])
+    sources.refresh()
+
+    dataset = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG, sources=sources).reload()
+    assert len(dataset.frame) == len(rows) + 2
+    assert len(dataset.team_rows(31)) == 3
+    assert dataset.tables['match_counts']['77'] == 1
+
+
+class PeerHandler(BaseHTTPRequestHandler):
+    """/export_rows of a peer that requires the shared secret, with ETag revalidation"""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if self.path != '/export_rows':
+            self.send_error(404)
+        elif self.headers.get(PEER_SECRET_HEADER) != SECRET:
+            self.send_error(403)
+        elif self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.end_headers()
+        else:
+            body = json.dumps({'data_version': server.data_version, 'columns': list(server.rows[0]),
+                               'rows': server.rows}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('ETag', server.etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def peer():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PeerHandler)
+    server.requests = []
+    server.rows = [match_row(4522, 3), match_row(10626, 3)]
+    server.etag = '"rows-1"'
+    server.data_version = 1
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_peer_revalidates_with_its_etag(peer):
+    source = PeerSource('pits', f"http://127.0.0.1:{peer.server_address[1]}/", secret=SECRET)
+
+    assert source.fetch() == 'changed'
+    assert source.frame['Team Number'].tolist() == [4522, 10626]
+    assert source.fetch() == 'unchanged'
+    assert peer.requests[-1]['If-None-Match'] == '"rows-1"'
+
+    peer.rows = peer.rows + [match_row(31, 4)]
+    peer.etag = '"rows-2"'
+    assert source.fetch() == 'changed'
+    assert len(source.frame) == 3
+    assert source.digest == 'pits-"rows-2"'
+
+
+def test_peer_without_the_secret_keeps_its_rows(peer):
+    url = f"http://127.0.0.1:{peer.server_address[1]}"
+    source = PeerSource('pits', url, secret=SECRET)
+    source.fetch()
+    source.session.headers[PEER_SECRET_HEADER] = 'wrong'
+    source.etag = None
+
+    assert source.fetch() == 'error'
+    assert 'peer_secret' in source.last_error
+    assert len(source.frame) == 2
+    assert PeerSource('other', url).fetch() == 'error'
+
+
+def test_peer_and_folder_rows_are_merged(rows, peer, tmp_path):
+    write_workbook(str(tmp_path / 'laptop1.xlsx'), [match_row(77, 3)])
+    sources = DataSources([folder_source(tmp_path),
+                           PeerSource('pits', f"http://127.0.0.1:{peer.server_address[1]}", secret=SECRET)])
+    assert sources.refresh() == {'laptops': 'changed', 'pits': 'changed'}
+
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG, sources=sources)
+    dataset = pipeline.reload()
+    assert len(dataset.frame) == len(rows) + 3
+    assert {77, 4522, 10626} <= set(dataset.aggregates.team_numbers())
+
+    # Nothing changed anywhere: the same generation is kept
+    assert sources.refresh() == {'laptops': 'unchanged', 'pits': 'unchanged'}
+    assert pipeline.reload() is dataset
@@ -0,0 +1,140 @@
+"""Data versions and the ChangeLog behind /changes"""
+
+import os
+import time
+
+from reload_pipeline import ReloadPipeline
+from dataset_changes import DELTA_TABLES, ChangeLog
+from event_partitions import EventPartitions
+from sheet_reader import match_columns
+from conftest import CONFIG, MemoryRepository, match_row, write_workbook
+
+
+def test_data_versions_increase(rows):
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG)
+    first = pipeline.reload()
+    pipeline.repository.append_rows([match_row(31, 3)])
+    second = pipeline.reload()
+    assert second.data_version > first.data_version
+
+
+def test_changes_since_a_known_version_list_only_what_changed(rows):
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG)
+    first = pipeline.reload()
+    pipeline.repository.append_rows([match_row(2165, 3, coral=6)])
+    second = pipeline.reload()
+
+    changes = pipeline.changes.changes(first.data_version)
+    assert changes['version'] == second.data_version
+    assert not changes['full']
+    assert changes['teams'] == ['2165']
+    assert changes['matches'] == [3]
+    assert changes['rows_added'] == 1
+    assert changes['rows_removed'] == 0
+    for name in DELTA_TABLES:
+        assert set(changes['tables'].get(name, {})) <= {'2165'}
+    assert changes['tables']['match_counts'] == {'2165': 3}
+
+
+def test_removed_rows_and_teams_are_reported(rows):
+    pipeline = ReloadPipeline(MemoryRepository(rows + [match_row(9999, 3)]), lambda: CONFIG)
+    first = pipeline.reload()
+    pipeline.repository.set_rows(rows)
+    pipeline.reload()
+
+    changes = pipeline.changes.changes(first.data_version)
+    assert changes['rows_removed'] == 1
+    assert changes['removed']['match_counts'] == ['9999']
+    assert '9999' in changes['teams']
+
+
+def test_unknown_version_gets_every_table(rows):
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG)
+    dataset = pipeline.reload()
+
+    changes = pipeline.changes.changes(12345)
+    assert changes['full']
+    assert set(changes['tables']['match_counts']) == {str(team) for team in dataset.tables['match_counts']}
+
+
+def test_current_version_has_no_changes(rows):
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG)
+    dataset = pipeline.reload()
+
+    changes = pipeline.changes.changes(dataset.data_version)
+    assert not changes['full']
+    assert changes['tables'] == {}
+    assert changes['rows_added'] == 0
+
+
+def test_old_versions_expire(rows):
+    log = ChangeLog(max_versions=2)
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG)
+    versions = []
+    for match in (3, 4, 5):
+        pipeline.repository.append_rows([match_row(31, match)])
+        dataset = pipeline.reload()
+        log.record(dataset)
+        versions.append(dataset.data_version)
+
+    assert log.changes(versions[0])['full']
+    assert not log.changes(versions[1])['full']
+    assert ChangeLog().changes(None) is None
+
+
+def partitions(tmp_path):
+    """Event OKTU on two days, scanned once"""
+    days = tmp_path / 'Days'
+    if not days.exists():
+        days.mkdir()
+        write_workbook(str(days / 'ThursdayOKTU.xlsx'), [match_row(31, 1), match_row(1209, 1)])
+        write_workbook(str(days / 'FridayOKTU.xlsx'), [match_row(31, 5), match_row(2165, 5)])
+    store = EventPartitions(str(tmp_path), ['Days'], lambda: match_columns(CONFIG), lambda: CONFIG, workers=1)
+    store.scan()
+    return store
+
+
+def test_partition_versions_are_unique_across_selections(tmp_path):
+    store = partitions(tmp_path)
+    thursday = store.select('oktu', 'thursday')
+    friday = store.select('oktu', 'friday')
+
+    # Milliseconds, like the live workbook's versions
+    assert thursday.data_version > 10 ** 12
+    assert friday.data_version > thursday.data_version
+    # A version issued for Friday means nothing for Thursday
+    assert store.changes('oktu', 'thursday', friday.data_version)['full']
+    assert not store.changes('oktu', 'thursday', thursday.data_version)['full']
+
+
+def test_partition_changes_since_an_earlier_version(tmp_path):
+    store = partitions(tmp_path)
+    before = store.select('oktu', 'thursday')
+    path = str(tmp_path / 'Days' / 'ThursdayOKTU.xlsx')
+    write_workbook(path, [match_row(31, 1), match_row(1209, 1), match_row(3247, 2)])
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    store.scan()
+
+    changes = store.changes('oktu', 'thursday', before.data_version)
+    assert changes['version'] > before.data_version
+    assert not changes['full']
+    assert changes['teams'] == ['3247']
+    assert changes['matches'] == [2]
+
+
+def test_filters_sharing_a_dataset_each_record_it(tmp_path):
+    store = partitions(tmp_path)
+    dataset = store.select('oktu')
+
+    # 'all' matches the same partitions and is served the same dataset
+    assert store.select('all') is dataset
+    assert not store.changes('all', None, dataset.data_version)['full']
+
+
+def test_versions_from_before_a_restart_get_every_table(tmp_path):
+    before = partitions(tmp_path).select('oktu', 'thursday')
+    restarted = partitions(tmp_path)
+    after = restarted.select('oktu', 'thursday')
+
+    assert after.data_version > before.data_version
+    assert restarted.changes('oktu', 'thursday', before.data_version)['full']
@@ -0,0 +1,68 @@
+"""Derived tables saved as .npz: reused after a restart, rebuilt when the configuration changes"""
+
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+
+from derived_cache import DerivedTableCache, cache_key
+from derived_tables import DerivedTableError
+from reload_pipeline import ReloadPipeline
+from conftest import CONFIG, MemoryRepository
+
+
+def test_restart_loads_the_saved_tables(rows, tmp_path):
+    repository = MemoryRepository(rows)
+    cache = DerivedTableCache(str(tmp_path))
+    built = ReloadPipeline(repository, lambda: CONFIG, derived_cache=cache).reload()
+    assert cache.saves == 1
+
+    restarted = ReloadPipeline(repository, lambda: CONFIG, derived_cache=DerivedTableCache(str(tmp_path)))
+    loaded = restarted.reload()
+
+    assert restarted.cached_load_count == 1
+    assert restarted.full_rebuild_count == 0
+    assert loaded.tables == built.tables
+    assert loaded.scores.index.equals(built.scores.index)
+    assert np.allclose(loaded.scores.to_numpy(), built.scores.to_numpy())
+    assert loaded.aggregates.averages() == built.aggregates.averages()
+    assert loaded.team_summary(31, CONFIG['include_columns']) == built.team_summary(31, CONFIG['include_columns'])
+
+
+def test_config_change_misses_the_cache(rows, tmp_path):
+    repository = MemoryRepository(rows)
+    ReloadPipeline(repository, lambda: CONFIG, derived_cache=DerivedTableCache(str(tmp_path))).reload()
+
+    rescored = copy.deepcopy(CONFIG)
+    rescored['scoring_rules']['Coral L4 (#)'] = 7
+    pipeline = ReloadPipeline(repository, lambda: rescored, derived_cache=DerivedTableCache(str(tmp_path)))
+    dataset = pipeline.reload()
+
+    assert pipeline.cached_load_count == 0
+    assert pipeline.full_rebuild_count == 1
+    fresh = ReloadPipeline(MemoryRepository(rows), lambda: rescored).reload()
+    assert dataset.tables == fresh.tables
+    # Both configurations now have their own entry
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.derived.npz')]) == 2
+
+
+def test_round_trip_keeps_integer_keys_and_errors(tmp_path):
+    cache = DerivedTableCache(str(tmp_path))
+    key = cache_key('a' * 64, 'signature', np.arange(3, dtype=np.uint64))
+    tables = {'rankings': {254: 30.0, 31: 12.5}, 'teams': [31, 254],
+              'defense': DerivedTableError('No defense column', 400)}
+    scores = pd.Series([1.0, 2.0, 3.0], name='Score')
+    assert cache.save(key, scores, DerivedTableError('No team column', 400), tables)
+
+    loaded_scores, aggregates, loaded = cache.load(key, pd.RangeIndex(3))
+    assert loaded_scores.tolist() == [1.0, 2.0, 3.0]
+    assert isinstance(aggregates, DerivedTableError) and aggregates.status == 400
+    assert list(loaded['rankings'].items()) == [(254, 30.0), (31, 12.5)]
+    assert loaded['teams'] == [31, 254]
+    assert loaded['defense'].message == 'No defense column'
+
+    # A frame of another length is a miss, not a misaligned load
+    assert cache.load(key, pd.RangeIndex(4)) is None
+    assert cache.load('missing', pd.RangeIndex(3)) is None
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,70 @@
+"""Append detection and incremental per-team aggregates in the reload pipeline"""
+
+import numpy as np
+
+from reload_pipeline import ReloadPipeline
+from conftest import CONFIG, MemoryRepository, match_row
+
+
+def build(rows):
+    """A pipeline that loaded the given rows from scratch"""
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG)
+    return pipeline, pipeline.reload()
+
+
+def test_appended_rows_are_folded_into_the_aggregates(rows):
+    pipeline, first = build(rows)
+    pipeline.repository.append_rows([match_row(31, 3, coral=4), match_row(77, 3, coral=2)])
+    appended = pipeline.reload()
+
+    assert pipeline.full_rebuild_count == 1
+    assert pipeline.incremental_count == 1
+    assert appended.generation == first.generation + 1
+    assert len(appended.frame) == len(rows) + 2
+
+    # Same result as loading the final workbook from scratch
+    _, fresh = build(pipeline.repository.rows)
+    assert appended.tables == fresh.tables
+    assert np.allclose(appended.scores.to_numpy(), fresh.scores.to_numpy())
+    assert appended.aggregates.averages() == fresh.aggregates.averages()
+
+
+def test_edited_row_triggers_a_full_rebuild(rows):
+    pipeline, _ = build(rows)
+    edited = [dict(row) for row in rows]
+    edited[0]['Coral L4 (#)'] = 9
+    pipeline.repository.set_rows(edited)
+    dataset = pipeline.reload()
+
+    assert pipeline.incremental_count == 0
+    assert pipeline.full_rebuild_count == 2
+    assert dataset.tables == build(edited)[1].tables
+
+
+def test_removed_rows_are_not_an_append(rows):
+    pipeline, _ = build(rows)
+    pipeline.repository.set_rows(rows[:-1])
+    dataset = pipeline.reload()
+
+    assert pipeline.incremental_count == 0
+    assert len(dataset.frame) == len(rows) - 1
+
+
+def test_unchanged_workbook_keeps_the_generation(rows):
+    pipeline, first = build(rows)
+    assert pipeline.reload() is first
+    assert pipeline.full_rebuild_count == 1
+
+
+def test_is_append_requires_the_same_leading_rows(rows):
+    pipeline, current = build(rows)
+    hashes = current.row_hashes
+    more = np.append(hashes, np.uint64(12345))
+    changed = more.copy()
+    changed[0] ^= np.uint64(1)
+
+    assert ReloadPipeline._is_append(current, current.frame, more, current.config_signature)
+    assert not ReloadPipeline._is_append(current, current.frame, changed, current.config_signature)
+    assert not ReloadPipeline._is_append(current, current.frame, hashes[:-1], current.config_signature)
+    assert not ReloadPipeline._is_append(current, current.frame, more, 'other-config')
+    assert not ReloadPipeline._is_append(None, current.frame, more, current.config_signature)
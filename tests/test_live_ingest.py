@@ -0,0 +1,114 @@
+"""Validating ingested rows, the ingest journal and replaying it into the pipeline"""
+
+from live_ingest import IngestJournal, validate_rows
+from reload_pipeline import ReloadPipeline
+from conftest import CONFIG, MemoryRepository, match_row
+
+
+def test_validate_rows_maps_aliases_and_rejects_bad_rows(config):
+    good = match_row(31, 7)
+    aliased = dict(match_row(1209, 7), Team=1209)
+    del aliased['Team Number']
+    bad_team = match_row(-5, 7)
+    missing = match_row(2165, 7)
+    missing['Coral L4 (#)'] = ''
+    not_a_number = dict(match_row(3247, 7), **{'Coral L1 (#)': 'lots'})
+
+    valid, rejected, ignored = validate_rows([good, dict(aliased, Bogus=1), bad_team, missing, not_a_number], config)
+
+    assert [row['Team Number'] for row in valid] == [31, 1209]
+    assert ignored == ['Bogus']
+    assert [item['row'] for item in rejected] == [2, 3, 4]
+    assert 'Team Number must be a positive number' in rejected[0]['error']
+    assert 'Coral L4 (#)' in rejected[1]['error']
+    assert "'Coral L1 (#)' is not a number" in rejected[2]['error']
+
+
+def test_journal_replays_after_a_restart(tmp_path):
+    path = str(tmp_path / 'ingest_journal.jsonl')
+    journal = IngestJournal(path)
+    journal.append([match_row(31, 7)], source='phone')
+    journal.append([match_row(1209, 7), match_row(2165, 7)], event='oktu')
+
+    # A crash in the middle of a write leaves a partial last line, which is skipped
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"batch": "partial", "row": {"Team')
+
+    restarted = IngestJournal(path)
+    records = restarted.load()
+    assert [record['Team Number'] for record in records] == [31, 1209, 2165]
+    assert restarted.row_count == 3
+
+
+def test_journal_clear_by_event(tmp_path):
+    journal = IngestJournal(str(tmp_path / 'ingest_journal.jsonl'))
+    journal.append([match_row(31, 7)], event='OKTU')
+    journal.append([match_row(1209, 7)], event='txhou')
+
+    remaining = journal.clear('oktu')
+    assert [record['Team Number'] for record in remaining] == [1209]
+    assert journal.clear() == []
+    assert journal.load() == []
+
+
+def test_live_rows_are_appended_to_the_dataset(tmp_path, rows):
+    journal = IngestJournal(str(tmp_path / 'ingest_journal.jsonl'))
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG, journal=journal)
+    first = pipeline.reload()
+
+    live = [match_row(31, 3, coral=4)]
+    journal.append(live)
+    pipeline.add_live_rows(live)
+    dataset = pipeline.reload()
+
+    assert len(dataset.frame) == len(rows) + 1
+    assert pipeline.incremental_count == 1
+    assert pipeline.published_live_rows == 1
+    assert dataset.data_version > first.data_version
+
+
+def test_replayed_journal_rows_survive_a_restart(tmp_path, rows):
+    path = str(tmp_path / 'ingest_journal.jsonl')
+    IngestJournal(path).append([match_row(31, 3), match_row(1209, 3)])
+
+    journal = IngestJournal(path)
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG, journal=journal)
+    pipeline.live_records = journal.load()
+    dataset = pipeline.reload()
+
+    assert len(dataset.frame) == len(rows) + 2
+    assert dataset.tables['match_counts']['31'] == 3
+
+
+def test_rows_that_reach_the_workbook_are_compacted(tmp_path, rows):
+    journal = IngestJournal(str(tmp_path / 'ingest_journal.jsonl'))
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG, journal=journal)
+    pipeline.reload()
+    uploaded, pending = match_row(31, 3), match_row(1209, 3)
+    journal.append([uploaded, pending])
+    pipeline.add_live_rows([uploaded, pending])
+    pipeline.reload()
+
+    # The scanner's workbook now contains one of the live rows
+    pipeline.repository.append_rows([uploaded])
+    dataset = pipeline.reload()
+
+    assert len(dataset.frame) == len(rows) + 2
+    assert [record['Team Number'] for record in journal.load()] == [1209]
+    assert journal.compacted_rows == 1
+    assert pipeline.live_records == [pending]
+
+
+def test_clear_live_rows_removes_them_from_the_dataset(tmp_path, rows):
+    journal = IngestJournal(str(tmp_path / 'ingest_journal.jsonl'))
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG, journal=journal)
+    pipeline.reload()
+    journal.append([match_row(31, 3)], event='oktu')
+    journal.append([match_row(1209, 3)], event='txhou')
+    pipeline.add_live_rows([match_row(31, 3), match_row(1209, 3)])
+    pipeline.reload()
+
+    assert pipeline.clear_live_rows('OKTU') == 1
+    dataset = pipeline.reload()
+    assert len(dataset.frame) == len(rows) + 1
+    assert dataset.tables['match_counts']['31'] == 2
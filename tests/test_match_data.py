@@ -0,0 +1,54 @@
+"""The shared match-data repository: one parse per workbook version"""
+
+import os
+
+import pytest
+
+from match_data import MatchDataRepository
+from conftest import match_row, write_workbook
+
+
+@pytest.fixture
+def workbook(tmp_path, rows):
+    return write_workbook(str(tmp_path / 'qr_codes.xlsx'), rows)
+
+
+def test_frame_is_parsed_once_and_shared(workbook, rows):
+    repository = MatchDataRepository(workbook)
+    frame = repository.get_frame()
+
+    assert len(frame) == len(rows)
+    assert repository.get_frame() is frame
+    assert repository.parse_count == 1
+
+
+def test_touched_workbook_with_the_same_content_is_not_parsed_again(workbook):
+    repository = MatchDataRepository(workbook)
+    frame = repository.get_frame()
+    stat = os.stat(workbook)
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert repository.get_frame() is frame
+    assert repository.parse_count == 1
+    assert repository.get_version().mtime == os.stat(workbook).st_mtime
+
+
+def test_changed_workbook_is_parsed_again(workbook, rows):
+    repository = MatchDataRepository(workbook)
+    repository.get_frame()
+    first = repository.get_version()
+    write_workbook(workbook, rows + [match_row(31, 3)])
+
+    assert len(repository.get_frame()) == len(rows) + 1
+    assert repository.parse_count == 2
+    assert repository.get_version().digest != first.digest
+
+
+def test_only_requested_columns_are_loaded(workbook):
+    repository = MatchDataRepository(workbook, columns=lambda: {'Team Number', 'Match Number'})
+    assert set(repository.get_frame().columns) == {'Team Number', 'Match Number'}
+
+
+def test_missing_workbook_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        MatchDataRepository(str(tmp_path / 'missing.xlsx')).get_frame()
@@ -0,0 +1,76 @@
+"""SQLite storage engine: the SQL aggregates must match the pandas ones"""
+
+import numpy as np
+import pytest
+
+from match_store import SQLiteMatchStore, StoreAggregates
+from reload_pipeline import ReloadPipeline
+from conftest import CONFIG, MemoryRepository, match_row
+
+COLUMNS = CONFIG['include_columns']
+
+
+@pytest.fixture
+def scouted(rows):
+    """Uneven counts, a missing cell and a team scouted once, so averages are not trivially equal"""
+    return rows + [
+        match_row(31, 3, coral=4, **{'Endgame Barge': 3}),
+        match_row(1209, 3, coral=0, **{'Algae Net (#)': None}),
+        match_row(77, 3, coral=2, **{'Leave Bonus (T/F)': False})
+    ]
+
+
+def load(rows, tmp_path):
+    """The same rows through the in-memory and SQLite engines"""
+    memory = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG).reload()
+    store = SQLiteMatchStore(str(tmp_path / 'matches.db'))
+    stored = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG, store=store).reload()
+    return memory, stored
+
+
+def test_sql_tables_match_the_pandas_tables(scouted, tmp_path):
+    memory, stored = load(scouted, tmp_path)
+
+    assert isinstance(stored.aggregates, StoreAggregates)
+    assert stored.aggregates.team_numbers() == memory.aggregates.team_numbers()
+    assert stored.aggregates.match_counts() == memory.aggregates.match_counts()
+    assert stored.aggregates.rankings() == pytest.approx(memory.aggregates.rankings())
+
+    sql_averages = stored.aggregates.averages()
+    pandas_averages = memory.aggregates.averages()
+    assert sql_averages.keys() == pandas_averages.keys()
+    for team, averages in pandas_averages.items():
+        assert sql_averages[team] == pytest.approx(averages), team
+
+
+def test_team_summary_matches_the_team_rows(scouted, tmp_path):
+    memory, stored = load(scouted, tmp_path)
+
+    for team in (31, 1209, 77):
+        rows = memory.team_rows(team)
+        expected = {col: rows[col].max() if col == 'Endgame Barge' else rows[col].mean() for col in COLUMNS}
+        assert stored.team_summary(team, COLUMNS) == pytest.approx(expected), team
+    assert stored.team_summary(9999, COLUMNS) is None
+
+
+def test_stored_rows_match_the_frame_rows(scouted, tmp_path):
+    memory, stored = load(scouted, tmp_path)
+
+    rows = stored.aggregates.stored_rows('Team Number', 1209)
+    expected = memory.team_rows(1209)
+    assert rows.index.tolist() == expected.index.tolist()
+    assert np.isnan(rows['Algae Net (#)'].iloc[-1])
+    assert rows[COLUMNS].fillna(-1).to_numpy().tolist() == expected[COLUMNS].fillna(-1).to_numpy().tolist()
+
+
+def test_aggregates_fall_back_once_the_store_moves_on(scouted, tmp_path):
+    store = SQLiteMatchStore(str(tmp_path / 'matches.db'))
+    pipeline = ReloadPipeline(MemoryRepository(scouted), lambda: CONFIG, store=store)
+    first = pipeline.reload()
+    pipeline.repository.set_rows(scouted[1:])
+    pipeline.reload()
+
+    assert not first.aggregates.is_current()
+    assert first.aggregates.stored_rows('Team Number', 31) is None
+    # The old generation still answers from its own frame
+    assert len(first.team_rows(31)) == 3
@@ -0,0 +1,65 @@
+"""Adaptive refresh interval: backoff, speed-up and manual triggers"""
+
+import time
+import threading
+
+import pytest
+
+from refresh_scheduler import RefreshScheduler
+
+
+def test_unchanged_and_failed_checks_back_off_to_the_maximum():
+    scheduler = RefreshScheduler(60, min_interval=30, max_interval=300)
+
+    assert scheduler.record('unchanged') == 90
+    assert scheduler.record('unchanged') == 135
+    assert scheduler.record('error') == 270
+    assert scheduler.record('error') == 300
+    assert scheduler.record('unchanged') == 300
+    assert scheduler.status()['streak'] == 1
+    assert scheduler.status()['last_outcome'] == 'unchanged'
+
+
+def test_change_after_a_quiet_period_restarts_from_half_the_base():
+    scheduler = RefreshScheduler(60, min_interval=20, max_interval=900)
+    for _ in range(5):
+        scheduler.record('unchanged')
+
+    assert scheduler.record('changed') == 30
+    assert scheduler.record('changed') == 20
+    assert scheduler.record('changed') == 20
+    assert scheduler.status()['streak'] == 3
+    assert scheduler.last_change is not None
+
+
+def test_base_interval_is_read_on_every_check_and_clamped():
+    base = {'seconds': 120}
+    scheduler = RefreshScheduler(lambda: base['seconds'], min_interval=30, max_interval=600)
+    assert scheduler.status()['interval_seconds'] == 120
+
+    base['seconds'] = 5
+    assert scheduler.status()['base_interval_seconds'] == 30
+    base['seconds'] = 10000
+    assert scheduler.record('changed') == 300
+
+
+def test_trigger_cuts_the_wait_short():
+    scheduler = RefreshScheduler(600, jitter=0)
+    threading.Timer(0.05, scheduler.trigger).start()
+
+    start = time.monotonic()
+    assert scheduler.wait() is True
+    assert time.monotonic() - start < 5
+    assert scheduler.status()['manual_triggers'] == 1
+    assert scheduler.status()['next_check_in_seconds'] == pytest.approx(600, abs=5)
+
+
+def test_trigger_during_a_check_is_kept_for_the_next_wait():
+    scheduler = RefreshScheduler(600, jitter=0)
+    # Requested while the downloader is busy, before it starts waiting
+    scheduler.trigger()
+
+    assert scheduler.wait() is True
+    # Consumed: the following wait times out normally
+    scheduler.interval = 0.05
+    assert scheduler.wait() is False
@@ -0,0 +1,94 @@
+"""Exact duplicate removal and the duplicate_policy settings"""
+
+import numpy as np
+import pytest
+
+from row_dedup import DEFAULT_POLICY, content_hashes, dedup_frame, has_conflicts
+from conftest import canonical, match_row
+
+
+@pytest.fixture
+def reports():
+    """Team 31 in match 1 scouted by Alex and Bev, plus an exact duplicate of another report"""
+    return [
+        match_row(31, 1, scouter='Alex', coral=2),
+        match_row(1209, 1, scouter='Cam'),
+        match_row(31, 1, scouter='Bev', coral=5),
+        match_row(1209, 1, scouter='Cam'),
+        match_row(2165, 1, scouter='Dee')
+    ]
+
+
+def dedup(rows, config, policy=None, **settings):
+    if policy is not None:
+        config = dict(config, duplicate_policy=policy, **settings)
+    return dedup_frame(canonical(rows), config)
+
+
+def test_default_policy_keeps_every_report(reports, config):
+    assert DEFAULT_POLICY == 'keep'
+    frame, report = dedup(reports, config)
+    assert report['policy'] == 'keep'
+    assert report['exact_duplicates'] == 1
+    assert report['conflicts'] == 0
+    assert list(frame['Scouter Name'].astype(str)) == ['Alex', 'Cam', 'Bev', 'Dee']
+
+
+@pytest.mark.parametrize('policy', ['keep', 'latest', 'preferred', 'mean'])
+def test_exact_duplicates_are_dropped_under_every_policy(reports, config, policy):
+    frame, report = dedup(reports, config, policy)
+    assert report['exact_duplicates'] == 1
+    assert int((frame['Team Number'] == 1209).sum()) == 1
+
+
+def test_latest_keeps_the_last_report_in_place_of_the_first(reports, config):
+    frame, report = dedup(reports, config, 'latest')
+    assert report['conflicts'] == 1
+    assert report['merged_rows'] == 2
+    assert list(frame['Team Number']) == [31, 1209, 2165]
+    assert frame['Scouter Name'].astype(str).iloc[0] == 'Bev'
+    assert report['conflict_examples'] == [{'team_number': 31, 'match_number': 1, 'reports': 2,
+                                            'scouters': ['Alex', 'Bev']}]
+
+
+def test_preferred_keeps_the_preferred_scouter(reports, config):
+    frame, _ = dedup(reports, config, 'preferred', preferred_scouters=['Alex'])
+    assert frame['Scouter Name'].astype(str).iloc[0] == 'Alex'
+    assert frame['Coral L1 (#)'].iloc[0] == 2
+
+
+def test_mean_averages_numeric_columns(reports, config):
+    frame, _ = dedup(reports, config, 'mean')
+    merged = frame.iloc[0]
+    assert merged['Coral L1 (#)'] == pytest.approx(3.5)
+    assert merged['Scouter Name'] == 'Alex'
+    assert merged['Team Number'] == 31
+    # Whole-number averages go back to compact integer dtypes
+    assert frame['Endgame Barge'].dtype.kind in 'iu'
+    assert frame['Coral L1 (#)'].dtype == np.float64
+
+
+def test_unknown_policy_falls_back_to_the_default(reports, config):
+    _, report = dedup(reports, config, 'bogus')
+    assert report['policy'] == DEFAULT_POLICY
+
+
+def test_rows_missing_a_key_never_conflict(config):
+    rows = [match_row(31, 1, scouter='Alex', coral=1), match_row(31, None, scouter='Bev', coral=2),
+            match_row(31, None, scouter='Cam', coral=3)]
+    frame, report = dedup(rows, config, 'latest')
+    assert report['conflicts'] == 0
+    assert len(frame) == 3
+
+
+def test_has_conflicts(reports, config):
+    frame, _ = dedup(reports, config, 'latest')
+    assert has_conflicts(frame, canonical([match_row(31, 1, scouter='Eve')]))
+    assert not has_conflicts(frame, canonical([match_row(31, 2, scouter='Eve')]))
+    assert has_conflicts(frame, canonical([match_row(31, 2, scouter='Eve'), match_row(31, 2, scouter='Fay')]))
+
+
+def test_content_hashes_ignore_dtypes():
+    narrow = canonical([match_row(31, 1, coral=2)])
+    wide = narrow.astype({'Coral L1 (#)': np.float64, 'Team Number': np.int64})
+    assert np.array_equal(content_hashes(narrow), content_hashes(wide))
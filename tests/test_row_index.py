@@ -0,0 +1,60 @@
+"""Team and match row indexes, and the JSON rows /get_match and /get_match_data send"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from row_index import RowIndex
+from derived_tables import json_records
+from reload_pipeline import ReloadPipeline
+from conftest import CONFIG, MemoryRepository, match_row
+
+
+def test_each_key_owns_its_rows_in_sheet_order():
+    index = RowIndex([31, 1209, 31, np.nan, 2165, 31])
+
+    assert index.positions(31).tolist() == [0, 2, 5]
+    assert index.positions(1209).tolist() == [1]
+    assert index.keys() == [31.0, 1209.0, 2165.0]
+    assert len(index) == 3
+
+
+def test_int_key_finds_float_keys_and_missing_keys_are_left_out():
+    index = RowIndex(pd.Series([254.0, np.nan, 254.0]))
+
+    assert index.positions(254).tolist() == [0, 2]
+    assert 254 in index
+    assert index.positions(9999).tolist() == []
+
+
+def test_nullable_keys_are_indexed():
+    index = RowIndex(pd.array([31, None, 31, 7], dtype='Int16'))
+
+    assert index.positions(31).tolist() == [0, 2]
+    assert index.positions(7).tolist() == [3]
+    assert len(index) == 2
+
+
+def test_dataset_slices_match_a_full_scan(rows):
+    dataset = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG).reload()
+    frame = dataset.frame
+
+    team_rows = dataset.team_rows(2165)
+    assert team_rows.index.tolist() == frame.index[frame['Team Number'] == 2165].tolist()
+    match_rows = dataset.match_rows(2)
+    assert match_rows.index.tolist() == frame.index[frame['Match Number'] == 2].tolist()
+    assert dataset.team_rows(9999).empty
+
+
+def test_match_rows_with_missing_cells_are_sent_as_null(rows):
+    blank = match_row(31, 3, **{'Coral L4 (#)': None})
+    keyless = match_row(None, 3)
+    dataset = ReloadPipeline(MemoryRepository(rows + [blank, keyless]), lambda: CONFIG).reload()
+
+    records = json_records(dataset.match_rows(3))
+    assert [record['Team Number'] for record in records] == [31, None]
+    assert records[0]['Coral L4 (#)'] is None
+    assert records[0]['Coral L1 (#)'] == 1
+    # Strict JSON: no NaN, and no value jsonify cannot encode
+    json.dumps(records, allow_nan=False)
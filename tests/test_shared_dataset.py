@@ -0,0 +1,85 @@
+"""Publishing dataset generations as memory-mapped files and attaching to them"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from reload_pipeline import ReloadPipeline
+from shared_dataset import POINTER_FILE, SHARED_FORMAT, SharedDatasetReader, SharedDatasetWriter, read_header
+from conftest import CONFIG, MemoryRepository, match_row
+
+
+def publish(tmp_path, rows):
+    writer = SharedDatasetWriter(str(tmp_path))
+    pipeline = ReloadPipeline(MemoryRepository(rows), lambda: CONFIG, shared=writer)
+    return pipeline, pipeline.reload()
+
+
+def test_attached_generation_matches_the_published_one(tmp_path, rows):
+    _, dataset = publish(tmp_path, rows)
+    attached = SharedDatasetReader(str(tmp_path)).current()
+
+    assert attached.data_version == dataset.data_version
+    assert attached.generation == dataset.generation
+    assert attached.frame.equals(dataset.frame)
+    assert list(attached.frame.dtypes) == list(dataset.frame.dtypes)
+    assert attached.scores.equals(dataset.scores)
+    assert np.array_equal(attached.row_hashes, dataset.row_hashes)
+    assert attached.tables == dataset.tables
+    assert attached.aggregates.averages() == dataset.aggregates.averages()
+    assert attached.team_rows(31).equals(dataset.team_rows(31))
+
+
+def test_numeric_columns_are_read_only_views_of_the_file(tmp_path, rows):
+    publish(tmp_path, rows)
+    attached = SharedDatasetReader(str(tmp_path)).current()
+
+    values = attached.frame['Coral L4 (#)'].to_numpy()
+    assert not values.flags.writeable
+    assert isinstance(attached.row_hashes, np.memmap) or isinstance(attached.row_hashes.base, np.memmap)
+
+
+def test_key_columns_with_missing_cells_round_trip(tmp_path, rows):
+    _, dataset = publish(tmp_path, rows + [match_row(None, 3), match_row(31, None)])
+    attached = SharedDatasetReader(str(tmp_path)).current()
+
+    for col in ('Team Number', 'Match Number'):
+        assert isinstance(dataset.frame[col].dtype, pd.Int16Dtype)
+        assert attached.frame[col].dtype == dataset.frame[col].dtype
+        assert attached.frame[col].isna().tolist() == dataset.frame[col].isna().tolist()
+        assert attached.frame[col].equals(dataset.frame[col])
+
+
+def test_header_and_pointer(tmp_path, rows):
+    _, dataset = publish(tmp_path, rows)
+    with open(os.path.join(str(tmp_path), POINTER_FILE), 'r', encoding='utf-8') as f:
+        pointer = json.load(f)
+
+    header = read_header(os.path.join(str(tmp_path), pointer['file']))
+    assert header['format'] == SHARED_FORMAT
+    assert header['data_version'] == pointer['data_version'] == dataset.data_version
+    assert header['generation'] == dataset.generation
+
+
+def test_reader_follows_new_generations(tmp_path, rows):
+    pipeline, first = publish(tmp_path, rows)
+    reader = SharedDatasetReader(str(tmp_path))
+    attached = reader.current()
+    assert reader.current() is attached
+    assert reader.attach_count == 1
+
+    pipeline.repository.append_rows([match_row(31, 3)])
+    second = pipeline.reload()
+    newer = reader.current()
+
+    assert newer.data_version == second.data_version
+    assert len(newer.frame) == len(rows) + 1
+    assert reader.attach_count == 2
+    # The old generation stays readable for requests still using it
+    assert float(attached.scores.sum()) == float(first.scores.sum())
+
+
+def test_nothing_published_yet(tmp_path):
+    assert SharedDatasetReader(str(tmp_path)).current() is None
@@ -0,0 +1,80 @@
+"""Workbook snapshots: row-level diffs from the stored row index, and restoring a snapshot"""
+
+import os
+
+import numpy as np
+
+from snapshot_store import SnapshotStore
+from sheet_reader import match_columns
+from conftest import CONFIG, match_row, write_workbook
+
+
+def make_store(tmp_path):
+    return SnapshotStore(str(tmp_path / 'snapshots'), columns=lambda: match_columns(CONFIG),
+                         config_provider=lambda: CONFIG)
+
+
+def two_versions(tmp_path, rows):
+    """Snapshot the rows, then a version with one row edited, one removed and one added"""
+    store = make_store(tmp_path)
+    old = store.add(write_workbook(str(tmp_path / 'old.xlsx'), rows))
+    edited = [dict(row) for row in rows[1:]]
+    edited[0]['Coral L4 (#)'] = 9
+    edited.append(match_row(77, 3, scouter='Sam'))
+    new = store.add(write_workbook(str(tmp_path / 'new.xlsx'), edited))
+    return store, old, new
+
+
+def test_diff_reports_added_removed_and_changed_rows(tmp_path, rows):
+    store, old, new = two_versions(tmp_path, rows)
+    diff = store.diff(old, new)
+
+    assert diff['unchanged'] == len(rows) - 2
+    assert diff['added'] == [{'Team Number': 77, 'Match Number': 3, 'Scouter Name': 'Sam'}]
+    assert diff['removed'] == [{'Team Number': 31, 'Match Number': 1, 'Scouter Name': 'Alex'}]
+    assert diff['changed'] == [{'Team Number': 1209, 'Match Number': 1, 'Scouter Name': 'Alex'}]
+    assert os.path.exists(store._index_path(old)) and os.path.exists(store._index_path(new))
+
+
+def test_stored_index_is_read_without_pickle(tmp_path, rows):
+    store, old, new = two_versions(tmp_path, rows)
+    first = store.diff(old, new)
+    with np.load(store._index_path(old), allow_pickle=False) as data:
+        assert data['key0'].dtype == np.int64
+        assert data['mask0'].dtype == bool
+
+    # The second diff is answered from the indexes alone: removing the workbooks proves no re-parse
+    for digest in (old, new):
+        os.remove(store._path(digest))
+    assert store.diff(old, new) == first
+
+
+def test_missing_keys_survive_the_index(tmp_path, rows):
+    store = make_store(tmp_path)
+    old = store.add(write_workbook(str(tmp_path / 'old.xlsx'), rows))
+    new = store.add(write_workbook(str(tmp_path / 'new.xlsx'), rows + [match_row(None, 3, scouter=None)]))
+    store.diff(old, new)
+
+    added = store.diff(old, new)['added']
+    assert added == [{'Team Number': None, 'Match Number': 3, 'Scouter Name': None}]
+
+
+def test_damaged_index_is_rebuilt(tmp_path, rows):
+    store, old, new = two_versions(tmp_path, rows)
+    expected = store.diff(old, new)
+    with open(store._index_path(new), 'wb') as file:
+        file.write(b'not an npz file')
+
+    assert store.diff(old, new) == expected
+
+
+def test_restore_copies_the_snapshot_back(tmp_path, rows):
+    store, old, new = two_versions(tmp_path, rows)
+    live = str(tmp_path / 'live.xlsx')
+    write_workbook(live, rows[:1])
+
+    assert store.restore(old, live)
+    with open(live, 'rb') as restored, open(store._path(old), 'rb') as snapshot:
+        assert restored.read() == snapshot.read()
+    assert not store.restore('0' * 64, live)
+    assert store.resolve(old[:10]) == old
@@ -0,0 +1,147 @@
+"""Conditional workbook downloads against the local OneDrive stand-in"""
+
+import os
+import sys
+
+import pytest
+import requests
+from openpyxl import Workbook
+
+from workbook_download import DownloadError, WorkbookDownloader, find_file_url
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'benchmarks'))
+from onedrive_standin import OneDriveStandIn
+
+
+def workbook_bytes(tmp_path, rows):
+    """An .xlsx file with a 'Match Data' sheet of the given number of rows"""
+    path = str(tmp_path / f"source_{rows}.xlsx")
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'Match Data'
+    sheet.append(['Scouter Name', 'Match Number', 'Team Number'])
+    for i in range(rows):
+        sheet.append(['Alex', i // 6 + 1, 1000 + i])
+    workbook.save(path)
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+@pytest.fixture
+def standin(request, tmp_path):
+    options = getattr(request, 'param', {})
+    server = OneDriveStandIn(workbook_bytes(tmp_path, 12), **options).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    return WorkbookDownloader(str(tmp_path / 'download_state.json'))
+
+
+@pytest.fixture
+def local_path(tmp_path):
+    return str(tmp_path / 'qr_codes.xlsx')
+
+
+def read(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def test_unchanged_workbook_is_not_downloaded_again(standin, downloader, local_path):
+    assert downloader.download(standin.share_url, local_path)
+    assert read(local_path) == standin.workbook
+    assert not downloader.download(standin.share_url, local_path)
+
+    stats = downloader.stats()
+    assert stats['downloaded'] == 1
+    assert stats['not_modified'] == 1
+    assert stats['url_resolves'] == 1
+    assert standin.stats()['share_pages'] == 1
+    assert standin.stats()['not_modified'] == 1
+
+
+def test_changed_workbook_is_downloaded(standin, downloader, local_path, tmp_path):
+    downloader.download(standin.share_url, local_path)
+    standin.set_workbook(workbook_bytes(tmp_path, 18))
+
+    assert downloader.download(standin.share_url, local_path)
+    assert read(local_path) == standin.workbook
+    assert downloader.stats()['downloaded'] == 2
+
+
+@pytest.mark.parametrize('standin', [{'etag': 'none', 'last_modified': False}], indirect=True)
+def test_same_content_without_validators_is_recognised_by_hash(standin, downloader, local_path):
+    downloader.download(standin.share_url, local_path)
+    stamp = os.stat(local_path).st_mtime_ns
+
+    assert not downloader.download(standin.share_url, local_path)
+    assert downloader.stats()['unchanged'] == 1
+    assert os.stat(local_path).st_mtime_ns == stamp
+
+
+def test_validators_survive_a_restart(standin, downloader, local_path, tmp_path):
+    downloader.download(standin.share_url, local_path)
+
+    restarted = WorkbookDownloader(str(tmp_path / 'download_state.json'))
+    assert not restarted.download(standin.share_url, local_path)
+    assert restarted.stats()['not_modified'] == 1
+
+
+def test_replaced_local_file_is_downloaded_unconditionally(standin, downloader, local_path):
+    downloader.download(standin.share_url, local_path)
+    with open(local_path, 'wb') as file:
+        file.write(b'restored from somewhere else')
+
+    assert downloader.download(standin.share_url, local_path)
+    assert read(local_path) == standin.workbook
+
+
+def test_truncated_download_keeps_the_local_file(standin, downloader, local_path, tmp_path):
+    downloader.download(standin.share_url, local_path)
+    previous = read(local_path)
+    standin.set_workbook(workbook_bytes(tmp_path, 18))
+    standin.options['truncate_next'] = 1
+
+    # Newer urllib3 versions notice the short body themselves; older ones leave it to the length check
+    with pytest.raises((DownloadError, requests.RequestException)):
+        downloader.download(standin.share_url, local_path)
+    assert read(local_path) == previous
+    assert downloader.stats()['last_result'] in ('rejected', 'error')
+    assert not [name for name in os.listdir(os.path.dirname(local_path)) if name.startswith('.download-')]
+
+    # The next check gets the complete workbook
+    assert downloader.download(standin.share_url, local_path)
+    assert read(local_path) == standin.workbook
+
+
+def test_body_that_is_not_a_workbook_is_rejected(standin, downloader, local_path):
+    standin.set_workbook(b'<html>Sign in to OneDrive</html>')
+
+    with pytest.raises(DownloadError):
+        downloader.download(standin.share_url, local_path)
+    assert not os.path.exists(local_path)
+
+
+@pytest.mark.parametrize('standin', [{'url_uses': 1}], indirect=True)
+def test_expired_file_url_is_resolved_again(standin, downloader, local_path, tmp_path):
+    downloader.download(standin.share_url, local_path)
+    standin.set_workbook(workbook_bytes(tmp_path, 18))
+
+    assert downloader.download(standin.share_url, local_path)
+    assert downloader.stats()['url_resolves'] == 2
+    assert standin.stats()['expired'] == 1
+
+
+def test_unreachable_share_link_counts_an_error(downloader, local_path):
+    with pytest.raises(requests.RequestException):
+        downloader.download('http://127.0.0.1:9/share', local_path)
+    assert downloader.stats()['last_result'] == 'error'
+
+
+def test_find_file_url_decodes_json_escapes():
+    page = '<script>var $Config={"FileGetUrl":"https:\\/\\/files.example\\/download?a=1\\u0026b=2"};</script>'
+    assert find_file_url(page) == 'https://files.example/download?a=1&b=2'
+    assert find_file_url('<html></html>') is None
@@ -0,0 +1,329 @@
+"""
+Conditional workbook downloads for HeroScout
+Fetches the scouting workbook only when it changed: each request carries the ETag and
+Last-Modified of the previous download, the body is streamed to a temporary file in chunks while
+it is hashed, checked against the announced length and opened as an .xlsx (zip) archive, and
+only then renamed into place. A download whose content hash matches the workbook on disk is
+dropped, so an unchanged workbook costs one small request and no re-parse.
+
+Requests share one pooled keep-alive session, and the file URL scraped from the OneDrive share
+page is reused until it expires or the file server rejects it, so a refresh is normally a single
+request on an open connection.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import zipfile
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from match_data import hash_file
+
+# Set up logging
+logger = logging.getLogger('WorkbookDownload')
+
+# Size of the chunks the body is streamed in
+CHUNK_SIZE = 64 * 1024
+
+# Seconds to wait for the server to connect and to send each chunk
+TIMEOUT = (10, 60)
+
+# Seconds a scraped file URL is reused before the share page is read again
+FILE_URL_TTL = 1800
+
+# Connections kept open per host
+POOL_SIZE = 4
+
+# The file URL in the share page's scripts: "FileGetUrl":"https:\/\/...\u0026..."
+FILE_URL_PATTERN = re.compile(r'FileGetUrl"\s*:\s*"([^"]*)"')
+
+# Members every .xlsx archive has
+REQUIRED_MEMBERS = ('[Content_Types].xml', 'xl/workbook.xml')
+
+
+class DownloadError(Exception):
+    """A download that was received but is not a usable workbook"""
+
+
+def validate_workbook(path):
+    """
+    Check that a file is a complete .xlsx archive
+
+    Args:
+        path (str): Path of the downloaded file
+
+    Raises:
+        DownloadError: If the file is not a zip archive or is missing the workbook parts
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+    except (zipfile.BadZipFile, OSError) as e:
+        raise DownloadError(f"Not a valid .xlsx file: {str(e)}")
+    missing = [name for name in REQUIRED_MEMBERS if name not in names]
+    if missing:
+        raise DownloadError(f"Not a workbook, missing {', '.join(missing)}")
+
+
+def find_file_url(page):
+    """
+    Find the workbook's download URL in a OneDrive share page
+
+    Args:
+        page (str): HTML of the share page
+
+    Returns:
+        str or None: The URL with its JSON escapes decoded, or None if the page has none
+    """
+    match = FILE_URL_PATTERN.search(page)
+    if match is None:
+        return None
+    value = match.group(1)
+    try:
+        return json.loads(f'"{value}"')
+    except ValueError:
+        return value.replace('\\u0026', '&').replace('\\/', '/')
+
+
+class WorkbookDownloader:
+    """
+    Downloads a workbook into place when, and only when, it changed.
+
+    The validators of the last download (ETag, Last-Modified, length, SHA-256) are kept per
+    source in a small JSON state file, so conditional requests also work after a restart. They
+    are only sent while the local file is still the one they describe (same size and modification
+    time); if it was replaced, e.g. by a snapshot restore, the next download is unconditional.
+
+    The resolved file URL of each share link is cached for file_url_ttl seconds. A 4xx answer
+    from the file server drops it and the share page is scraped once more; other errors keep it.
+    """
+
+    def __init__(self, state_path, chunk_size=CHUNK_SIZE, timeout=TIMEOUT, file_url_ttl=FILE_URL_TTL):
+        self.state_path = state_path
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.file_url_ttl = file_url_ttl
+        self.lock = threading.RLock()
+        # One keep-alive connection pool for the share page and the file server
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # {share URL: (file URL, resolved at)}
+        self.file_urls = {}
+        self.resolve_count = 0
+        self.state = self._load_state()
+        # Outcome counts: 'not_modified' (304), 'unchanged' (same content hash), 'downloaded', 'rejected'
+        # (not a workbook) and 'errors' (failed requests)
+        self.counters = {'not_modified': 0, 'unchanged': 0, 'downloaded': 0, 'rejected': 0, 'errors': 0}
+        self.bytes_downloaded = 0
+        self.last_result = None
+        self.last_checked = None
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable download state: {str(e)}")
+            return {}
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _file_stamp(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def resolve(self, share_url):
+        """
+        Get the workbook's file URL for a share link, scraping the share page if it is not cached
+
+        Args:
+            share_url (str): The share link
+
+        Returns:
+            str: The file URL
+
+        Raises:
+            requests.RequestException: If the share page could not be fetched
+            DownloadError: If the share page has no file URL
+        """
+        cached = self.file_urls.get(share_url)
+        if cached is not None and time.time() - cached[1] < self.file_url_ttl:
+            return cached[0]
+        response = self.session.get(share_url, timeout=self.timeout)
+        response.raise_for_status()
+        file_url = find_file_url(response.text)
+        if not file_url:
+            raise DownloadError("Failed to find the Excel file URL in the share page")
+        self.file_urls[share_url] = (file_url, time.time())
+        self.resolve_count += 1
+        return file_url
+
+    def download(self, share_url, local_path):
+        """
+        Download the workbook behind a share link if it changed since the last download
+
+        Args:
+            share_url (str): The share link, which the validators are kept under
+            local_path (str): Where the workbook is kept
+
+        Returns:
+            bool: True if a new workbook was put in place, False if it was unchanged
+
+        Raises:
+            requests.RequestException: If a request failed
+            DownloadError: If there is no file URL, or the body is not a workbook
+        """
+        with self.lock:
+            self.last_result = None
+            try:
+                file_url = self.resolve(share_url)
+                try:
+                    return self.fetch(share_url, file_url, local_path)
+                except requests.HTTPError as e:
+                    if e.response is None or not 400 <= e.response.status_code < 500:
+                        raise
+                    # The cached file URL expired or was revoked: scrape the share page once more
+                    logger.info(f"File URL rejected ({e.response.status_code}), resolving the share link again")
+                    self.file_urls.pop(share_url, None)
+                    return self.fetch(share_url, self.resolve(share_url), local_path)
+            except Exception:
+                # Failed requests and share pages without a file URL (rejected bodies are counted by fetch)
+                if self.last_result is None:
+                    self.counters['errors'] += 1
+                    self.last_result = 'error'
+                raise
+
+    def fetch(self, source, file_url, local_path):
+        """
+        Download a workbook from its file URL if it changed since the last download
+
+        Args:
+            source (str): Stable name of the source (the share link), which the state is kept under
+            file_url (str): URL the workbook itself is fetched from
+            local_path (str): Where the workbook is kept
+
+        Returns:
+            bool: True if a new workbook was put in place, False if it was unchanged
+
+        Raises:
+            requests.RequestException: If the request failed
+            DownloadError: If the body was truncated or is not a workbook (the local file is kept)
+        """
+        with self.lock:
+            entry = self.state.get(source, {})
+            current = entry.get('stamp') is not None and entry.get('stamp') == self._file_stamp(local_path)
+            headers = {}
+            if current:
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    headers['If-Modified-Since'] = entry['last_modified']
+            self.last_checked = time.time()
+
+            with self.session.get(file_url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304 and current:
+                    return self._finish('not_modified')
+                response.raise_for_status()
+                # A compressed body is decoded while streaming, so its length cannot be compared
+                expected_length = None
+                if response.headers.get('Content-Encoding', 'identity') == 'identity':
+                    expected_length = response.headers.get('Content-Length')
+                digest, length, tmp_path = self._stream(response, local_path)
+                self.bytes_downloaded += length
+
+            try:
+                if expected_length is not None and expected_length.isdigit() and int(expected_length) != length:
+                    raise DownloadError(f"Truncated download: {length} of {expected_length} bytes")
+                # The server ignored the validators (or sent none) but the content is the same
+                known = entry.get('sha256') if current else None
+                if known is None and os.path.exists(local_path):
+                    known = hash_file(local_path)
+                if digest == known:
+                    os.remove(tmp_path)
+                    self._remember(source, response, local_path, digest, length)
+                    return self._finish('unchanged')
+                validate_workbook(tmp_path)
+                os.replace(tmp_path, local_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                self.counters['rejected'] += 1
+                self.last_result = 'rejected'
+                raise
+
+            self._remember(source, response, local_path, digest, length)
+            return self._finish('downloaded')
+
+    def _stream(self, response, local_path):
+        """Write the body to a temporary file next to local_path, hashing it on the way"""
+        digest = hashlib.sha256()
+        length = 0
+        fd, tmp_path = tempfile.mkstemp(prefix='.download-', dir=os.path.dirname(os.path.abspath(local_path)))
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if chunk:
+                        file.write(chunk)
+                        digest.update(chunk)
+                        length += len(chunk)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest.hexdigest(), length, tmp_path
+
+    def _remember(self, source, response, local_path, digest, length):
+        self.state[source] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'length': length,
+            'sha256': digest,
+            'stamp': self._file_stamp(local_path),
+            'updated_at': time.time()
+        }
+        try:
+            self._save_state()
+        except Exception as e:
+            logger.warning(f"Could not save download state: {str(e)}")
+
+    def _finish(self, result):
+        self.counters[result] += 1
+        self.last_result = result
+        return result == 'downloaded'
+
+    def stats(self):
+        """
+        Report download outcomes
+
+        Returns:
+            dict: Outcome counts, 'bytes_downloaded', 'url_resolves' (share pages scraped),
+                  'last_result' and 'last_checked'
+        """
+        return dict(self.counters, bytes_downloaded=self.bytes_downloaded, url_resolves=self.resolve_count,
+                    last_result=self.last_result, last_checked=self.last_checked)